@@ -21,7 +21,8 @@ const AdminPage = ({ switchToClient, adminUser, onLogout, toast }) => {
     
     // Actualizar datos cada 5 segundos para mantener estadísticas actualizadas
     const interval = setInterval(() => {
-      loadOrders(); // Recargar pedidos actualiza las estadísticas
+      loadOrders();
+      loadStats();
     }, 5000);
     
     return () => clearInterval(interval);
@@ -30,7 +31,7 @@ const AdminPage = ({ switchToClient, adminUser, onLogout, toast }) => {
   const loadData = async () => {
     setLoading(true);
     try {
-      await Promise.all([loadProducts(), loadOrders(), loadCustomers()]);
+      await Promise.all([loadProducts(), loadOrders(), loadCustomers(), loadStats()]);
     } catch (error) {
       console.error('Error loading admin data:', error);
     } finally {
@@ -64,82 +65,30 @@ const AdminPage = ({ switchToClient, adminUser, onLogout, toast }) => {
       const data = await adminAPI.getAllOrders();
       const ordersList = data.orders || data || [];
       setOrders(ordersList);
-      calculateStats(ordersList);
     } catch (error) {
       console.error('Error loading orders:', error);
       setOrders([]);
     }
   };
 
-  const calculateStats = (ordersList) => {
-    if (!ordersList || ordersList.length === 0) {
-      setStats({ todayOrders: 0, todayRevenue: 0 });
-      return;
+  const loadStats = async () => {
+    try {
+      // Agregados calculados en el servidor (/api/admin/stats)
+      const data = await adminAPI.getStats();
+      setStats({
+        todayOrders: data.today?.orders || 0,
+        todayRevenue: parseFloat(data.today?.revenue) || 0
+      });
+    } catch (error) {
+      console.error('Error loading stats:', error);
     }
-
-    const now = new Date();
-    const today = new Date(now.getFullYear(), now.getMonth(), now.getDate());
-    
-    // Filtrar solo pedidos del día actual y que no estén cancelados
-    const todayOrders = ordersList.filter(order => {
-      if (!order.createdAt) {
-        console.warn('Order without createdAt:', order.id);
-        return false;
-      }
-      
-      try {
-        // Manejar diferentes formatos de fecha
-        let orderDate;
-        if (typeof order.createdAt === 'string') {
-          orderDate = new Date(order.createdAt);
-        } else if (order.createdAt instanceof Date) {
-          orderDate = order.createdAt;
-        } else {
-          console.warn('Invalid date format:', order.createdAt);
-          return false;
-        }
-        
-        // Verificar que la fecha sea válida
-        if (isNaN(orderDate.getTime())) {
-          console.warn('Invalid date:', order.createdAt);
-          return false;
-        }
-        
-        // Comparar solo la fecha (sin hora)
-        const orderDateOnly = new Date(orderDate.getFullYear(), orderDate.getMonth(), orderDate.getDate());
-        const isToday = orderDateOnly.getTime() === today.getTime();
-        const isNotCancelled = order.status?.toLowerCase() !== 'cancelled';
-        
-        return isToday && isNotCancelled;
-      } catch (error) {
-        console.error('Error processing order date:', error, order);
-        return false;
-      }
-    });
-    
-    // Calcular ingresos solo de pedidos no cancelados del día
-    const todayRevenue = todayOrders.reduce((sum, order) => {
-      const total = parseFloat(order.total) || 0;
-      return sum + total;
-    }, 0);
-
-    console.log('Stats calculated:', {
-      totalOrders: ordersList.length,
-      todayOrders: todayOrders.length,
-      todayRevenue: todayRevenue
-    });
-
-    setStats({
-      todayOrders: todayOrders.length,
-      todayRevenue: todayRevenue
-    });
   };
 
   const handleAdminOrderStatus = async (orderId, newStatus) => {
     try {
       await adminAPI.updateOrderStatus(orderId, newStatus);
-      // Recargar pedidos después de actualizar
-      await loadOrders();
+      // Recargar pedidos y estadísticas después de actualizar
+      await Promise.all([loadOrders(), loadStats()]);
       toast.success('Estado del pedido actualizado correctamente');
     } catch (error) {
       console.error('Error updating order status:', error);
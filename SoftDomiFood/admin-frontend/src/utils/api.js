@@ -96,6 +96,11 @@ export const adminAPI = {
     const response = await api.get('/admin/customers');
     return response.data;
   },
+
+  getStats: async (days = 30) => {
+    const response = await api.get('/admin/stats', { params: { days } });
+    return response.data;
+  },
 };
 
 export default api;
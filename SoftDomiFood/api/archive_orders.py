@@ -0,0 +1,132 @@
+"""
+Job de archivado de pedidos.
+Mueve por lotes los pedidos DELIVERED y CANCELLED más antiguos que N meses
+(con sus items y documentos de lectura) a las tablas *_archive, y elimina las
+particiones mensuales que quedan vacías.
+
+Uso:
+    python archive_orders.py --months 6 --batch-size 500
+"""
+import asyncpg
+import os
+import asyncio
+from init_db import ensure_partitions
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ORDER_ARCHIVE_AFTER_MONTHS", "6"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ORDER_ARCHIVE_BATCH_SIZE", "500"))
+
+# Columnas que se copian a las tablas *_archive. Las tablas de archivo se
+# crearon con LIKE una sola vez: una columna nueva en orders, order_items u
+# order_documents debe agregarse también aquí y a su tabla de archivo
+# (ALTER TABLE ... ADD COLUMN IF NOT EXISTS en SCHEMA_UPDATES_SQL).
+ARCHIVE_COLUMNS = {
+    "orders": ("id", "userId", "addressId", "status", "total", "paymentMethod", "notes", "createdAt", "updatedAt",
+               "deliveryFee"),
+    "order_items": ("id", "orderId", "productId", "quantity", "price", "notes", "createdAt"),
+    "order_documents": ("id", "userId", "status", "createdAt", "updatedAt", "document"),
+}
+
+
+def _column_list(columns, alias: str = "") -> str:
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(f'{prefix}"{column}"' for column in columns)
+
+
+def build_archive_batch_sql(columns=ARCHIVE_COLUMNS) -> str:
+    """
+    Un lote por transacción: bloquear el lote, borrarlo de las tablas activas e
+    insertarlo en las de archivo en una sola sentencia ($1 = fecha de corte,
+    $2 = tamaño del lote). Pedido, items y documento se mueven juntos: order_items
+    no tiene FK hacia orders particionada.
+    """
+    orders, items, documents = columns["orders"], columns["order_items"], columns["order_documents"]
+    return f"""
+WITH batch AS (
+    SELECT id, "createdAt"
+    FROM orders
+    WHERE "createdAt" < $1
+      AND status IN ('DELIVERED', 'CANCELLED')
+    ORDER BY "createdAt"
+    LIMIT $2
+    FOR UPDATE SKIP LOCKED
+),
+moved_orders AS (
+    DELETE FROM orders o
+    USING batch b
+    WHERE o.id = b.id AND o."createdAt" = b."createdAt"
+    RETURNING {_column_list(orders, "o")}
+),
+moved_items AS (
+    DELETE FROM order_items oi
+    USING batch b
+    WHERE oi."orderId" = b.id
+    RETURNING {_column_list(items, "oi")}
+),
+moved_documents AS (
+    DELETE FROM order_documents d
+    USING batch b
+    WHERE d.id = b.id
+    RETURNING {_column_list(documents, "d")}
+),
+archived_items AS (
+    INSERT INTO order_items_archive ({_column_list(items)})
+    SELECT {_column_list(items)} FROM moved_items
+),
+archived_documents AS (
+    INSERT INTO order_documents_archive ({_column_list(documents)})
+    SELECT {_column_list(documents)} FROM moved_documents
+)
+INSERT INTO orders_archive ({_column_list(orders)})
+SELECT {_column_list(orders)} FROM moved_orders
+"""
+
+
+ARCHIVE_BATCH_SQL = build_archive_batch_sql()
+
+
+async def archive_orders(months: int = ARCHIVE_AFTER_MONTHS, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Archivar pedidos finalizados más antiguos que `months` meses. Retorna cuántos se movieron"""
+    if not DATABASE_URL:
+        print("❌ DATABASE_URL no está configurada")
+        return 0
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        cutoff = await conn.fetchval(
+            "SELECT (NOW() - make_interval(months => $1))::timestamp",
+            months
+        )
+        print(f"📦 Archivando pedidos DELIVERED/CANCELLED anteriores a {cutoff.isoformat()}...")
+
+        total = 0
+        while True:
+            # Lotes cortos: cada transacción bloquea como máximo batch_size pedidos
+            async with conn.transaction():
+                status = await conn.execute(ARCHIVE_BATCH_SQL, cutoff, batch_size)
+            moved = int(status.split()[-1])
+            total += moved
+            if moved < batch_size:
+                break
+
+        dropped = await conn.fetchval("SELECT drop_empty_order_partitions($1)", cutoff)
+        await ensure_partitions(conn)
+
+        print(f"✅ Pedidos archivados: {total}")
+        print(f"✅ Particiones vacías eliminadas: {dropped}")
+        return total
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Archivar pedidos finalizados antiguos")
+    parser.add_argument("--months", type=int, default=ARCHIVE_AFTER_MONTHS,
+                        help="Archivar pedidos DELIVERED/CANCELLED más antiguos que N meses")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Pedidos por transacción")
+    args = parser.parse_args()
+
+    asyncio.run(archive_orders(months=args.months, batch_size=args.batch_size))
@@ -6,7 +6,8 @@ import asyncpg
 import os
 import asyncio
 import sys
-from typing import Optional
+from datetime import date
+from typing import Optional, Tuple
 
 # Agregar el directorio actual al path para importar servicios
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -84,33 +85,52 @@ CREATE TABLE IF NOT EXISTS "products" (
     "updatedAt" TIMESTAMP DEFAULT NOW()
 );
 
--- Tabla orders
+-- Tabla orders (particionada por mes sobre "createdAt"; las particiones
+-- mensuales las crea ensure_order_partitions en SCHEMA_UPDATES_SQL)
 CREATE TABLE IF NOT EXISTS "orders" (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
     "userId" UUID NOT NULL,
     "addressId" UUID NOT NULL,
     status "OrderStatus" DEFAULT 'PENDING',
     total DECIMAL(10, 2) NOT NULL,
     "paymentMethod" "PaymentMethod" DEFAULT 'CASH',
     notes TEXT,
-    "createdAt" TIMESTAMP DEFAULT NOW(),
+    "createdAt" TIMESTAMP NOT NULL DEFAULT NOW(),
     "updatedAt" TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (id, "createdAt"),
     CONSTRAINT fk_order_user FOREIGN KEY ("userId") REFERENCES "users"(id),
     CONSTRAINT fk_order_address FOREIGN KEY ("addressId") REFERENCES "addresses"(id)
-);
+) PARTITION BY RANGE ("createdAt");
+
 
--- Tabla order_items
+-- Tabla order_items (misma partición mensual que su pedido: se insertan en la
+-- misma transacción). Sin FK a orders: una FK hacia una tabla particionada
+-- exigiría incluir "createdAt" del pedido; la integridad la mantienen
+-- create_order y el job de archivado, que mueve pedido e items juntos.
 CREATE TABLE IF NOT EXISTS "order_items" (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
     "orderId" UUID NOT NULL,
     "productId" UUID NOT NULL,
     quantity INTEGER NOT NULL,
     price DECIMAL(10, 2) NOT NULL,
     notes TEXT,
-    "createdAt" TIMESTAMP DEFAULT NOW(),
-    CONSTRAINT fk_order_item_order FOREIGN KEY ("orderId") REFERENCES "orders"(id) ON DELETE CASCADE,
+    "createdAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, "createdAt"),
     CONSTRAINT fk_order_item_product FOREIGN KEY ("productId") REFERENCES "products"(id)
-);
+) PARTITION BY RANGE ("createdAt");
+
+-- Particiones DEFAULT solo si las tablas ya son particionadas: sobre una base
+-- de datos anterior al particionado, orders sigue siendo una tabla normal hasta
+-- que la convierte SCHEMA_UPDATES_SQL (que crea allí sus particiones)
+DO $$ BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class
+        WHERE relname = 'orders' AND relkind = 'p' AND relnamespace = 'public'::regnamespace
+    ) THEN
+        CREATE TABLE IF NOT EXISTS "orders_default" PARTITION OF "orders" DEFAULT;
+        CREATE TABLE IF NOT EXISTS "order_items_default" PARTITION OF "order_items" DEFAULT;
+    END IF;
+END $$;
 
 -- Crear índices para mejorar el rendimiento
 CREATE INDEX IF NOT EXISTS idx_users_email ON "users"(email);
@@ -122,6 +142,526 @@ CREATE INDEX IF NOT EXISTS idx_products_category ON "products"(category);
 CREATE INDEX IF NOT EXISTS idx_products_is_available ON "products"("isAvailable");
 """
 
+# Crear los documentos de lectura que falten (pedidos anteriores al modelo de
+# lectura o insertados directamente, como los del seed)
+BACKFILL_ORDER_DOCUMENTS_SQL = """
+INSERT INTO order_documents (id, "userId", status, "createdAt", "updatedAt", document)
+SELECT o.id, o."userId", o.status, o."createdAt", o."updatedAt", build_order_document(o.id)
+FROM orders o
+WHERE NOT EXISTS (SELECT 1 FROM order_documents d WHERE d.id = o.id);
+"""
+
+# Meses de particiones que se crean por adelantado en cada arranque
+ORDER_PARTITIONS_MONTHS_AHEAD = int(os.getenv("ORDER_PARTITIONS_MONTHS_AHEAD", "3"))
+
+# Cambios de esquema posteriores a la versión inicial. Deben ser idempotentes:
+# se ejecutan en cada arranque, también sobre bases de datos ya existentes.
+SCHEMA_UPDATES_SQL = r"""
+-- Crear particiones mensuales de orders y order_items entre dos fechas
+CREATE OR REPLACE FUNCTION ensure_order_partitions(p_from DATE, p_to DATE) RETURNS void AS $$
+DECLARE
+    month_start DATE := date_trunc('month', p_from)::date;
+    month_end DATE;
+    suffix TEXT;
+BEGIN
+    WHILE month_start <= p_to LOOP
+        month_end := (month_start + INTERVAL '1 month')::date;
+        suffix := to_char(month_start, 'YYYYMM');
+        BEGIN
+            EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF "orders" FOR VALUES FROM (%L) TO (%L)',
+                           'orders_' || suffix, month_start, month_end);
+            EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF "order_items" FOR VALUES FROM (%L) TO (%L)',
+                           'order_items_' || suffix, month_start, month_end);
+        EXCEPTION WHEN check_violation THEN
+            -- La partición DEFAULT ya tiene filas de ese mes: se quedan allí
+            RAISE NOTICE 'Partición % no creada: hay filas en la partición DEFAULT', suffix;
+        END;
+        month_start := month_end;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Eliminar particiones mensuales vacías que terminan antes de una fecha
+-- (después de archivar, para que las consultas no las recorran)
+CREATE OR REPLACE FUNCTION drop_empty_order_partitions(p_before TIMESTAMP) RETURNS INTEGER AS $$
+DECLARE
+    part RECORD;
+    is_empty BOOLEAN;
+    dropped INTEGER := 0;
+BEGIN
+    FOR part IN
+        SELECT c.relname AS name, substring(c.relname FROM 'orders_(\d{6})$') AS suffix
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = '"orders"'::regclass
+          AND c.relname ~ '^orders_\d{6}$'
+    LOOP
+        IF (to_date(part.suffix, 'YYYYMM') + INTERVAL '1 month') > p_before THEN
+            CONTINUE;
+        END IF;
+        EXECUTE format('SELECT NOT EXISTS (SELECT 1 FROM %I) AND NOT EXISTS (SELECT 1 FROM %I)',
+                       part.name, 'order_items_' || part.suffix) INTO is_empty;
+        IF is_empty THEN
+            EXECUTE format('DROP TABLE %I', part.name);
+            EXECUTE format('DROP TABLE IF EXISTS %I', 'order_items_' || part.suffix);
+            dropped := dropped + 1;
+        END IF;
+    END LOOP;
+    RETURN dropped;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Convertir orders/order_items sin particionar (bases de datos creadas antes
+-- del particionado) copiando los datos a las nuevas tablas particionadas
+DO $$
+DECLARE
+    oldest DATE;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class
+        WHERE relname = 'orders' AND relkind = 'r' AND relnamespace = 'public'::regnamespace
+    ) THEN
+        ALTER TABLE "orders" RENAME TO "orders_unpartitioned";
+        ALTER TABLE "order_items" RENAME TO "order_items_unpartitioned";
+
+        CREATE TABLE "orders" (LIKE "orders_unpartitioned" INCLUDING DEFAULTS) PARTITION BY RANGE ("createdAt");
+        ALTER TABLE "orders" ALTER COLUMN "createdAt" SET NOT NULL;
+        ALTER TABLE "orders" ADD PRIMARY KEY (id, "createdAt");
+        ALTER TABLE "orders" ADD CONSTRAINT fk_order_user FOREIGN KEY ("userId") REFERENCES "users"(id);
+        ALTER TABLE "orders" ADD CONSTRAINT fk_order_address FOREIGN KEY ("addressId") REFERENCES "addresses"(id);
+        CREATE TABLE "orders_default" PARTITION OF "orders" DEFAULT;
+
+        CREATE TABLE "order_items" (LIKE "order_items_unpartitioned" INCLUDING DEFAULTS) PARTITION BY RANGE ("createdAt");
+        ALTER TABLE "order_items" ALTER COLUMN "createdAt" SET NOT NULL;
+        ALTER TABLE "order_items" ADD PRIMARY KEY (id, "createdAt");
+        ALTER TABLE "order_items" ADD CONSTRAINT fk_order_item_product FOREIGN KEY ("productId") REFERENCES "products"(id);
+        CREATE TABLE "order_items_default" PARTITION OF "order_items" DEFAULT;
+
+        SELECT COALESCE(MIN("createdAt"), NOW())::date INTO oldest FROM "orders_unpartitioned";
+        PERFORM ensure_order_partitions(oldest, NOW()::date);
+
+        UPDATE "orders_unpartitioned" SET "createdAt" = NOW() WHERE "createdAt" IS NULL;
+        UPDATE "order_items_unpartitioned" SET "createdAt" = NOW() WHERE "createdAt" IS NULL;
+        INSERT INTO "orders" SELECT * FROM "orders_unpartitioned";
+        INSERT INTO "order_items" SELECT * FROM "order_items_unpartitioned";
+
+        DROP TABLE "order_items_unpartitioned";
+        DROP TABLE "orders_unpartitioned" CASCADE;
+    END IF;
+END $$;
+
+-- Índices de INIT_SQL (se recrean aquí para las tablas recién convertidas)
+CREATE INDEX IF NOT EXISTS idx_orders_user_id ON "orders"("userId");
+CREATE INDEX IF NOT EXISTS idx_orders_status ON "orders"(status);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON "order_items"("orderId");
+
+-- Tablas de archivo: pedidos DELIVERED/CANCELLED antiguos (ver archive_orders.py)
+CREATE TABLE IF NOT EXISTS "orders_archive" (LIKE "orders" INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS "order_items_archive" (LIKE "order_items" INCLUDING DEFAULTS);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_id ON "orders_archive"(id);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_user_id ON "orders_archive"("userId");
+CREATE INDEX IF NOT EXISTS idx_order_items_archive_order_id ON "order_items_archive"("orderId");
+
+-- Tarifa de domicilio de la zona de entrega, ya incluida en total
+ALTER TABLE "orders" ADD COLUMN IF NOT EXISTS "deliveryFee" DECIMAL(10, 2) NOT NULL DEFAULT 0;
+ALTER TABLE "orders_archive" ADD COLUMN IF NOT EXISTS "deliveryFee" DECIMAL(10, 2) NOT NULL DEFAULT 0;
+
+-- Historial de pedidos por cliente paginado por cursor ("createdAt", id)
+CREATE INDEX IF NOT EXISTS idx_orders_user_created ON "orders"("userId", "createdAt" DESC, id DESC);
+
+-- Modelo de lectura: un documento JSONB desnormalizado por pedido (items con
+-- snapshot de nombre y categoría, cliente y dirección de entrega). El contenido
+-- de un pedido no cambia después de creado; solo su estado.
+CREATE TABLE IF NOT EXISTS "order_documents" (
+    id UUID PRIMARY KEY,
+    "userId" UUID NOT NULL,
+    status "OrderStatus" NOT NULL,
+    "createdAt" TIMESTAMP NOT NULL,
+    "updatedAt" TIMESTAMP NOT NULL,
+    document JSONB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_order_documents_user_created ON "order_documents"("userId", "createdAt" DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_order_documents_created ON "order_documents"("createdAt" DESC);
+CREATE TABLE IF NOT EXISTS "order_documents_archive" (LIKE "order_documents" INCLUDING DEFAULTS);
+CREATE INDEX IF NOT EXISTS idx_order_documents_archive_user ON "order_documents_archive"("userId", "createdAt" DESC);
+
+CREATE OR REPLACE FUNCTION build_order_document(p_order_id UUID) RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'id', o.id,
+        'userId', o."userId",
+        'addressId', o."addressId",
+        'status', o.status,
+        'total', o.total,
+        'deliveryFee', o."deliveryFee",
+        'paymentMethod', o."paymentMethod",
+        'notes', o.notes,
+        'createdAt', o."createdAt",
+        'updatedAt', o."updatedAt",
+        'customer_id', u.id,
+        'customer_name', u.name,
+        'customer_email', u.email,
+        'customer_phone', u.phone,
+        'delivery_street', a.street,
+        'delivery_city', a.city,
+        'delivery_state', a.state,
+        'delivery_zipcode', a."zipCode",
+        'delivery_country', a.country,
+        'delivery_instructions', a.instructions,
+        'itemCount', COALESCE(i."itemCount", 0),
+        'items', COALESCE(i.items, '[]'::jsonb)
+    )
+    FROM orders o
+    LEFT JOIN users u ON u.id = o."userId"
+    LEFT JOIN addresses a ON a.id = o."addressId"
+    LEFT JOIN LATERAL (
+        SELECT
+            SUM(oi.quantity)::int AS "itemCount",
+            jsonb_agg(jsonb_build_object(
+                'id', oi.id,
+                'productId', oi."productId",
+                'product_id', oi."productId",
+                'quantity', oi.quantity,
+                'price', oi.price,
+                'product_name', p.name,
+                'product_description', p.description,
+                'product_category', p.category
+            ) ORDER BY oi."createdAt") AS items
+        FROM order_items oi
+        JOIN products p ON p.id = oi."productId"
+        WHERE oi."orderId" = o.id
+    ) i ON true
+    WHERE o.id = p_order_id
+$$ LANGUAGE sql STABLE;
+
+-- Documentos creados antes de incluir product_description en los items
+-- (activos y archivados): se completa con la descripción actual del producto
+DO $$
+DECLARE
+    tbl TEXT;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY['order_documents', 'order_documents_archive'] LOOP
+        EXECUTE format($sql$
+            UPDATE %I d
+            SET document = jsonb_set(d.document, '{items}', (
+                SELECT jsonb_agg(item || jsonb_build_object('product_description', p.description) ORDER BY pos)
+                FROM jsonb_array_elements(d.document->'items') WITH ORDINALITY AS e(item, pos)
+                LEFT JOIN products p ON p.id = (item->>'productId')::uuid
+            ))
+            WHERE jsonb_array_length(d.document->'items') > 0
+              AND NOT (d.document->'items'->0 ? 'product_description')
+        $sql$, tbl);
+    END LOOP;
+END $$;
+
+-- Documentos creados antes de la columna "deliveryFee" (su valor no se guardó: 0)
+UPDATE order_documents SET document = document || '{"deliveryFee": 0}'::jsonb
+WHERE NOT (document ? 'deliveryFee');
+UPDATE order_documents_archive SET document = document || '{"deliveryFee": 0}'::jsonb
+WHERE NOT (document ? 'deliveryFee');
+
+-- Mantener el estado del documento sincronizado con cualquier escritor de
+-- orders.status (la API y también el worker, que actualiza vía Prisma)
+CREATE OR REPLACE FUNCTION sync_order_document_status() RETURNS trigger AS $$
+BEGIN
+    UPDATE order_documents
+    SET status = NEW.status,
+        "updatedAt" = NEW."updatedAt",
+        document = document || jsonb_build_object('status', NEW.status, 'updatedAt', NEW."updatedAt")
+    WHERE id = NEW.id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_orders_sync_document
+    AFTER UPDATE OF status ON "orders"
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION sync_order_document_status();
+
+-- Agregados del dashboard (/api/admin/stats). trg_order_documents_stats no
+-- los actualiza directamente: agrega filas a las tablas *_delta (solo INSERT,
+-- sin filas compartidas que bloquear) y fold_order_stats las suma a los
+-- agregados cada STATS_FOLD_INTERVAL_SECONDS. Así las transacciones de pedidos
+-- concurrentes no se encolan tras el bloqueo de la fila de la hora en curso.
+-- reconcile_order_stats los recalcula periódicamente desde los documentos.
+CREATE TABLE IF NOT EXISTS "stats_hourly" (
+    bucket TIMESTAMP PRIMARY KEY,
+    orders INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS "stats_daily" (
+    day DATE NOT NULL,
+    status "OrderStatus" NOT NULL,
+    orders INTEGER NOT NULL DEFAULT 0,
+    amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, status)
+);
+
+CREATE TABLE IF NOT EXISTS "stats_product_daily" (
+    day DATE NOT NULL,
+    "productId" UUID NOT NULL,
+    "productName" VARCHAR(255),
+    units INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, "productId")
+);
+
+-- Incrementos pendientes de sumar (sin clave primaria: cada pedido agrega filas)
+CREATE TABLE IF NOT EXISTS "stats_hourly_delta" (
+    bucket TIMESTAMP NOT NULL,
+    orders INTEGER NOT NULL,
+    revenue DECIMAL(14, 2) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS "stats_daily_delta" (
+    day DATE NOT NULL,
+    status "OrderStatus" NOT NULL,
+    orders INTEGER NOT NULL,
+    amount DECIMAL(14, 2) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS "stats_product_daily_delta" (
+    day DATE NOT NULL,
+    "productId" UUID NOT NULL,
+    "productName" VARCHAR(255),
+    units INTEGER NOT NULL,
+    revenue DECIMAL(14, 2) NOT NULL
+);
+
+-- Agregados más incrementos pendientes: lo que lee el dashboard (sumando)
+CREATE OR REPLACE VIEW "stats_hourly_current" AS
+    SELECT bucket, orders, revenue FROM stats_hourly
+    UNION ALL
+    SELECT bucket, orders, revenue FROM stats_hourly_delta;
+
+CREATE OR REPLACE VIEW "stats_daily_current" AS
+    SELECT day, status, orders, amount FROM stats_daily
+    UNION ALL
+    SELECT day, status, orders, amount FROM stats_daily_delta;
+
+CREATE OR REPLACE VIEW "stats_product_daily_current" AS
+    SELECT day, "productId", "productName", units, revenue FROM stats_product_daily
+    UNION ALL
+    SELECT day, "productId", "productName", units, revenue FROM stats_product_daily_delta;
+
+CREATE OR REPLACE VIEW "order_documents_all" AS
+    SELECT id, status, "createdAt", document FROM order_documents
+    UNION ALL
+    SELECT id, status, "createdAt", document FROM order_documents_archive;
+
+-- Sumar (p_sign = 1) o restar (p_sign = -1) las ventas de un pedido: ingresos
+-- por hora y unidades por producto. Los pedidos cancelados no cuentan como venta.
+CREATE OR REPLACE FUNCTION stats_apply_sales(p_created TIMESTAMP, p_document JSONB, p_sign INTEGER) RETURNS void AS $$
+BEGIN
+    INSERT INTO stats_hourly_delta (bucket, orders, revenue)
+    VALUES (date_trunc('hour', p_created), 0, p_sign * (p_document->>'total')::numeric);
+
+    INSERT INTO stats_product_daily_delta (day, "productId", "productName", units, revenue)
+    SELECT p_created::date,
+           (item->>'productId')::uuid,
+           MAX(item->>'product_name'),
+           p_sign * SUM((item->>'quantity')::int),
+           p_sign * SUM((item->>'quantity')::int * (item->>'price')::numeric)
+    FROM jsonb_array_elements(p_document->'items') AS item
+    GROUP BY (item->>'productId')::uuid;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION apply_order_document_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO stats_daily_delta (day, status, orders, amount)
+        VALUES (NEW."createdAt"::date, NEW.status, 1, (NEW.document->>'total')::numeric);
+
+        INSERT INTO stats_hourly_delta (bucket, orders, revenue)
+        VALUES (date_trunc('hour', NEW."createdAt"), 1, 0);
+
+        IF NEW.status <> 'CANCELLED' THEN
+            PERFORM stats_apply_sales(NEW."createdAt", NEW.document, 1);
+        END IF;
+    ELSIF OLD.status IS DISTINCT FROM NEW.status THEN
+        -- Mover el pedido entre estados dentro del día en que se creó
+        INSERT INTO stats_daily_delta (day, status, orders, amount)
+        VALUES (OLD."createdAt"::date, OLD.status, -1, -(OLD.document->>'total')::numeric),
+               (NEW."createdAt"::date, NEW.status, 1, (NEW.document->>'total')::numeric);
+
+        IF NEW.status = 'CANCELLED' THEN
+            PERFORM stats_apply_sales(NEW."createdAt", NEW.document, -1);
+        ELSIF OLD.status = 'CANCELLED' THEN
+            PERFORM stats_apply_sales(NEW."createdAt", NEW.document, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_order_documents_stats
+    AFTER INSERT OR UPDATE OF status ON "order_documents"
+    FOR EACH ROW
+    EXECUTE FUNCTION apply_order_document_stats();
+
+-- Sumar los incrementos pendientes a los agregados. Cada DELETE ... RETURNING
+-- toma solo las filas visibles al empezar: las que se agregan mientras tanto
+-- quedan para la siguiente ejecución. Retorna las filas de incrementos sumadas.
+CREATE OR REPLACE FUNCTION fold_order_stats() RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+    folded INTEGER := 0;
+BEGIN
+    WITH deltas AS (
+        DELETE FROM stats_daily_delta RETURNING day, status, orders, amount
+    ), totals AS (
+        INSERT INTO stats_daily AS d (day, status, orders, amount)
+        SELECT day, status, SUM(orders), SUM(amount) FROM deltas GROUP BY day, status
+        ON CONFLICT (day, status) DO UPDATE
+        SET orders = d.orders + EXCLUDED.orders, amount = d.amount + EXCLUDED.amount
+    )
+    SELECT COUNT(*) INTO moved FROM deltas;
+    folded := folded + moved;
+
+    WITH deltas AS (
+        DELETE FROM stats_hourly_delta RETURNING bucket, orders, revenue
+    ), totals AS (
+        INSERT INTO stats_hourly AS h (bucket, orders, revenue)
+        SELECT bucket, SUM(orders), SUM(revenue) FROM deltas GROUP BY bucket
+        ON CONFLICT (bucket) DO UPDATE
+        SET orders = h.orders + EXCLUDED.orders, revenue = h.revenue + EXCLUDED.revenue
+    )
+    SELECT COUNT(*) INTO moved FROM deltas;
+    folded := folded + moved;
+
+    WITH deltas AS (
+        DELETE FROM stats_product_daily_delta RETURNING day, "productId", "productName", units, revenue
+    ), totals AS (
+        INSERT INTO stats_product_daily AS pd (day, "productId", "productName", units, revenue)
+        SELECT day, "productId", MAX("productName"), SUM(units), SUM(revenue)
+        FROM deltas GROUP BY day, "productId"
+        ON CONFLICT (day, "productId") DO UPDATE
+        SET units = pd.units + EXCLUDED.units,
+            revenue = pd.revenue + EXCLUDED.revenue,
+            "productName" = EXCLUDED."productName"
+    )
+    SELECT COUNT(*) INTO moved FROM deltas;
+    folded := folded + moved;
+
+    RETURN folded;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcular los agregados desde p_since a partir de los documentos de pedidos
+-- (activos y archivados). Bloquea escrituras en order_documents mientras tanto
+-- para no perder ni duplicar incrementos concurrentes.
+CREATE OR REPLACE FUNCTION reconcile_order_stats(p_since TIMESTAMP) RETURNS void AS $$
+DECLARE
+    since_day TIMESTAMP := date_trunc('day', p_since);
+BEGIN
+    LOCK TABLE order_documents IN SHARE MODE;
+
+    -- Los incrementos pendientes ya están en los documentos: sumarlos primero
+    -- para que los días anteriores a p_since no los pierdan
+    PERFORM fold_order_stats();
+
+    DELETE FROM stats_daily WHERE day >= since_day;
+    DELETE FROM stats_hourly WHERE bucket >= since_day;
+    DELETE FROM stats_product_daily WHERE day >= since_day;
+
+    INSERT INTO stats_daily (day, status, orders, amount)
+    SELECT "createdAt"::date, status, COUNT(*), SUM((document->>'total')::numeric)
+    FROM order_documents_all
+    WHERE "createdAt" >= since_day
+    GROUP BY 1, 2;
+
+    INSERT INTO stats_hourly (bucket, orders, revenue)
+    SELECT date_trunc('hour', "createdAt"),
+           COUNT(*),
+           COALESCE(SUM((document->>'total')::numeric) FILTER (WHERE status <> 'CANCELLED'), 0)
+    FROM order_documents_all
+    WHERE "createdAt" >= since_day
+    GROUP BY 1;
+
+    INSERT INTO stats_product_daily (day, "productId", "productName", units, revenue)
+    SELECT d."createdAt"::date,
+           (item->>'productId')::uuid,
+           MAX(item->>'product_name'),
+           SUM((item->>'quantity')::int),
+           SUM((item->>'quantity')::int * (item->>'price')::numeric)
+    FROM order_documents_all d
+    CROSS JOIN LATERAL jsonb_array_elements(d.document->'items') AS item
+    WHERE d."createdAt" >= since_day AND d.status <> 'CANCELLED'
+    GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Una sola dirección predeterminada por usuario. Antes de crear el índice se
+-- conserva solo la predeterminada más reciente de cada usuario
+UPDATE addresses a
+SET "isDefault" = false
+WHERE a."isDefault"
+  AND EXISTS (
+      SELECT 1 FROM addresses b
+      WHERE b."userId" = a."userId" AND b."isDefault"
+        AND (b."createdAt", b.id) > (a."createdAt", a.id)
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_addresses_one_default
+    ON "addresses" ("userId") WHERE "isDefault";
+
+-- Libro de pagos. Se escribe en diferido por lotes (services/payment_ledger.py);
+-- cada intento es una fila y "orderId" enlaza con orders.id para conciliación
+DO $$ BEGIN
+    CREATE TYPE "PaymentStatus" AS ENUM ('PENDING', 'APPROVED', 'DECLINED', 'FAILED');
+EXCEPTION
+    WHEN duplicate_object THEN null;
+END $$;
+
+CREATE TABLE IF NOT EXISTS "payments" (
+    id UUID PRIMARY KEY,
+    "orderId" UUID NOT NULL,
+    "paymentMethod" "PaymentMethod" NOT NULL,
+    amount DECIMAL(10, 2) NOT NULL,
+    status "PaymentStatus" NOT NULL,
+    "transactionId" VARCHAR(100),
+    message TEXT,
+    "createdAt" TIMESTAMP NOT NULL,
+    "updatedAt" TIMESTAMP NOT NULL
+);
+
+-- Verificación de idempotencia: último intento vigente por pedido y método
+CREATE INDEX IF NOT EXISTS idx_payments_order_method
+    ON "payments" ("orderId", "paymentMethod", "createdAt" DESC);
+
+-- Un solo pago vigente (PENDING o APPROVED) por pedido y método entre todos
+-- los workers. Antes de crear el índice, los vigentes duplicados quedan como
+-- FAILED salvo uno por pedido y método (el aprobado más reciente)
+WITH ranked AS (
+    SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY "orderId", "paymentMethod"
+        ORDER BY status = 'APPROVED' DESC, "createdAt" DESC, id DESC
+    ) AS position
+    FROM "payments"
+    WHERE status IN ('PENDING', 'APPROVED')
+)
+UPDATE "payments" p
+SET status = 'FAILED',
+    message = 'Superseded by another active payment',
+    "updatedAt" = NOW() AT TIME ZONE 'UTC'
+FROM ranked r
+WHERE p.id = r.id AND r.position > 1
+  AND NOT EXISTS (
+      SELECT 1 FROM pg_indexes WHERE indexname = 'idx_payments_order_method_active'
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_payments_order_method_active
+    ON "payments" ("orderId", "paymentMethod")
+    WHERE status IN ('PENDING', 'APPROVED');
+
+-- Primera vez: construir los agregados con todo el historial
+SELECT reconcile_order_stats('-infinity')
+WHERE NOT EXISTS (SELECT 1 FROM stats_daily) AND EXISTS (SELECT 1 FROM order_documents_all);
+""" + BACKFILL_ORDER_DOCUMENTS_SQL
+
 async def create_admin_user():
     """Crear usuario administrador por defecto"""
     if not DATABASE_URL:
@@ -166,6 +706,41 @@ async def create_admin_user():
         traceback.print_exc()
         return False
 
+def add_months(month_start: date, months: int) -> date:
+    """Primer día del mes que está `months` meses después (o antes) de month_start"""
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_window(today: date, months_ahead: int = ORDER_PARTITIONS_MONTHS_AHEAD) -> Tuple[date, date]:
+    """Primer día del mes de la primera y de la última partición mensual que deben existir"""
+    month_start = today.replace(day=1)
+    return add_months(month_start, -1), add_months(month_start, months_ahead)
+
+async def ensure_partitions(conn: asyncpg.Connection):
+    """Crear las particiones mensuales del mes anterior, el actual y los siguientes"""
+    first, last = partition_window(date.today())
+    await conn.execute("SELECT ensure_order_partitions($1, $2)", first, last)
+
+async def apply_schema_updates():
+    """Aplicar cambios de esquema idempotentes sobre una base de datos existente"""
+    if not DATABASE_URL:
+        return False
+    
+    try:
+        conn = await asyncpg.connect(DATABASE_URL)
+        try:
+            await conn.execute(SCHEMA_UPDATES_SQL)
+            await ensure_partitions(conn)
+            print("✅ Esquema actualizado")
+            return True
+        finally:
+            await conn.close()
+    except Exception as e:
+        print(f"⚠️  Error al actualizar el esquema: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 async def init_database():
     """Inicializar la base de datos creando todas las tablas necesarias"""
     if not DATABASE_URL:
@@ -177,10 +752,12 @@ async def init_database():
         try:
             # Ejecutar script de inicialización
             await conn.execute(INIT_SQL)
+            await conn.execute(SCHEMA_UPDATES_SQL)
+            await ensure_partitions(conn)
             print("✅ Base de datos inicializada correctamente")
             
             # Verificar que todas las tablas se crearon
-            tables_to_check = ['users', 'products', 'addresses', 'orders', 'order_items']
+            tables_to_check = ['users', 'products', 'addresses', 'orders', 'order_items', 'order_documents', 'payments']
             for table in tables_to_check:
                 exists = await conn.fetchval("""
                     SELECT EXISTS (
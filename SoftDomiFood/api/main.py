@@ -1,68 +1,98 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from contextlib import asynccontextmanager
+import logging
 import os
 from dotenv import load_dotenv
 
 from database import engine, Base, get_db
-from routers import auth, products, orders, admin, addresses
-from init_db import init_database, check_tables_exist, create_admin_user
+from routers import auth, products, orders, admin, addresses, payments
+from init_db import init_database, check_tables_exist, create_admin_user, apply_schema_updates
 from services.rabbitmq import get_channel, close_connection
+from services.stats_service import start_stats_reconciliation, stop_stats_reconciliation
+from services.payment_processor import start_payment_workers, stop_payment_workers
+from services.payment_ledger import start_payment_ledger, stop_payment_ledger
+from services.delivery_zones import load_delivery_zones
+from services.metrics import MetricsMiddleware, render_metrics, mark_worker_dead, CONTENT_TYPE_LATEST
+from services.logging_config import setup_logging, RequestIdMiddleware
+from services.profiling import ProfilingMiddleware
+from services.loop_monitor import start_loop_monitor, stop_loop_monitor
+from services.compression import CompressionMiddleware
+from services.single_flight import SingleFlightTimeout
 
 load_dotenv()
 
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Crear tablas al iniciar (solo para desarrollo)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print("🚀 Inicializando base de datos...")
+    logger.info("Inicializando base de datos...")
     try:
         # Verificar si las tablas existen
         tables_exist = await check_tables_exist()
         if not tables_exist:
-            print("📊 Creando tablas en la base de datos...")
+            logger.info("Creando tablas en la base de datos...")
             success = await init_database()
             if success:
-                print("✅ Base de datos inicializada correctamente")
+                logger.info("Base de datos inicializada correctamente")
             else:
-                print("⚠️  Advertencia: No se pudieron crear todas las tablas")
+                logger.warning("No se pudieron crear todas las tablas, intentando forzar creación...")
                 # Intentar forzar creación de nuevo
-                print("🔄 Intentando forzar creación de tablas...")
                 await init_database()
         else:
-            print("✅ Las tablas ya existen en la base de datos")
+            logger.info("Las tablas ya existen en la base de datos")
+            await apply_schema_updates()
             # Asegurar que el usuario admin existe
             await create_admin_user()
-    except Exception as e:
-        print(f"⚠️  Error al verificar/inicializar base de datos: {e}")
-        import traceback
-        traceback.print_exc()
-        print("   Intentando forzar creación de tablas...")
+    except Exception:
+        logger.exception("Error al verificar/inicializar base de datos, intentando forzar creación de tablas")
         try:
             await init_database()
         except Exception as e2:
-            print(f"   ❌ Error al forzar creación: {e2}")
-            print("   Continuando de todas formas...")
+            logger.error("Error al forzar creación: %s. Continuando de todas formas...", e2)
     
     # Inicializar conexión RabbitMQ
-    print("🐰 Inicializando conexión RabbitMQ...")
+    logger.info("Inicializando conexión RabbitMQ...")
     try:
         await get_channel()
-        print("✅ Conexión RabbitMQ inicializada correctamente")
-    except Exception as e:
-        print(f"⚠️  Error al inicializar RabbitMQ: {e}")
-        print("   La aplicación continuará, pero los mensajes no se publicarán")
-        import traceback
-        traceback.print_exc()
+        logger.info("Conexión RabbitMQ inicializada correctamente")
+    except Exception:
+        logger.exception("Error al inicializar RabbitMQ. La aplicación continuará, pero los mensajes no se publicarán")
+    
+    # Zonas de entrega (índice espacial en memoria)
+    try:
+        load_delivery_zones()
+    except Exception:
+        logger.exception("Error al cargar las zonas de entrega")
+    
+    # Reconciliación periódica de las estadísticas del dashboard
+    start_stats_reconciliation()
+    
+    # Pool de workers para la autorización de pagos con tarjeta y escritura
+    # diferida del libro de pagos
+    start_payment_workers()
+    start_payment_ledger()
+    
+    # Retraso del event loop y detector de bloqueos (LOOP_BLOCKING_DEBUG)
+    start_loop_monitor()
     
     yield
     # Shutdown
-    print("🛑 Cerrando conexiones...")
+    logger.info("Cerrando conexiones...")
+    await stop_loop_monitor()
+    await stop_stats_reconciliation()
+    await stop_payment_workers()
+    await stop_payment_ledger()
     try:
         await close_connection()
     except Exception as e:
-        print(f"⚠️  Error al cerrar conexión RabbitMQ: {e}")
+        logger.warning("Error al cerrar conexión RabbitMQ: %s", e)
+    mark_worker_dead()
 
 app = FastAPI(
     title="SoftDomiFood API",
@@ -86,12 +116,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión gzip/brotli de respuestas grandes (COMPRESSION_MIN_BYTES)
+app.add_middleware(CompressionMiddleware)
+
+# Perfilado bajo demanda (X-Profile con token de admin, o muestreo)
+app.add_middleware(ProfilingMiddleware)
+
+# Métricas por ruta (GET /metrics)
+app.add_middleware(MetricsMiddleware)
+
+# Id de petición para correlacionar los logs (X-Request-ID)
+app.add_middleware(RequestIdMiddleware)
+
+@app.exception_handler(SingleFlightTimeout)
+async def single_flight_timeout_handler(request: Request, exc: SingleFlightTimeout):
+    """La consulta compartida sigue en curso: el cliente puede reintentar en breve"""
+    logger.warning("Lectura coalescida sin respuesta: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Servicio ocupado, intenta de nuevo"},
+        headers={"Retry-After": "1"},
+    )
+
 # Incluir routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(products.router, prefix="/api/products", tags=["products"])
 app.include_router(orders.router, prefix="/api/orders", tags=["orders"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 app.include_router(addresses.router, prefix="/api", tags=["addresses"])
+app.include_router(payments.router, prefix="/api/payments", tags=["payments"])
 
 @app.get("/")
 async def root():
@@ -110,6 +163,11 @@ async def health():
         "service": "producer"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     import uvicorn
     # Configuración segura: usar variables de entorno con valores por defecto seguros
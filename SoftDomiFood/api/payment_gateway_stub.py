@@ -0,0 +1,137 @@
+"""
+Pasarela de pagos simulada para pruebas de carga sin conexión.
+Implementa POST /v1/authorizations con latencia log-normal y distribuciones de
+rechazo y error configurables. La API la usa con:
+
+    PAYMENT_GATEWAY_URL=http://localhost:5055
+
+Uso:
+    python payment_gateway_stub.py --port 5055 --latency-median-ms 800 --decline-rate 0.08
+
+Configuración (argumentos o variables de entorno STUB_*):
+    --latency-median-ms   STUB_LATENCY_MEDIAN_MS   mediana de la latencia (800)
+    --latency-sigma       STUB_LATENCY_SIGMA       dispersión log-normal; 0.5 ≈ p99 3.2x la mediana
+    --decline-rate        STUB_DECLINE_RATE        fracción de pagos rechazados (0.05)
+    --error-rate          STUB_ERROR_RATE          fracción de respuestas 503 (0.0)
+    --timeout-rate        STUB_TIMEOUT_RATE        fracción de peticiones que no responden a tiempo (0.0)
+    --seed                STUB_SEED                semilla para resultados reproducibles
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+from collections import OrderedDict
+
+from fastapi import FastAPI, Header, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+
+# Motivos de rechazo con su peso relativo
+DECLINE_REASONS = {
+    "insufficient_funds": 0.55,
+    "do_not_honor": 0.25,
+    "expired_card": 0.10,
+    "incorrect_cvc": 0.07,
+    "suspected_fraud": 0.03,
+}
+
+# Respuestas recordadas por Idempotency-Key
+IDEMPOTENCY_CACHE_SIZE = 100_000
+
+
+class StubConfig:
+    latency_median_ms = float(os.getenv("STUB_LATENCY_MEDIAN_MS", "800"))
+    latency_sigma = float(os.getenv("STUB_LATENCY_SIGMA", "0.5"))
+    decline_rate = float(os.getenv("STUB_DECLINE_RATE", "0.05"))
+    error_rate = float(os.getenv("STUB_ERROR_RATE", "0.0"))
+    timeout_rate = float(os.getenv("STUB_TIMEOUT_RATE", "0.0"))
+    # Lo que tarda una petición "colgada" (mayor que el timeout del cliente)
+    timeout_seconds = float(os.getenv("STUB_TIMEOUT_SECONDS", "30"))
+
+
+class AuthorizationRequest(BaseModel):
+    paymentId: str
+    orderId: str
+    amount: float
+    currency: str = "COP"
+
+
+app = FastAPI(title="Payment Gateway Stub")
+_rng = random.Random(os.getenv("STUB_SEED"))
+_responses: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def sample_latency() -> float:
+    """Latencia en segundos con distribución log-normal"""
+    mu = math.log(max(StubConfig.latency_median_ms, 0.001) / 1000)
+    return _rng.lognormvariate(mu, StubConfig.latency_sigma)
+
+
+def sample_decline_reason() -> str:
+    reasons = list(DECLINE_REASONS)
+    return _rng.choices(reasons, weights=[DECLINE_REASONS[r] for r in reasons])[0]
+
+
+@app.post("/v1/authorizations")
+async def authorize(request: AuthorizationRequest, idempotency_key: Optional[str] = Header(None)):
+    if idempotency_key and idempotency_key in _responses:
+        return _responses[idempotency_key]
+
+    await asyncio.sleep(sample_latency())
+
+    roll = _rng.random()
+    if roll < StubConfig.timeout_rate:
+        await asyncio.sleep(StubConfig.timeout_seconds)
+        raise HTTPException(status_code=504, detail="Upstream timeout")
+    if roll < StubConfig.timeout_rate + StubConfig.error_rate:
+        raise HTTPException(status_code=503, detail="Acquirer unavailable")
+
+    if request.amount <= 0:
+        raise HTTPException(status_code=422, detail="Invalid amount")
+
+    if _rng.random() < StubConfig.decline_rate:
+        result = {"status": "DECLINED", "reason": sample_decline_reason(), "paymentId": request.paymentId}
+    else:
+        result = {
+            "status": "APPROVED",
+            "transactionId": f"STUB-{int(time.time() * 1000)}-{_rng.randint(100000, 999999)}",
+            "paymentId": request.paymentId,
+        }
+
+    if idempotency_key:
+        _responses[idempotency_key] = result
+        if len(_responses) > IDEMPOTENCY_CACHE_SIZE:
+            _responses.popitem(last=False)
+    return result
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "service": "payment-gateway-stub"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Pasarela de pagos simulada")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "5055")))
+    parser.add_argument("--latency-median-ms", type=float, default=StubConfig.latency_median_ms)
+    parser.add_argument("--latency-sigma", type=float, default=StubConfig.latency_sigma)
+    parser.add_argument("--decline-rate", type=float, default=StubConfig.decline_rate)
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate)
+    parser.add_argument("--timeout-rate", type=float, default=StubConfig.timeout_rate)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    StubConfig.latency_median_ms = args.latency_median_ms
+    StubConfig.latency_sigma = args.latency_sigma
+    StubConfig.decline_rate = args.decline_rate
+    StubConfig.error_rate = args.error_rate
+    StubConfig.timeout_rate = args.timeout_rate
+    if args.seed is not None:
+        _rng.seed(args.seed)
+
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+import logging
 from pydantic import BaseModel, Field
 from typing import Optional
 from routers.auth import get_current_user
 from services.database_service import create_address, get_user_addresses, get_address_by_id
+from services.delivery_zones import resolve_delivery_zone
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -36,6 +40,14 @@ async def create_user_address(
         if not address.zip_code or not address.zip_code.strip():
             raise HTTPException(status_code=422, detail="El campo 'zip_code' (código postal) es requerido")
         
+        # Rechazar aquí la dirección sin cobertura en lugar de fallar al pedir
+        delivery_zone = resolve_delivery_zone({"zipCode": address.zip_code.strip()})
+        if not delivery_zone:
+            raise HTTPException(
+                status_code=422,
+                detail=f"La dirección está fuera de nuestra zona de cobertura (código postal {address.zip_code.strip()})"
+            )
+        
         new_address = await create_address(
             user_id=current_user["userId"],
             street=address.street.strip(),
@@ -52,22 +64,21 @@ async def create_user_address(
         
         return {
             "message": "Address created successfully",
-            "address": new_address
+            "address": {**new_address, "deliveryZone": delivery_zone}
         }
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error creando la dirección")
         raise HTTPException(status_code=500, detail=f"Error creating address: {str(e)}")
 
 @router.get("/addresses")
 async def get_addresses(
     current_user: dict = Depends(get_current_user)
 ):
-    """Obtener todas las direcciones del usuario"""
+    """Obtener todas las direcciones del usuario con su zona de entrega (null si no tiene cobertura)"""
     addresses = await get_user_addresses(current_user["userId"])
-    return {"addresses": addresses}
+    return {"addresses": [{**address, "deliveryZone": resolve_delivery_zone(address)} for address in addresses]}
 
 @router.get("/addresses/{address_id}")
 async def get_address(
@@ -1,7 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from typing import Optional
-from services.database_service import get_all_orders, update_order_status, create_product, update_product, get_all_customers_with_addresses
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from datetime import date
+from typing import List, Optional
+from uuid import UUID
+from services.database_service import get_all_orders, update_order_status, create_product, update_product, get_all_customers_with_addresses, bulk_set_product_availability, bulk_update_product_prices
+from services.stats_service import get_dashboard_stats
+from services.query_stats import get_query_stats, reset_query_stats, SORT_KEYS
+from services.profiling import list_profiles, render_profile, PROFILE_FORMATS
+from services.loop_monitor import get_loop_stalls
+from services.order_export import open_orders_export, EXPORT_FORMATS
+from services.analytics_export import open_analytics_export, ANALYTICS_FORMATS, ANALYTICS_SCHEMAS, ANALYTICS_MAX_DAYS
 from routers.auth import get_current_user
 
 router = APIRouter()
@@ -25,6 +34,29 @@ class UpdateProductRequest(BaseModel):
     image: Optional[str] = None
     isAvailable: Optional[bool] = None
 
+# Mayor valor de products.price (DECIMAL(10, 2))
+MAX_PRICE = 99999999.99
+
+class BulkAvailabilityRequest(BaseModel):
+    productIds: Optional[List[UUID]] = None
+    category: Optional[str] = None
+    isAvailable: bool
+
+class BulkPriceRequest(BaseModel):
+    productIds: Optional[List[UUID]] = None
+    category: Optional[str] = None
+    percentage: Optional[float] = Field(default=None, gt=-100, le=1000)  # Ej: 10 sube un 10%, -5 baja un 5%
+    amount: Optional[float] = Field(default=None, ge=-MAX_PRICE, le=MAX_PRICE)  # Valor absoluto a sumar (negativo para restar)
+
+def validate_bulk_filters(product_ids: Optional[List[str]], category: Optional[str]):
+    """Validar que una operación masiva tenga al menos un filtro válido"""
+    if not product_ids and category is None:
+        raise HTTPException(status_code=400, detail="Debe indicar productIds o category")
+    if category is not None:
+        valid_categories = ["SALCHIPAPAS", "BEBIDAS", "ADICIONALES", "COMBOS"]
+        if category not in valid_categories:
+            raise HTTPException(status_code=400, detail=f"Invalid category. Must be one of: {', '.join(valid_categories)}")
+
 @router.get("/orders")
 async def get_all_orders_admin(current_user: dict = Depends(get_current_user)):
     """Obtener todos los pedidos (solo admin)"""
@@ -36,6 +68,139 @@ async def get_all_orders_admin(current_user: dict = Depends(get_current_user)):
     orders = await get_all_orders()
     return {"orders": orders}
 
+@router.get("/orders/export")
+async def export_orders(
+    format: str = Query("ndjson"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    archived: bool = Query(True),
+    current_user: dict = Depends(get_current_user)
+):
+    """Exportar pedidos en NDJSON o CSV por rango de fechas, en streaming (solo admin)"""
+    user_role = current_user.get("role")
+    if user_role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(EXPORT_FORMATS)}")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="from must be before to")
+
+    stream = await open_orders_export(format, date_from=date_from, date_to=date_to, include_archived=archived)
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"orders-{date_from or 'start'}-{date_to or 'end'}.{extension}"
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/analytics/export")
+async def export_analytics(
+    table: str = Query("orders"),
+    format: str = Query("parquet"),
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Exportar orders u order_items por rango de fechas en Arrow IPC o Parquet (solo admin)"""
+    user_role = current_user.get("role")
+    if user_role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if table not in ANALYTICS_SCHEMAS:
+        raise HTTPException(status_code=400, detail=f"Invalid table. Must be one of: {', '.join(ANALYTICS_SCHEMAS)}")
+    if format not in ANALYTICS_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(ANALYTICS_FORMATS)}")
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    if (date_to - date_from).days >= ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range cannot exceed {ANALYTICS_MAX_DAYS} days")
+
+    stream = await open_analytics_export(table, format, date_from, date_to)
+    media_type, extension = ANALYTICS_FORMATS[format]
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}-{date_from}-{date_to}.{extension}"'}
+    )
+
+@router.get("/stats")
+async def get_stats(
+    days: int = Query(30, ge=1, le=366),
+    current_user: dict = Depends(get_current_user)
+):
+    """Estadísticas del dashboard: ventas de hoy, por día, por hora, por estado y productos más vendidos (solo admin)"""
+    user_role = current_user.get("role")
+    if user_role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return await get_dashboard_stats(days=days)
+
+@router.get("/queries")
+async def get_queries(
+    limit: int = Query(20, ge=1, le=500),
+    sort: str = Query("totalMs"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Consultas a PostgreSQL agrupadas por huella, con las ejecuciones más lentas recientes (solo admin)"""
+    user_role = current_user.get("role")
+    if user_role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Must be one of: {', '.join(SORT_KEYS)}")
+
+    return get_query_stats(limit=limit, sort=sort)
+
+@router.delete("/queries")
+async def reset_queries(current_user: dict = Depends(get_current_user)):
+    """Reiniciar las estadísticas de consultas (solo admin)"""
+    user_role = current_user.get("role")
+    if user_role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    reset_query_stats()
+    return {"success": True}
+
+@router.get("/profiles")
+async def get_profiles(current_user: dict = Depends(get_current_user)):
+    """Perfiles de peticiones guardados en este worker (solo admin)"""
+    user_role = current_user.get("role")
+    if user_role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return {"profiles": list_profiles()}
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: str = Query("speedscope"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Descargar un perfil en formato speedscope o HTML (solo admin)"""
+    user_role = current_user.get("role")
+    if user_role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(PROFILE_FORMATS)}")
+
+    content = render_profile(profile_id, format)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type, extension = PROFILE_FORMATS[format]
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.{extension}"'}
+    )
+
+@router.get("/loop/stalls")
+async def get_stalls(current_user: dict = Depends(get_current_user)):
+    """Bloqueos recientes del event loop con la pila que los causó (solo admin, requiere LOOP_BLOCKING_DEBUG)"""
+    user_role = current_user.get("role")
+    if user_role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return {"stalls": get_loop_stalls()}
+
 @router.patch("/orders/{order_id}/status")
 async def update_order_status_admin(
     order_id: str,
@@ -127,6 +292,61 @@ async def update_existing_product(
         "product": product
     }
 
+@router.patch("/products/availability")
+async def bulk_update_availability(
+    request: BulkAvailabilityRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Activar o desactivar varios productos a la vez por IDs y/o categoría (solo admin)"""
+    user_role = current_user.get("role")
+    if user_role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    validate_bulk_filters(request.productIds, request.category)
+    
+    products = await bulk_set_product_availability(
+        is_available=request.isAvailable,
+        product_ids=request.productIds or None,
+        category=request.category
+    )
+    
+    return {
+        "message": "Products availability updated successfully",
+        "updated": len(products),
+        "products": products
+    }
+
+@router.patch("/products/prices")
+async def bulk_update_prices(
+    request: BulkPriceRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Ajustar precios de varios productos por porcentaje o valor absoluto (solo admin)"""
+    user_role = current_user.get("role")
+    if user_role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    validate_bulk_filters(request.productIds, request.category)
+    
+    if (request.percentage is None) == (request.amount is None):
+        raise HTTPException(status_code=400, detail="Debe indicar exactamente uno de: percentage, amount")
+    
+    try:
+        products = await bulk_update_product_prices(
+            percentage=request.percentage,
+            amount=request.amount,
+            product_ids=request.productIds or None,
+            category=request.category
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "message": "Products prices updated successfully",
+        "updated": len(products),
+        "products": products
+    }
+
 @router.get("/customers")
 async def get_all_customers(current_user: dict = Depends(get_current_user)):
     """Obtener todos los clientes con sus direcciones (solo admin)"""
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from services.auth_service import verify_password, get_password_hash, create_access_token, decode_token
+from services.auth_service import verify_password_async, get_password_hash_async, create_access_token, decode_token
 from services.database_service import get_user_by_email, create_user
 
 router = APIRouter()
@@ -35,7 +35,7 @@ async def register(request: RegisterRequest):
         raise HTTPException(status_code=400, detail="User already exists")
     
     # Hash de contraseña
-    hashed_password = get_password_hash(request.password)
+    hashed_password = await get_password_hash_async(request.password)
     
     # Crear usuario
     user = await create_user(request.email, hashed_password, request.name, request.phone)
@@ -66,7 +66,7 @@ async def login(request: LoginRequest):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Verificar contraseña
-    if not verify_password(request.password, user["password"]):
+    if not await verify_password_async(request.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Generar token
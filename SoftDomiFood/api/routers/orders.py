@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+import logging
 from typing import List, Optional
 from pydantic import BaseModel
 from enum import Enum
 from routers.auth import get_current_user
-from services.database_service import create_order, get_order_status, get_all_orders, get_user_orders, get_user_orders
+from services.database_service import create_order, get_order_status, get_all_orders, get_user_orders, get_user_order_detail, decode_order_cursor, get_address_by_id, get_products_by_ids
 from services.rabbitmq import publish_order
+from services.delivery_zones import resolve_delivery_zone
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -43,8 +47,21 @@ async def create_new_order(
         if not order_data.addressId:
             raise HTTPException(status_code=422, detail="Debe seleccionar una dirección de entrega")
         
-        # Importar función para obtener productos
-        from services.database_service import get_product_by_id
+        # Validar la dirección y resolver su zona de entrega (tarifa de domicilio).
+        # Sin caché: la copia de este worker puede no reflejar cambios hechos en otro
+        address = await get_address_by_id(order_data.addressId, cached=False)
+        if not address:
+            raise HTTPException(status_code=404, detail="Dirección de entrega no encontrada")
+        if address["userId"] != current_user["userId"]:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        delivery_zone = resolve_delivery_zone(address)
+        if not delivery_zone:
+            raise HTTPException(status_code=422, detail="La dirección de entrega está fuera de nuestra zona de cobertura")
+        
+        # Precios y disponibilidad en una sola consulta y sin caché: otro worker
+        # pudo cambiarlos sin invalidar la caché de este
+        products = await get_products_by_ids([item.productId for item in order_data.items])
         
         # Validar items y calcular precios si no se enviaron
         validated_items = []
@@ -54,8 +71,7 @@ async def create_new_order(
             if item.quantity <= 0:
                 raise HTTPException(status_code=422, detail=f"La cantidad del producto {item.productId} debe ser mayor a 0")
             
-            # Obtener producto para validar y obtener precio
-            product = await get_product_by_id(item.productId)
+            product = products.get(item.productId)
             if not product:
                 raise HTTPException(status_code=404, detail=f"Producto {item.productId} no encontrado")
             
@@ -63,7 +79,7 @@ async def create_new_order(
                 raise HTTPException(status_code=400, detail=f"El producto {product.get('name')} no está disponible")
             
             # Usar precio del producto si no se envió
-            item_price = item.price if item.price is not None else product.get("price", 0)
+            item_price = item.price if item.price is not None else float(product.get("price", 0))
             item_total = item_price * item.quantity
             calculated_total += item_total
             
@@ -79,6 +95,9 @@ async def create_new_order(
         if final_total <= 0:
             raise HTTPException(status_code=422, detail="El total del pedido debe ser mayor a 0")
         
+        # El total del pedido incluye el domicilio de la zona (se guarda también aparte)
+        final_total += delivery_zone["deliveryFee"]
+        
         # Crear orden en la base de datos
         order = await create_order(
             user_id=current_user["userId"],
@@ -86,7 +105,8 @@ async def create_new_order(
             items=validated_items,
             total=final_total,
             payment_method=order_data.paymentMethod.value,
-            notes=order_data.notes
+            notes=order_data.notes,
+            delivery_fee=delivery_zone["deliveryFee"]
         )
         
         if not order:
@@ -97,15 +117,14 @@ async def create_new_order(
             await publish_order(order)
         except Exception as mq_error:
             # Log el error pero no fallar la creación de la orden
-            print(f"⚠️  Error publicando a RabbitMQ: {mq_error}")
-            print("   La orden se creó pero no se publicó a la cola")
+            logger.warning("La orden se creó pero no se publicó a la cola: %s", mq_error,
+                           extra={"orderId": order.get("id")})
         
-        return {"order": order, "message": "Order created successfully"}
+        return {"order": order, "delivery": delivery_zone, "message": "Order created successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error creando la orden")
         raise HTTPException(status_code=500, detail=f"Error creating order: {str(e)}")
 
 @router.get("/{order_id}")
@@ -119,15 +138,39 @@ async def get_order(
         raise HTTPException(status_code=404, detail="Order not found")
     return {"order": order}
 
+@router.get("/{order_id}/details")
+async def get_order_details(
+    order_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Obtener un pedido con el detalle completo de sus productos"""
+    order = await get_user_order_detail(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    # Solo el dueño del pedido o un admin pueden ver el detalle
+    if order["userId"] != current_user.get("userId") and current_user.get("role") != "ADMIN":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return {"order": order}
+
 @router.get("/")
 async def get_orders(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_user)
 ):
-    """Obtener todos los pedidos del usuario autenticado"""
+    """Obtener el historial de pedidos del usuario autenticado, paginado por cursor"""
     # Validar que el usuario esté autenticado
     if not current_user or not current_user.get("userId"):
         raise HTTPException(status_code=401, detail="Usuario no autenticado")
     
-    # Solo devolver órdenes del usuario actual
-    orders = await get_user_orders(current_user["userId"])
-    return {"orders": orders}
+    # Solo devolver órdenes del usuario actual (resumen; el detalle está en /{order_id}/details)
+    after = None
+    if cursor:
+        try:
+            after = decode_order_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    return await get_user_orders(current_user["userId"], limit=limit, after=after)
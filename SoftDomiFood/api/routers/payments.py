@@ -1,7 +1,19 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from pydantic import BaseModel
 from enum import Enum
-import asyncio
+import uuid
+
+from routers.auth import get_current_user
+from services.database_service import get_order_for_payment
+from services.payment_processor import (
+    submit_card_payment,
+    register_cash_payment,
+    get_payment,
+    wait_for_payment,
+    PaymentQueueFull,
+    PENDING
+)
+from services.payment_ledger import get_ledger_payment
 
 router = APIRouter()
 
@@ -10,52 +22,90 @@ class PaymentMethodEnum(str, Enum):
     CARD = "CARD"
 
 class PaymentRequest(BaseModel):
-    amount: float
+    # El monto es el total del pedido guardado en la base de datos
     orderId: str
     paymentMethod: PaymentMethodEnum
 
+def is_valid_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
 @router.post("/process")
-async def process_payment(request: PaymentRequest):
+async def process_payment(
+    request: PaymentRequest,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Procesar pago según el método seleccionado
+    Procesar el pago de un pedido propio por su total según el método seleccionado
     - CASH: Pago en efectivo (se registra, no requiere validación)
-    - CARD: Pago con datáfono/tarjeta (simulación de validación)
+    - CARD: Pago con datáfono/tarjeta. Se encola y responde 202 con el paymentId;
+      el resultado se consulta en GET /api/payments/{paymentId}
+    Si el pedido ya tiene un pago vigente (pendiente o aprobado) con el mismo
+    método, se responde 200 con ese pago en lugar de cobrar de nuevo.
     """
-    if request.amount <= 0:
+    if not is_valid_uuid(request.orderId):
+        raise HTTPException(status_code=400, detail="Invalid orderId")
+    
+    order = await get_order_for_payment(request.orderId)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order["userId"] != current_user.get("userId"):
+        raise HTTPException(status_code=403, detail="Access denied")
+    if order["status"] == "CANCELLED":
+        raise HTTPException(status_code=409, detail="Order is cancelled")
+    amount = order["total"]
+    if amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be greater than 0")
     
     if request.paymentMethod == PaymentMethodEnum.CASH:
         # Pago en efectivo - siempre exitoso
-        return {
-            "success": True,
-            "message": "Payment method registered: Cash on delivery",
-            "transactionId": f"CASH-{int(asyncio.get_event_loop().time() * 1000)}",
-            "amount": request.amount,
-            "orderId": request.orderId,
-            "paymentMethod": "CASH"
-        }
+        payment, _ = await register_cash_payment(request.orderId, amount)
+        return {"success": True, **payment}
     
     elif request.paymentMethod == PaymentMethodEnum.CARD:
-        # Pago con datáfono - simular procesamiento
-        await asyncio.sleep(2)
-        
-        # Simular aprobación (95% éxito)
-        import random
-        success = random.random() > 0.05
-        
-        if success:
-            transaction_id = f"CARD-{int(asyncio.get_event_loop().time() * 1000)}-{random.randint(1000, 9999)}"
-            return {
-                "success": True,
-                "message": "Card payment processed successfully",
-                "transactionId": transaction_id,
-                "amount": request.amount,
-                "orderId": request.orderId,
-                "paymentMethod": "CARD"
-            }
-        else:
+        # Pago con datáfono - la autorización la realiza el pool de workers
+        try:
+            payment, created = await submit_card_payment(request.orderId, amount)
+        except PaymentQueueFull:
             raise HTTPException(
-                status_code=402,
-                detail="Card payment was rejected. Please verify your card and try again."
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Payment service is busy. Please try again in a moment.",
+                headers={"Retry-After": "5"}
             )
+        
+        if created:
+            response.status_code = status.HTTP_202_ACCEPTED
+        response.headers["Location"] = f"/api/payments/{payment['paymentId']}"
+        return payment
 
+@router.get("/{payment_id}")
+async def get_payment_status(
+    payment_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Segundos a esperar a que el pago finalice (long polling)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Consultar el estado de un pago con tarjeta (PENDING, APPROVED, DECLINED o FAILED)
+    de un pedido propio. Con ?wait=N la respuesta se retiene hasta que el pago
+    finalice o pasen N segundos.
+    """
+    if not is_valid_uuid(payment_id):
+        raise HTTPException(status_code=404, detail="Payment not found")
+    
+    # Pagos de otro worker o anteriores a la retención en memoria: desde el libro
+    payment = get_payment(payment_id) or await get_ledger_payment(payment_id)
+    if not payment:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    
+    # Solo el dueño del pedido o un admin; se verifica antes de retener la petición
+    order = await get_order_for_payment(payment["orderId"])
+    if not order or (order["userId"] != current_user.get("userId") and current_user.get("role") != "ADMIN"):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if payment["status"] == PENDING and wait > 0:
+        payment = await wait_for_payment(payment_id, wait) or payment
+    return payment
@@ -1,24 +1,38 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request, Response
 from typing import Optional
-from services.database_service import get_products, get_product_by_id
+from services.catalog_snapshot import get_catalog_snapshot, EncodedBody
+from services.compression import select_encoding
 
 router = APIRouter()
 
+def snapshot_response(request: Request, body: EncodedBody) -> Response:
+    """Responder con el cuerpo pre-codificado: 304 si el ETag coincide, gzip si el cliente lo acepta"""
+    use_gzip = select_encoding(request.headers.get("accept-encoding"), supported=("gzip",)) is not None
+    etag = body.gzip_etag if use_gzip else body.etag
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if body.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=body.gzip, media_type="application/json", headers=headers)
+    return Response(content=body.plain, media_type="application/json", headers=headers)
+
 @router.get("/")
 async def get_products_list(
+    request: Request,
     category: Optional[str] = Query(None),
     available: Optional[bool] = Query(None)
 ):
-    """Obtener lista de productos"""
-    products = await get_products(category=category, available=available)
-    return {"products": products}
+    """Obtener lista de productos (cuerpo pre-codificado de la instantánea del catálogo)"""
+    snapshot = await get_catalog_snapshot()
+    return snapshot_response(request, snapshot.list_body(category, available))
 
 @router.get("/{product_id}")
-async def get_product(product_id: str):
+async def get_product(request: Request, product_id: str):
     """Obtener producto por ID"""
-    product = await get_product_by_id(product_id)
-    if not product:
+    snapshot = await get_catalog_snapshot()
+    body = snapshot.products.get(product_id)
+    if body is None:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Product not found")
-    return {"product": product}
-
+    return snapshot_response(request, body)
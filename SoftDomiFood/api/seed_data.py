@@ -1,12 +1,16 @@
 """
 Script para poblar la base de datos con datos de ejemplo.
 Incluye productos, usuarios de prueba y pedidos de ejemplo.
+
+Con --generate crea un conjunto sintético a gran escala (synthetic_data.py):
+    python seed_data.py --generate --users 1000000 --orders 5000000 --seed 42
 """
 import asyncpg
 import os
 import asyncio
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from init_db import BACKFILL_ORDER_DOCUMENTS_SQL
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 
@@ -182,6 +186,7 @@ async def seed_sample_orders(conn: asyncpg.Connection, force_clear: bool = False
     try:
         if force_clear:
             await conn.execute("DELETE FROM order_items")
+            await conn.execute("DELETE FROM order_documents WHERE id IN (SELECT id FROM orders WHERE notes LIKE '%Pedido de ejemplo%')")
             await conn.execute("DELETE FROM orders WHERE notes LIKE '%Pedido de ejemplo%'")
         
         # Obtener usuarios de prueba
@@ -278,6 +283,8 @@ async def seed_database(force_clear: bool = False):
             # Poblar pedidos de ejemplo
             print("📋 Creando pedidos de ejemplo...")
             await seed_sample_orders(conn, force_clear)
+            # Los pedidos del seed se insertan directamente: crear sus documentos de lectura
+            await conn.execute(BACKFILL_ORDER_DOCUMENTS_SQL)
             print("")
             
             print("✅ Seed completado exitosamente!")
@@ -293,6 +300,10 @@ async def seed_database(force_clear: bool = False):
 
 if __name__ == "__main__":
     import sys
+    if "--generate" in sys.argv:
+        # Modo generador: millones de filas cargadas con COPY (ver synthetic_data.py)
+        from synthetic_data import main as generate_main
+        generate_main(sys.argv)
     force = "--force" in sys.argv or "-f" in sys.argv
     asyncio.run(seed_database(force_clear=force))
 
@@ -0,0 +1,310 @@
+"""
+Exportación analítica de pedidos en formato columnar (Arrow IPC o Parquet).
+Cada tabla (orders u order_items con la categoría del producto, activos y
+archivados) se lee de un cursor en lotes de ANALYTICS_BATCH_ROWS filas que se
+convierten en RecordBatch de Arrow con tipos fijos: decimales, timestamps y
+status, método de pago y categoría codificados como diccionario (con el mismo
+diccionario en todos los lotes, el de los enums de PostgreSQL).
+
+Los días ya cerrados se guardan en ANALYTICS_CACHE_DIR como un archivo Arrow
+por tabla y día; una exportación repetida lee esos archivos y solo consulta
+PostgreSQL por los días que faltan (agrupados en un solo cursor por tramo de
+días consecutivos). Un día se cierra cuando pasaron ANALYTICS_CLOSE_AFTER_DAYS
+días completos y, para orders, todos sus pedidos están entregados o cancelados.
+Los cambios posteriores al cierre no se reflejan en su archivo: basta con
+borrarlo para regenerarlo.
+
+La conversión a Arrow y la codificación (Parquet con zstd) corren en un hilo
+aparte para no bloquear el event loop.
+"""
+import asyncio
+import itertools
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, List, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from services.database_service import get_connection
+
+ANALYTICS_BATCH_ROWS = int(os.getenv("ANALYTICS_BATCH_ROWS", "20000"))
+ANALYTICS_MAX_DAYS = int(os.getenv("ANALYTICS_MAX_DAYS", "366"))
+ANALYTICS_CACHE_DIR = os.getenv(
+    "ANALYTICS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "softdomifood-analytics")
+)
+# Días completos que deben pasar antes de guardar un día en caché. "createdAt"
+# está en UTC y date.today() en hora local: el margen cubre también esa diferencia
+ANALYTICS_CLOSE_AFTER_DAYS = int(os.getenv("ANALYTICS_CLOSE_AFTER_DAYS", "1"))
+# Cambiar al modificar un esquema para no leer archivos de la versión anterior
+ANALYTICS_SCHEMA_VERSION = 2
+
+ANALYTICS_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+ORDER_STATUSES = ["PENDING", "CONFIRMED", "PREPARING", "READY", "ON_DELIVERY", "DELIVERED", "CANCELLED"]
+# Estados que ya no cambian: un día de orders solo se guarda en caché si todos sus pedidos los tienen
+FINAL_ORDER_STATUSES = {"DELIVERED", "CANCELLED"}
+PAYMENT_METHODS = ["CASH", "CARD"]
+PRODUCT_CATEGORIES = ["SALCHIPAPAS", "BEBIDAS", "ADICIONALES", "COMBOS"]
+
+# Columnas de diccionario: nombre -> valores posibles
+DICTIONARIES = {
+    "status": ORDER_STATUSES,
+    "paymentMethod": PAYMENT_METHODS,
+    "category": PRODUCT_CATEGORIES,
+}
+
+
+def _dictionary_type() -> pa.DataType:
+    return pa.dictionary(pa.int8(), pa.string())
+
+
+ANALYTICS_SCHEMAS = {
+    "orders": pa.schema([
+        ("id", pa.string()),
+        ("userId", pa.string()),
+        ("addressId", pa.string()),
+        ("status", _dictionary_type()),
+        ("total", pa.decimal128(10, 2)),
+        ("deliveryFee", pa.decimal128(10, 2)),
+        ("paymentMethod", _dictionary_type()),
+        ("notes", pa.string()),
+        ("createdAt", pa.timestamp("us")),
+        ("updatedAt", pa.timestamp("us")),
+    ]),
+    "order_items": pa.schema([
+        ("id", pa.string()),
+        ("orderId", pa.string()),
+        ("productId", pa.string()),
+        ("productName", pa.string()),
+        ("category", _dictionary_type()),
+        ("quantity", pa.int32()),
+        ("price", pa.decimal128(10, 2)),
+        ("createdAt", pa.timestamp("us")),
+    ]),
+}
+
+# Filas de un rango de "createdAt" ($1 inclusive, $2 exclusivo), activas y archivadas
+ANALYTICS_QUERIES = {
+    "orders": """
+        SELECT id::text AS id, "userId"::text AS "userId", "addressId"::text AS "addressId",
+               status::text AS status, total, "deliveryFee", "paymentMethod"::text AS "paymentMethod",
+               notes, "createdAt", "updatedAt"
+        FROM (
+            SELECT * FROM orders WHERE "createdAt" >= $1 AND "createdAt" < $2
+            UNION ALL
+            SELECT * FROM orders_archive WHERE "createdAt" >= $1 AND "createdAt" < $2
+        ) o
+        ORDER BY "createdAt", id
+    """,
+    "order_items": """
+        SELECT oi.id::text AS id, oi."orderId"::text AS "orderId", oi."productId"::text AS "productId",
+               p.name AS "productName", p.category::text AS category,
+               oi.quantity, oi.price, oi."createdAt"
+        FROM (
+            SELECT * FROM order_items WHERE "createdAt" >= $1 AND "createdAt" < $2
+            UNION ALL
+            SELECT * FROM order_items_archive WHERE "createdAt" >= $1 AND "createdAt" < $2
+        ) oi
+        JOIN products p ON p.id = oi."productId"
+        ORDER BY oi."createdAt", oi.id
+    """,
+}
+
+
+def rows_to_batch(table: str, rows: List) -> pa.RecordBatch:
+    """Convertir filas de ANALYTICS_QUERIES[table] en un RecordBatch con el esquema de la tabla"""
+    schema = ANALYTICS_SCHEMAS[table]
+    arrays = []
+    for field in schema:
+        values = [row[field.name] for row in rows]
+        if field.name in DICTIONARIES:
+            dictionary = DICTIONARIES[field.name]
+            codes = {value: index for index, value in enumerate(dictionary)}
+            indices = pa.array([codes.get(value) for value in values], pa.int8())
+            arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(dictionary, pa.string())))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def cache_path(table: str, day: date) -> str:
+    return os.path.join(ANALYTICS_CACHE_DIR, f"{table}-v{ANALYTICS_SCHEMA_VERSION}-{day.isoformat()}.arrow")
+
+
+def is_closed_day(day: date) -> bool:
+    """Un día se puede guardar en caché cuando terminó hace al menos ANALYTICS_CLOSE_AFTER_DAYS días"""
+    return day < date.today() - timedelta(days=ANALYTICS_CLOSE_AFTER_DAYS)
+
+
+def is_settled(table: str, batches: List[pa.RecordBatch]) -> bool:
+    """Las filas del día ya no cambian (en orders, todos los pedidos finalizados)"""
+    if table != "orders":
+        return True
+    return all(
+        status in FINAL_ORDER_STATUSES
+        for batch in batches
+        for status in batch.column("status").to_pylist()
+    )
+
+
+def _read_cached_day(table: str, day: date) -> List[pa.RecordBatch]:
+    with pa.memory_map(cache_path(table, day)) as source:
+        reader = pa.ipc.open_file(source)
+        return [reader.get_batch(i) for i in range(reader.num_record_batches)]
+
+
+def _write_cached_day(table: str, day: date, batches: List[pa.RecordBatch]):
+    """Escribir el archivo del día de forma atómica (archivo temporal + rename)"""
+    os.makedirs(ANALYTICS_CACHE_DIR, exist_ok=True)
+    path = cache_path(table, day)
+    fd, tmp_path = tempfile.mkstemp(dir=ANALYTICS_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f, pa.ipc.new_file(f, ANALYTICS_SCHEMAS[table]) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+async def _cache_closed_day(table: str, day: date, batches: List[pa.RecordBatch]):
+    """Guardar un día en caché si ya está cerrado (también si no tiene filas)"""
+    if is_closed_day(day) and is_settled(table, batches):
+        await asyncio.to_thread(_write_cached_day, table, day, batches)
+
+
+class _ChunkSink:
+    """Archivo de solo escritura que acumula bytes hasta que se drenan hacia la respuesta"""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _open_writer(fmt: str, sink: _ChunkSink, schema: pa.Schema):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    return pa.ipc.new_stream(sink, schema)
+
+
+def _write_batches(writer, sink: _ChunkSink, batches: List[pa.RecordBatch]) -> bytes:
+    """Codificar lotes y devolver los bytes producidos (se ejecuta en un hilo)"""
+    for batch in batches:
+        writer.write_batch(batch)
+    return sink.drain()
+
+
+def _close_writer(writer, sink: _ChunkSink) -> bytes:
+    """Cerrar el escritor (último row group y pie de Parquet) y devolver los bytes restantes"""
+    writer.close()
+    return sink.drain()
+
+
+def _plan_segments(table: str, days: List[date]) -> List[Tuple[bool, List[date]]]:
+    """Tramos de días consecutivos: (True, días) en caché o (False, días) por consultar"""
+    segments: List[Tuple[bool, List[date]]] = []
+    for day in days:
+        cached = is_closed_day(day) and os.path.exists(cache_path(table, day))
+        if segments and segments[-1][0] == cached:
+            segments[-1][1].append(day)
+        else:
+            segments.append((cached, [day]))
+    return segments
+
+
+async def _fetch_day_batches(conn, table: str, first_day: date, last_day: date) -> AsyncIterator[Tuple[date, pa.RecordBatch]]:
+    """Lotes de un tramo de días, en orden; cada lote pertenece a un solo día"""
+    async with conn.transaction(readonly=True):
+        cursor = await conn.cursor(
+            ANALYTICS_QUERIES[table],
+            datetime.combine(first_day, time.min),
+            datetime.combine(last_day + timedelta(days=1), time.min)
+        )
+        while True:
+            rows = await cursor.fetch(ANALYTICS_BATCH_ROWS)
+            if not rows:
+                break
+            for day, day_rows in itertools.groupby(rows, key=lambda row: row["createdAt"].date()):
+                yield day, await asyncio.to_thread(rows_to_batch, table, list(day_rows))
+
+
+async def open_analytics_export(table: str, fmt: str, date_from: date, date_to: date) -> AsyncIterator[bytes]:
+    """
+    Devolver el iterador de bytes de la exportación de table entre date_from y
+    date_to (ambos inclusive). Si falta algún día en caché se conecta antes de
+    responder, para devolver un error HTTP si la base de datos no está disponible.
+    """
+    if table not in ANALYTICS_SCHEMAS:
+        raise ValueError(f"table debe ser una de: {', '.join(ANALYTICS_SCHEMAS)}")
+    if fmt not in ANALYTICS_FORMATS:
+        raise ValueError(f"fmt debe ser uno de: {', '.join(ANALYTICS_FORMATS)}")
+
+    days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    segments = await asyncio.to_thread(_plan_segments, table, days)
+    conn = await get_connection() if any(not cached for cached, _ in segments) else None
+    return _stream_export(conn, table, fmt, segments)
+
+
+async def _stream_export(conn, table: str, fmt: str, segments: List[Tuple[bool, List[date]]]) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    writer = _open_writer(fmt, sink, ANALYTICS_SCHEMAS[table])
+    try:
+        for cached, days in segments:
+            if cached:
+                for day in days:
+                    batches = await asyncio.to_thread(_read_cached_day, table, day)
+                    chunk = await asyncio.to_thread(_write_batches, writer, sink, batches)
+                    if chunk:
+                        yield chunk
+                continue
+
+            # Los días del tramo se guardan en caché a medida que se completan
+            day_batches: List[pa.RecordBatch] = []
+            next_day = 0
+            async for day, batch in _fetch_day_batches(conn, table, days[0], days[-1]):
+                while days[next_day] < day:
+                    await _cache_closed_day(table, days[next_day], day_batches)
+                    day_batches = []
+                    next_day += 1
+                day_batches.append(batch)
+                chunk = await asyncio.to_thread(_write_batches, writer, sink, [batch])
+                if chunk:
+                    yield chunk
+            for day in days[next_day:]:
+                await _cache_closed_day(table, day, day_batches)
+                day_batches = []
+        yield await asyncio.to_thread(_close_writer, writer, sink)
+    finally:
+        if conn is not None:
+            await conn.close()
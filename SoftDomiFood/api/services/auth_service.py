@@ -1,11 +1,15 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
+import time
 from typing import Optional, Dict, Any
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from services.database_service import get_user_by_email, create_user
+from services.metrics import BCRYPT_QUEUE_DEPTH, BCRYPT_LATENCY
 
 # Configuración JWT
 SECRET_KEY = os.getenv("JWT_SECRET", "your-super-secret-jwt-key-change-in-production")
@@ -28,6 +32,28 @@ def get_password_hash(password: str) -> str:
     """Hash de contraseña usando bcrypt"""
     return pwd_context.hash(password)
 
+# bcrypt tarda decenas de milisegundos de CPU: en los endpoints se ejecuta en un
+# pool de hilos propio para no bloquear el event loop (bcrypt libera el GIL)
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+_bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+
+async def _run_bcrypt(operation: str, func, *args):
+    BCRYPT_QUEUE_DEPTH.inc()
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, func, *args)
+    finally:
+        BCRYPT_QUEUE_DEPTH.dec()
+        BCRYPT_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verificar contraseña sin bloquear el event loop"""
+    return await _run_bcrypt("verify", verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash de contraseña sin bloquear el event loop"""
+    return await _run_bcrypt("hash", get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crear token JWT"""
     to_encode = data.copy()
@@ -0,0 +1,60 @@
+"""
+Caché en memoria con expiración (TTL) para lecturas frecuentes.
+Cada worker de uvicorn mantiene su propia copia; el TTL acota el
+tiempo que un worker puede servir datos que otro ya modificó.
+"""
+import os
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Caché clave-valor en proceso con expiración por entrada"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        # Aumenta con cada invalidación: quien lee de la BD y luego guarda puede
+        # detectar que los datos cambiaron mientras tanto
+        self.generation = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Obtener valor si existe y no ha expirado"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Guardar valor con el TTL configurado"""
+        if self.ttl_seconds <= 0:
+            return
+        if len(self._entries) >= self.max_entries and key not in self._entries:
+            # Descartar la entrada más antigua (los dicts conservan orden de inserción)
+            self._entries.pop(next(iter(self._entries)), None)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Invalidar una clave o, si no se indica, toda la caché"""
+        self.generation += 1
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Catálogo de productos: listados por (categoría, disponibilidad) y productos por ID
+catalog_cache = TTLCache(float(os.getenv("CATALOG_CACHE_TTL", "30")))
+
+# Libreta de direcciones por usuario y dueño de cada dirección. create_address
+# solo invalida la copia del worker que atendió la petición: el TTL corto acota
+# cuánto tiempo los demás muestran una libreta sin la dirección nueva
+address_cache = TTLCache(float(os.getenv("ADDRESS_CACHE_TTL", "5")), max_entries=10000)
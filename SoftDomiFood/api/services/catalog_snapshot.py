@@ -0,0 +1,124 @@
+"""
+Instantánea pre-serializada del catálogo de productos.
+El menú es pequeño y cambia poco: en lugar de consultar, convertir y codificar
+en JSON en cada GET /api/products, se guarda el cuerpo de respuesta ya
+codificado (sin comprimir y en gzip, con su ETag) para cada combinación
+(categoría, disponibilidad) y para cada producto.
+
+La instantánea se guarda en catalog_cache: expira con CATALOG_CACHE_TTL y se
+descarta con cada invalidación del catálogo (crear/editar productos y
+operaciones masivas). Se reconstruye completa y se reemplaza de una sola vez,
+de modo que una petición nunca ve una mezcla de catálogo viejo y nuevo; si el
+catálogo se invalida mientras se construye, el resultado no se guarda.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.cache import catalog_cache
+from services.database_service import get_products
+from services.single_flight import SingleFlight
+
+CATALOG_SNAPSHOT_KEY = ("catalog_snapshot",)
+
+CATALOG_CATEGORIES = (None, "SALCHIPAPAS", "BEBIDAS", "ADICIONALES", "COMBOS")
+CATALOG_AVAILABILITY = (None, True, False)
+
+# Columnas de GET /api/products/{product_id} (las de get_product_by_id)
+PRODUCT_FIELDS = ("id", "name", "description", "price", "image", "category", "isAvailable")
+
+_snapshot_flight = SingleFlight("catalog_snapshot")
+
+
+class EncodedBody:
+    """Cuerpo JSON ya codificado, en claro y en gzip, con un ETag por representación"""
+
+    __slots__ = ("plain", "gzip", "etag", "gzip_etag")
+
+    def __init__(self, plain: bytes):
+        digest = hashlib.blake2b(plain, digest_size=8).hexdigest()
+        self.plain = plain
+        self.gzip = gzip.compress(plain, compresslevel=9, mtime=0)
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Comparación débil de If-None-Match contra cualquiera de las representaciones"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+
+class CatalogSnapshot:
+    """Cuerpos pre-codificados de un catálogo completo (inmutable una vez construido)"""
+
+    __slots__ = ("lists", "products", "empty_list", "size")
+
+    def __init__(self, lists: Dict[Tuple[Optional[str], Optional[bool]], EncodedBody],
+                 products: Dict[str, EncodedBody], empty_list: EncodedBody, size: int):
+        self.lists = lists
+        self.products = products
+        self.empty_list = empty_list
+        self.size = size
+
+    def list_body(self, category: Optional[str], available: Optional[bool]) -> EncodedBody:
+        # Una categoría desconocida no tiene productos
+        return self.lists.get((category, available), self.empty_list)
+
+
+def _json_default(value: Any) -> Any:
+    # Igual que jsonable_encoder de FastAPI: Decimal como número
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_json(content: Any) -> bytes:
+    """Los mismos bytes que produciría JSONResponse"""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_json_default
+    ).encode("utf-8")
+
+
+def build_catalog_snapshot(products: List[Dict[str, Any]]) -> CatalogSnapshot:
+    """Codificar todas las vistas del catálogo (products en el orden del listado)"""
+    lists = {}
+    for category in CATALOG_CATEGORIES:
+        for available in CATALOG_AVAILABILITY:
+            selected = [
+                product for product in products
+                if (category is None or product["category"] == category)
+                and (available is None or product["isAvailable"] == available)
+            ]
+            lists[(category, available)] = EncodedBody(encode_json({"products": selected}))
+
+    by_id = {
+        product["id"]: EncodedBody(encode_json({"product": {field: product[field] for field in PRODUCT_FIELDS}}))
+        for product in products
+    }
+    return CatalogSnapshot(lists, by_id, EncodedBody(encode_json({"products": []})), len(products))
+
+
+async def _rebuild_snapshot(generation: int) -> CatalogSnapshot:
+    products = await get_products()
+    snapshot = await asyncio.to_thread(build_catalog_snapshot, products)
+    # Si el catálogo cambió durante la construcción, servirla a quien la pidió
+    # pero no guardarla: la siguiente petición construye una nueva
+    if catalog_cache.generation == generation:
+        catalog_cache.set(CATALOG_SNAPSHOT_KEY, snapshot)
+    return snapshot
+
+
+async def get_catalog_snapshot() -> CatalogSnapshot:
+    """Instantánea vigente; las peticiones concurrentes comparten una sola reconstrucción"""
+    snapshot = catalog_cache.get(CATALOG_SNAPSHOT_KEY)
+    if snapshot is not None:
+        return snapshot
+
+    # Una reconstrucción iniciada antes de la última invalidación no sirve
+    generation = catalog_cache.generation
+    return await _snapshot_flight.do(generation, lambda: _rebuild_snapshot(generation))
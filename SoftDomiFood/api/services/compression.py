@@ -0,0 +1,142 @@
+"""
+Compresión de respuestas HTTP (gzip y brotli) según Accept-Encoding.
+Se comprimen solo las respuestas completas (sin more_body) de tipos de texto
+o JSON que no traen ya Content-Encoding y miden al menos
+COMPRESSION_MIN_BYTES. Las respuestas en streaming (exportaciones, NDJSON) y
+los formatos ya comprimidos (imágenes, Parquet) pasan sin cambios.
+
+Los cuerpos de más de COMPRESSION_OFFLOAD_BYTES se comprimen en el pool de
+hilos para no bloquear el event loop (zlib y brotli liberan el GIL).
+"""
+import asyncio
+import gzip
+import os
+import time
+from typing import Optional, Tuple
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+
+from services.metrics import HTTP_COMPRESSION_BYTES, HTTP_COMPRESSION_SECONDS
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_OFFLOAD_BYTES = int(os.getenv("COMPRESSION_OFFLOAD_BYTES", "65536"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Calidad 4-5: buena relación entre tamaño y CPU para respuestas dinámicas
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Codificaciones soportadas, en orden de preferencia ante un empate de q
+ENCODINGS = ("br", "gzip")
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+
+def select_encoding(accept_encoding: Optional[str], supported: Tuple[str, ...] = ENCODINGS) -> Optional[str]:
+    """Codificación de supported con mayor q en Accept-Encoding (None si no hay ninguna)"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    start = time.perf_counter()
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+    HTTP_COMPRESSION_SECONDS.labels(encoding).observe(time.perf_counter() - start)
+    return compressed
+
+
+class CompressionMiddleware:
+    """Middleware ASGI: comprime el cuerpo de las respuestas según Accept-Encoding"""
+
+    def __init__(self, app, min_size: Optional[int] = None, offload_size: Optional[int] = None):
+        self.app = app
+        self.min_size = COMPRESSION_MIN_BYTES if min_size is None else min_size
+        self.offload_size = COMPRESSION_OFFLOAD_BYTES if offload_size is None else offload_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                # Se retiene hasta ver el primer bloque del cuerpo
+                start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            headers = MutableHeaders(scope=start_message)
+            body = message.get("body", b"")
+            candidate = "content-encoding" not in headers and is_compressible(headers.get("content-type", ""))
+            if candidate:
+                headers.add_vary_header("Accept-Encoding")
+
+            compressed = None
+            if candidate and not message.get("more_body", False) and len(body) >= self.min_size:
+                if len(body) > self.offload_size:
+                    compressed = await asyncio.to_thread(compress, body, encoding)
+                else:
+                    compressed = compress(body, encoding)
+                HTTP_COMPRESSION_BYTES.labels(encoding, "in").inc(len(body))
+                HTTP_COMPRESSION_BYTES.labels(encoding, "out").inc(len(compressed))
+
+            if compressed is None or len(compressed) >= len(body):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            # El cuerpo ya no es idéntico byte a byte al original
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,14 +1,39 @@
 import asyncpg
+import base64
+import json
 import os
+import time
 import uuid
 from datetime import datetime, date
 from typing import List, Dict, Any, Optional
+from services.cache import catalog_cache, address_cache
+from services.metrics import DB_CONNECT_LATENCY, DB_CONNECTIONS_IN_USE, DB_CONNECT_FAILURES
+from services.query_stats import InstrumentedConnection
+from services.single_flight import SingleFlight
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 
+# Lecturas idénticas concurrentes comparten una sola consulta
+_catalog_flight = SingleFlight("catalog")
+_product_flight = SingleFlight("product")
+_user_flight = SingleFlight("user")
+
 async def get_connection():
     """Obtener conexión a PostgreSQL"""
-    return await asyncpg.connect(DATABASE_URL)
+    start = time.perf_counter()
+    try:
+        conn = await asyncpg.connect(DATABASE_URL, connection_class=InstrumentedConnection)
+    except Exception:
+        DB_CONNECT_FAILURES.inc()
+        raise
+    conn.connect_wait = time.perf_counter() - start
+    DB_CONNECT_LATENCY.observe(conn.connect_wait)
+    DB_CONNECTIONS_IN_USE.inc()
+    conn.add_termination_listener(_on_connection_closed)
+    return conn
+
+def _on_connection_closed(conn):
+    DB_CONNECTIONS_IN_USE.dec()
 
 def convert_uuid_to_str(data: Any) -> Any:
     """Convertir UUIDs y fechas a strings en diccionarios o listas"""
@@ -33,6 +58,19 @@ def convert_value(value: Any) -> Any:
 
 async def get_products(category: Optional[str] = None, available: Optional[bool] = None) -> List[Dict[str, Any]]:
     """Obtener lista de productos"""
+    cache_key = ("products", category, available)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    # Con la generación en la clave, una lectura posterior a una invalidación
+    # no se une a una consulta iniciada antes de ella
+    return await _catalog_flight.do(
+        (cache_key, catalog_cache.generation), lambda: _fetch_products(category, available)
+    )
+
+async def _fetch_products(category: Optional[str], available: Optional[bool]) -> List[Dict[str, Any]]:
+    cache_key = ("products", category, available)
+    generation = catalog_cache.generation
     conn = await get_connection()
     try:
         query = "SELECT id, name, description, price, image, category, \"isAvailable\", \"createdAt\" FROM products WHERE 1=1"
@@ -50,81 +88,102 @@ async def get_products(category: Optional[str] = None, available: Optional[bool]
         query += " ORDER BY \"createdAt\" DESC"
         
         rows = await conn.fetch(query, *params)
-        return [convert_uuid_to_str(dict(row)) for row in rows]
+        products = [convert_uuid_to_str(dict(row)) for row in rows]
+        # Un catálogo invalidado durante la consulta no se guarda
+        if catalog_cache.generation == generation:
+            catalog_cache.set(cache_key, products)
+        return products
     finally:
         await conn.close()
 
 async def get_product_by_id(product_id: str) -> Optional[Dict[str, Any]]:
     """Obtener producto por ID"""
+    cache_key = ("product", product_id)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await _product_flight.do((cache_key, catalog_cache.generation), lambda: _fetch_product(product_id))
+
+async def _fetch_product(product_id: str) -> Optional[Dict[str, Any]]:
+    generation = catalog_cache.generation
     conn = await get_connection()
     try:
         row = await conn.fetchrow(
             'SELECT id, name, description, price, image, category, "isAvailable" FROM products WHERE id = $1',
             product_id
         )
-        return convert_uuid_to_str(dict(row)) if row else None
+        if not row:
+            return None
+        product = convert_uuid_to_str(dict(row))
+        if catalog_cache.generation == generation:
+            catalog_cache.set(("product", product_id), product)
+        return product
+    finally:
+        await conn.close()
+
+async def get_products_by_ids(product_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Obtener varios productos por ID en una sola consulta, sin caché: al crear un
+    pedido, la copia de este worker puede no reflejar cambios de precio o
+    disponibilidad hechos en otro. Los IDs inválidos o inexistentes no aparecen.
+    """
+    ids = set()
+    for product_id in product_ids:
+        try:
+            ids.add(uuid.UUID(str(product_id)))
+        except ValueError:
+            continue
+    if not ids:
+        return {}
+    
+    conn = await get_connection()
+    try:
+        rows = await conn.fetch(
+            'SELECT id, name, description, price, image, category, "isAvailable" FROM products WHERE id = ANY($1::uuid[])',
+            list(ids)
+        )
+        products = [convert_uuid_to_str(dict(row)) for row in rows]
+        return {product["id"]: product for product in products}
     finally:
         await conn.close()
 
-async def create_order(user_id: str, address_id: str, items: List[Dict], total: float, payment_method: str = "CASH", notes: Optional[str] = None) -> Dict[str, Any]:
-    """Crear pedido en la base de datos"""
+async def create_order(user_id: str, address_id: str, items: List[Dict], total: float, payment_method: str = "CASH", notes: Optional[str] = None,
+                       delivery_fee: float = 0) -> Dict[str, Any]:
+    """Crear pedido en la base de datos junto con su documento de lectura (total ya incluye delivery_fee)"""
     conn = await get_connection()
     try:
         async with conn.transaction():
             # Crear orden
             order_id = await conn.fetchval(
                 """
-                INSERT INTO orders (id, "userId", "addressId", status, total, "paymentMethod", notes, "createdAt", "updatedAt")
-                VALUES (gen_random_uuid(), $1, $2, $3, $4, $5, $6, NOW(), NOW())
+                INSERT INTO orders (id, "userId", "addressId", status, total, "deliveryFee", "paymentMethod", notes, "createdAt", "updatedAt")
+                VALUES (gen_random_uuid(), $1, $2, $3, $4, $5, $6, $7, NOW(), NOW())
                 RETURNING id
                 """,
-                user_id, address_id, "PENDING", total, payment_method, notes
+                user_id, address_id, "PENDING", total, delivery_fee, payment_method, notes
             )
             
             # Crear items de la orden
-            for item in items:
-                await conn.execute(
-                    """
-                    INSERT INTO order_items (id, "orderId", "productId", quantity, price, "createdAt")
-                    VALUES (gen_random_uuid(), $1, $2, $3, $4, NOW())
-                    """,
-                    order_id, item["productId"], item["quantity"], item["price"]
-                )
-            
-            # Obtener orden completa con items
-            order = await conn.fetchrow(
+            await conn.executemany(
                 """
-                SELECT id, "userId", "addressId", status, total, "paymentMethod", notes, "createdAt", "updatedAt"
-                FROM orders WHERE id = $1
+                INSERT INTO order_items (id, "orderId", "productId", quantity, price, "createdAt")
+                VALUES (gen_random_uuid(), $1, $2, $3, $4, NOW())
                 """,
-                order_id
+                [(order_id, item["productId"], item["quantity"], item["price"]) for item in items]
             )
             
-            if not order:
-                return None
-            
-            order_dict = convert_uuid_to_str(dict(order))
-            
-            # Agregar items a la orden
-            order_items = await conn.fetch(
+            # Documento desnormalizado (items, cliente y dirección) en la misma transacción
+            document = await conn.fetchval(
                 """
-                SELECT "productId", quantity, price
-                FROM order_items
-                WHERE "orderId" = $1
+                INSERT INTO order_documents (id, "userId", status, "createdAt", "updatedAt", document)
+                SELECT o.id, o."userId", o.status, o."createdAt", o."updatedAt", build_order_document(o.id)
+                FROM orders o WHERE o.id = $1
+                RETURNING document
                 """,
                 order_id
             )
-            # Convertir items y asegurar formato consistente
-            items_list = []
-            for item in order_items:
-                item_dict = convert_uuid_to_str(dict(item))
-                # Asegurar que productId esté presente (puede venir como product_id)
-                if 'productId' not in item_dict and 'product_id' in item_dict:
-                    item_dict['productId'] = item_dict.pop('product_id')
-                items_list.append(item_dict)
-            order_dict['items'] = items_list
             
-            return order_dict
+            return json.loads(document) if document else None
     finally:
         await conn.close()
 
@@ -143,52 +202,101 @@ async def get_order_status(order_id: str) -> Optional[Dict[str, Any]]:
     finally:
         await conn.close()
 
-async def get_user_orders(user_id: str) -> List[Dict[str, Any]]:
-    """Obtener todas las órdenes de un usuario específico"""
+async def get_order_for_payment(order_id: str) -> Optional[Dict[str, Any]]:
+    """Obtener dueño, total y estado de un pedido (activo o archivado) para cobrarlo"""
     conn = await get_connection()
     try:
-        orders = await conn.fetch(
+        order = await conn.fetchrow(
             """
-            SELECT 
-                o.id, 
-                o.status, 
-                o.total, 
-                o."paymentMethod", 
-                o.notes,
-                o."createdAt", 
-                o."updatedAt",
-                o."addressId"
-            FROM orders o
-            WHERE o."userId" = $1
-            ORDER BY o."createdAt" DESC
+            SELECT id, "userId", total::float AS total, status FROM orders WHERE id = $1
+            UNION ALL
+            SELECT id, "userId", total::float AS total, status FROM orders_archive WHERE id = $1
+            LIMIT 1
             """,
-            user_id
+            order_id
+        )
+        return convert_uuid_to_str(dict(order)) if order else None
+    finally:
+        await conn.close()
+
+# Número de nombres de producto incluidos en el resumen de cada pedido
+ORDER_SUMMARY_PRODUCT_NAMES = 3
+
+def encode_order_cursor(created_at: str, order_id: str) -> str:
+    """Codificar la posición ("createdAt", id) de un pedido como cursor opaco"""
+    raw = f"{created_at}|{order_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_order_cursor(cursor: str) -> tuple:
+    """Decodificar un cursor de pedidos. Lanza ValueError si es inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, order_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(order_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+def summarize_order_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Proyección compacta de un documento de pedido para el historial del cliente"""
+    items = document.get("items") or []
+    return {
+        "id": document.get("id"),
+        "status": document.get("status"),
+        "total": document.get("total"),
+        "deliveryFee": document.get("deliveryFee", 0),
+        "paymentMethod": document.get("paymentMethod"),
+        "notes": document.get("notes"),
+        "createdAt": document.get("createdAt"),
+        "updatedAt": document.get("updatedAt"),
+        "addressId": document.get("addressId"),
+        "itemCount": document.get("itemCount", sum(item.get("quantity", 0) for item in items)),
+        "productNames": [item.get("product_name") for item in items[:ORDER_SUMMARY_PRODUCT_NAMES]],
+    }
+
+async def get_user_orders(user_id: str, limit: int = 20, after: Optional[tuple] = None) -> Dict[str, Any]:
+    """
+    Obtener una página del historial de pedidos de un usuario (resumen, sin detalle de items).
+    after es la posición ("createdAt", id) ya decodificada de decode_order_cursor.
+    """
+    created_before, id_before = after if after else (None, None)
+    
+    conn = await get_connection()
+    try:
+        # Keyset pagination sobre idx_order_documents_user_created: se pide un
+        # registro extra para saber si existe una página siguiente
+        rows = await conn.fetch(
+            """
+            SELECT id, "createdAt", document
+            FROM order_documents
+            WHERE "userId" = $1
+              AND ($2::timestamp IS NULL OR ("createdAt", id) < ($2::timestamp, $3::uuid))
+            ORDER BY "createdAt" DESC, id DESC
+            LIMIT $4
+            """,
+            user_id, created_before, id_before, limit + 1
         )
         
-        orders_list = [convert_uuid_to_str(dict(row)) for row in orders]
+        page = rows[:limit]
+        orders_list = [summarize_order_document(json.loads(row['document'])) for row in page]
         
-        # Para cada orden, obtener sus items
-        for order in orders_list:
-            items = await conn.fetch(
-                """
-                SELECT 
-                    oi.id,
-                    oi.quantity,
-                    oi.price,
-                    p.id as product_id,
-                    p.name as product_name,
-                    p.description as product_description,
-                    p.category as product_category
-                FROM order_items oi
-                JOIN products p ON oi."productId" = p.id
-                WHERE oi."orderId" = $1
-                ORDER BY oi."createdAt"
-                """,
-                order['id']
-            )
-            order['items'] = [convert_uuid_to_str(dict(item)) for item in items]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = encode_order_cursor(last['createdAt'].isoformat(), str(last['id']))
         
-        return orders_list
+        return {"orders": orders_list, "nextCursor": next_cursor}
+    finally:
+        await conn.close()
+
+async def get_user_order_detail(order_id: str) -> Optional[Dict[str, Any]]:
+    """Obtener un pedido con el detalle completo de sus items"""
+    conn = await get_connection()
+    try:
+        document = await conn.fetchval(
+            'SELECT document FROM order_documents WHERE id = $1',
+            order_id
+        )
+        return json.loads(document) if document else None
     finally:
         await conn.close()
 
@@ -206,6 +314,9 @@ async def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
 
 async def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
     """Obtener usuario por ID"""
+    return await _user_flight.do(user_id, lambda: _fetch_user(user_id))
+
+async def _fetch_user(user_id: str) -> Optional[Dict[str, Any]]:
     conn = await get_connection()
     try:
         user = await conn.fetchrow(
@@ -241,66 +352,16 @@ async def get_all_orders() -> List[Dict[str, Any]]:
     """Obtener todos los pedidos con información completa del cliente, dirección y productos (admin)"""
     conn = await get_connection()
     try:
-        # Obtener órdenes con información del cliente y dirección
-        orders = await conn.fetch(
-            """
-            SELECT 
-                o.id, 
-                o.status, 
-                o.total, 
-                o."paymentMethod", 
-                o.notes,
-                o."createdAt", 
-                o."updatedAt",
-                -- Datos del cliente
-                u.id as customer_id,
-                u.name as customer_name, 
-                u.email as customer_email,
-                u.phone as customer_phone,
-                -- Datos de dirección de entrega
-                a.street as delivery_street,
-                a.city as delivery_city,
-                a.state as delivery_state,
-                a."zipCode" as delivery_zipcode,
-                a.country as delivery_country,
-                a.instructions as delivery_instructions
-            FROM orders o
-            JOIN users u ON o."userId" = u.id
-            JOIN addresses a ON o."addressId" = a.id
-            ORDER BY o."createdAt" DESC
-            """
+        # Cada documento ya incluye cliente, dirección de entrega e items
+        rows = await conn.fetch(
+            'SELECT document FROM order_documents ORDER BY "createdAt" DESC'
         )
-        
-        # Convertir a lista de diccionarios y agregar items
-        orders_list = [convert_uuid_to_str(dict(row)) for row in orders]
-        
-        # Para cada orden, obtener sus items con información del producto
-        for order in orders_list:
-            items = await conn.fetch(
-                """
-                SELECT 
-                    oi.id,
-                    oi.quantity,
-                    oi.price,
-                    p.id as product_id,
-                    p.name as product_name,
-                    p.description as product_description,
-                    p.category as product_category
-                FROM order_items oi
-                JOIN products p ON oi."productId" = p.id
-                WHERE oi."orderId" = $1
-                ORDER BY oi."createdAt"
-                """,
-                order['id']
-            )
-            order['items'] = [convert_uuid_to_str(dict(item)) for item in items]
-        
-        return orders_list
+        return [json.loads(row['document']) for row in rows]
     finally:
         await conn.close()
 
 async def update_order_status(order_id: str, status: str) -> Optional[Dict[str, Any]]:
-    """Actualizar estado de un pedido"""
+    """Actualizar estado de un pedido (trg_orders_sync_document actualiza su documento)"""
     conn = await get_connection()
     try:
         order = await conn.fetchrow(
@@ -315,61 +376,98 @@ async def update_order_status(order_id: str, status: str) -> Optional[Dict[str,
     finally:
         await conn.close()
 
+# Columnas de una dirección en las respuestas de la API
+ADDRESS_COLUMNS = 'id, "userId", street, city, state, "zipCode", country, "isDefault", instructions, "createdAt", "updatedAt"'
+
+# Intentos de create_address ante una carrera entre dos direcciones predeterminadas
+CREATE_ADDRESS_ATTEMPTS = 3
+
 async def create_address(user_id: str, street: str, city: str, state: str, zip_code: str, country: str = "Colombia", is_default: bool = False, instructions: Optional[str] = None) -> Dict[str, Any]:
     """Crear nueva dirección"""
     conn = await get_connection()
     try:
-        # Primero, si is_default es True, desmarcar cualquier otra dirección como predeterminada
-        if is_default:
-            await conn.execute(
-                'UPDATE addresses SET "isDefault" = false WHERE "userId" = $1',
-                user_id
-            )
-            
-        # Insertar la nueva dirección
-        address_id = await conn.fetchval(
-            """
-            INSERT INTO addresses (id, "userId", street, city, state, "zipCode", country, "isDefault", instructions, "createdAt", "updatedAt")
-            VALUES (gen_random_uuid(), $1, $2, $3, $4, $5, $6, $7, $8, NOW(), NOW())
-            RETURNING id
-            """,
-            user_id, street, city, state, zip_code, country, is_default, instructions
-        )
+        # Una sola sentencia: si is_default es True, desmarcar la predeterminada
+        # actual e insertar la nueva. El INSERT lee el conteo de "cleared" para
+        # que el UPDATE termine antes (si no, choca con idx_addresses_one_default)
+        for attempt in range(CREATE_ADDRESS_ATTEMPTS):
+            try:
+                address = await conn.fetchrow(
+                    f"""
+                    WITH cleared AS (
+                        UPDATE addresses
+                        SET "isDefault" = false, "updatedAt" = NOW()
+                        WHERE "userId" = $1 AND "isDefault" AND $7::boolean
+                        RETURNING 1
+                    )
+                    INSERT INTO addresses (id, "userId", street, city, state, "zipCode", country, "isDefault", instructions, "createdAt", "updatedAt")
+                    SELECT gen_random_uuid(), $1, $2, $3, $4, $5, $6, $7, $8, NOW(), NOW()
+                    FROM (SELECT COUNT(*) FROM cleared) AS c
+                    RETURNING {ADDRESS_COLUMNS}
+                    """,
+                    user_id, street, city, state, zip_code, country, is_default, instructions
+                )
+                break
+            except asyncpg.UniqueViolationError:
+                # Otra petición concurrente marcó una predeterminada que este
+                # UPDATE no alcanzó a ver: reintentar con la nueva instantánea
+                if attempt == CREATE_ADDRESS_ATTEMPTS - 1:
+                    raise
         
-        # Obtener la dirección recién creada
-        address = await conn.fetchrow(
-            'SELECT id, "userId", street, city, state, "zipCode", country, "isDefault", instructions FROM addresses WHERE id = $1',
-            address_id
-        )
+        address_cache.invalidate(("addresses", str(user_id)))
         return convert_uuid_to_str(dict(address)) if address else None
     finally:
         await conn.close()
 
 async def get_user_addresses(user_id: str) -> List[Dict[str, Any]]:
     """Obtener direcciones de un usuario"""
+    cache_key = ("addresses", str(user_id))
+    cached = address_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     conn = await get_connection()
     try:
         addresses = await conn.fetch(
-            """
-            SELECT id, "userId", street, city, state, "zipCode", country, "isDefault", instructions, "createdAt", "updatedAt"
+            f"""
+            SELECT {ADDRESS_COLUMNS}
             FROM addresses WHERE "userId" = $1
             ORDER BY "isDefault" DESC, "createdAt" DESC
             """,
             user_id
         )
-        return [convert_uuid_to_str(dict(row)) for row in addresses]
+        result = [convert_uuid_to_str(dict(row)) for row in addresses]
+        address_cache.set(cache_key, result)
+        for address in result:
+            address_cache.set(("address_owner", address["id"]), address["userId"])
+        return result
     finally:
         await conn.close()
 
-async def get_address_by_id(address_id: str) -> Optional[Dict[str, Any]]:
-    """Obtener dirección por ID"""
+async def get_address_by_id(address_id: str, cached: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Obtener dirección por ID (desde la libreta en caché de su dueño si está disponible).
+    Con cached=False se lee siempre de la base de datos (p. ej. al crear un pedido).
+    """
+    owner = address_cache.get(("address_owner", str(address_id))) if cached else None
+    if owner is not None:
+        book = address_cache.get(("addresses", owner))
+        if book is not None:
+            for address in book:
+                if address["id"] == str(address_id):
+                    return address
+    
     conn = await get_connection()
     try:
         address = await conn.fetchrow(
-            'SELECT id, "userId", street, city, state, "zipCode", country, "isDefault", instructions FROM addresses WHERE id = $1',
+            f'SELECT {ADDRESS_COLUMNS} FROM addresses WHERE id = $1',
             address_id
         )
-        return convert_uuid_to_str(dict(address)) if address else None
+        if not address:
+            return None
+        result = convert_uuid_to_str(dict(address))
+        # La dirección nunca cambia de dueño: la próxima consulta sale de la libreta
+        address_cache.set(("address_owner", result["id"]), result["userId"])
+        return result
     finally:
         await conn.close()
 
@@ -390,6 +488,7 @@ async def create_product(name: str, description: Optional[str], price: float, ca
             'SELECT id, name, description, price, image, category, "isAvailable", "createdAt", "updatedAt" FROM products WHERE id = $1',
             product_id
         )
+        catalog_cache.invalidate()
         return convert_uuid_to_str(dict(product)) if product else None
     finally:
         await conn.close()
@@ -398,35 +497,88 @@ async def update_product(product_id: str, name: Optional[str] = None, descriptio
     """Actualizar producto existente"""
     conn = await get_connection()
     try:
-        # Obtener producto actual
-        current_product = await conn.fetchrow(
-            'SELECT name, description, price, category, image, "isAvailable" FROM products WHERE id = $1',
-            product_id
+        # Actualización parcial en una sola sentencia: COALESCE conserva el valor actual
+        # de cada campo que no se envía (antes: SELECT + UPDATE)
+        product = await conn.fetchrow(
+            """
+            UPDATE products 
+            SET name = COALESCE($1::varchar, name),
+                description = COALESCE($2::text, description),
+                price = COALESCE($3::numeric, price),
+                category = COALESCE($4::"ProductCategory", category),
+                image = COALESCE($5::varchar, image),
+                "isAvailable" = COALESCE($6::boolean, "isAvailable"),
+                "updatedAt" = NOW()
+            WHERE id = $7
+            RETURNING id, name, description, price, image, category, "isAvailable", "createdAt", "updatedAt"
+            """,
+            name, description, price, category, image, is_available, product_id
         )
         
-        if not current_product:
+        if not product:
             return None
         
-        # Usar valores actuales si no se proporcionan nuevos
-        updated_name = name if name is not None else current_product['name']
-        updated_description = description if description is not None else current_product['description']
-        updated_price = price if price is not None else current_product['price']
-        updated_category = category if category is not None else current_product['category']
-        updated_image = image if image is not None else current_product['image']
-        updated_available = is_available if is_available is not None else current_product['isAvailable']
-        
-        # Actualizar producto
-        product = await conn.fetchrow(
+        catalog_cache.invalidate()
+        return convert_uuid_to_str(dict(product))
+    finally:
+        await conn.close()
+
+async def bulk_set_product_availability(is_available: bool, product_ids: Optional[List[str]] = None, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Cambiar disponibilidad de varios productos por IDs y/o categoría (admin)"""
+    conn = await get_connection()
+    try:
+        # Filtros opcionales: un parámetro NULL desactiva su condición
+        rows = await conn.fetch(
             """
-            UPDATE products 
-            SET name = $1, description = $2, price = $3, category = $4, image = $5, "isAvailable" = $6, "updatedAt" = NOW()
-            WHERE id = $7
+            UPDATE products
+            SET "isAvailable" = $1, "updatedAt" = NOW()
+            WHERE ($2::uuid[] IS NULL OR id = ANY($2::uuid[]))
+              AND ($3::"ProductCategory" IS NULL OR category = $3::"ProductCategory")
+              AND "isAvailable" IS DISTINCT FROM $1
             RETURNING id, name, description, price, image, category, "isAvailable", "createdAt", "updatedAt"
             """,
-            updated_name, updated_description, updated_price, updated_category, updated_image, updated_available, product_id
+            is_available, product_ids, category
         )
         
-        return convert_uuid_to_str(dict(product)) if product else None
+        # Una sola invalidación para todo el lote
+        if rows:
+            catalog_cache.invalidate()
+        return [convert_uuid_to_str(dict(row)) for row in rows]
+    finally:
+        await conn.close()
+
+async def bulk_update_product_prices(percentage: Optional[float] = None, amount: Optional[float] = None, product_ids: Optional[List[str]] = None, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Ajustar precios de varios productos por porcentaje o por valor absoluto (admin).
+    Lanza ValueError, sin modificar ningún precio, si algún precio quedaría en 0
+    o negativo o fuera del rango de la columna.
+    """
+    conn = await get_connection()
+    try:
+        # percentage=10 sube un 10%; amount=-500 resta 500
+        try:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    """
+                    UPDATE products
+                    SET price = ROUND(price * (1 + COALESCE($1::numeric, 0) / 100) + COALESCE($2::numeric, 0), 2),
+                        "updatedAt" = NOW()
+                    WHERE ($3::uuid[] IS NULL OR id = ANY($3::uuid[]))
+                      AND ($4::"ProductCategory" IS NULL OR category = $4::"ProductCategory")
+                    RETURNING id, name, description, price, image, category, "isAvailable", "createdAt", "updatedAt"
+                    """,
+                    percentage, amount, product_ids, category
+                )
+                # Un precio en 0 haría fallar los pedidos del producto: se revierte todo el lote
+                free = [row["name"] for row in rows if row["price"] <= 0]
+                if free:
+                    raise ValueError(f"El ajuste dejaría sin precio a: {', '.join(free)}")
+        except asyncpg.NumericValueOutOfRangeError as e:
+            raise ValueError("El ajuste deja precios fuera del rango permitido") from e
+        
+        if rows:
+            catalog_cache.invalidate()
+        return [convert_uuid_to_str(dict(row)) for row in rows]
     finally:
         await conn.close()
 
@@ -0,0 +1,187 @@
+"""
+Zonas de entrega.
+Carga los polígonos de las zonas (con su tarifa de domicilio) y los centroides
+de los códigos postales desde un GeoJSON local (DELIVERY_ZONES_FILE) a un
+índice espacial de rejilla uniforme. Las zonas son opcionales: sin
+DELIVERY_ZONES_FILE toda dirección tiene cobertura y no se cobra domicilio
+(data/delivery_zones.geojson es solo un ejemplo). Al cargar se precalcula la
+zona de cada código postal, así que resolver una dirección es una búsqueda en
+diccionario; las direcciones con coordenadas se ubican con la rejilla.
+
+Formato del GeoJSON:
+- Polygon/MultiPolygon con properties {zoneId, name, deliveryFee, zipCodes?}
+- Point con properties {zipCode}: centroide del código postal
+"""
+import json
+import logging
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Archivo de ejemplo incluido con la API (DELIVERY_ZONES_FILE=data/delivery_zones.geojson para usarlo)
+SAMPLE_DELIVERY_ZONES_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "delivery_zones.geojson"
+)
+DELIVERY_ZONES_FILE = os.getenv("DELIVERY_ZONES_FILE", "")
+# Tamaño de celda de la rejilla en grados (0.01° ≈ 1.1 km)
+DELIVERY_GRID_CELL_DEGREES = float(os.getenv("DELIVERY_GRID_CELL_DEGREES", "0.01"))
+
+# Resolución por dirección (las direcciones no cambian después de crearse)
+delivery_zone_cache = TTLCache(float(os.getenv("DELIVERY_ZONE_CACHE_TTL", "3600")), max_entries=50000)
+
+# Valor en caché para direcciones fuera de cobertura (TTLCache usa None como "no está")
+OUT_OF_AREA = False
+
+# Zona usada cuando no hay archivo de zonas: sin restricción ni tarifa
+UNRESTRICTED_ZONE = {"zoneId": None, "name": None, "deliveryFee": 0.0}
+
+# Anillo: lista de (lng, lat); polígono: anillo exterior + huecos
+Ring = List[Tuple[float, float]]
+
+
+def point_in_ring(lng: float, lat: float, ring: Ring) -> bool:
+    """Ray casting: True si el punto está dentro del anillo"""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lng < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def point_in_polygon(lng: float, lat: float, rings: List[Ring]) -> bool:
+    """Dentro del anillo exterior y fuera de todos los huecos"""
+    if not point_in_ring(lng, lat, rings[0]):
+        return False
+    return not any(point_in_ring(lng, lat, hole) for hole in rings[1:])
+
+
+class DeliveryZoneIndex:
+    """Índice de zonas: rejilla uniforme de polígonos y mapa código postal -> zona"""
+
+    def __init__(self, cell_degrees: float = DELIVERY_GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.zones: Dict[str, Dict[str, Any]] = {}
+        self.zip_zones: Dict[str, str] = {}
+        # Celda -> [(zoneId, bbox, anillos)]
+        self._grid: Dict[Tuple[int, int], List[Tuple[str, Tuple[float, float, float, float], List[Ring]]]] = {}
+
+    def _cell(self, lng: float, lat: float) -> Tuple[int, int]:
+        return (math.floor(lng / self.cell_degrees), math.floor(lat / self.cell_degrees))
+
+    def add_zone(self, zone_id: str, name: str, fee: float, polygons: List[List[Ring]]):
+        self.zones[zone_id] = {"zoneId": zone_id, "name": name, "deliveryFee": fee}
+        for rings in polygons:
+            xs = [x for x, _ in rings[0]]
+            ys = [y for _, y in rings[0]]
+            bbox = (min(xs), min(ys), max(xs), max(ys))
+            min_cell = self._cell(bbox[0], bbox[1])
+            max_cell = self._cell(bbox[2], bbox[3])
+            for cx in range(min_cell[0], max_cell[0] + 1):
+                for cy in range(min_cell[1], max_cell[1] + 1):
+                    self._grid.setdefault((cx, cy), []).append((zone_id, bbox, rings))
+
+    def locate(self, lng: float, lat: float) -> Optional[Dict[str, Any]]:
+        """Zona que contiene el punto, o None si está fuera de cobertura"""
+        for zone_id, (min_x, min_y, max_x, max_y), rings in self._grid.get(self._cell(lng, lat), ()):
+            if min_x <= lng <= max_x and min_y <= lat <= max_y and point_in_polygon(lng, lat, rings):
+                return self.zones[zone_id]
+        return None
+
+    def zone_for_zip(self, zip_code: str) -> Optional[Dict[str, Any]]:
+        zone_id = self.zip_zones.get(zip_code.strip())
+        return self.zones[zone_id] if zone_id else None
+
+    @classmethod
+    def from_geojson(cls, data: Dict[str, Any], cell_degrees: float = DELIVERY_GRID_CELL_DEGREES) -> "DeliveryZoneIndex":
+        index = cls(cell_degrees)
+        zip_points = []
+        for feature in data.get("features", []):
+            geometry = feature.get("geometry") or {}
+            props = feature.get("properties") or {}
+            if geometry.get("type") == "Point":
+                lng, lat = geometry["coordinates"][:2]
+                zip_points.append((str(props["zipCode"]), lng, lat))
+                continue
+            if geometry.get("type") == "Polygon":
+                polygons = [geometry["coordinates"]]
+            elif geometry.get("type") == "MultiPolygon":
+                polygons = geometry["coordinates"]
+            else:
+                continue
+            polygons = [[[(p[0], p[1]) for p in ring] for ring in rings] for rings in polygons]
+            zone_id = str(props["zoneId"])
+            index.add_zone(zone_id, props.get("name", zone_id), float(props.get("deliveryFee", 0)), polygons)
+            for zip_code in props.get("zipCodes", []):
+                index.zip_zones[str(zip_code)] = zone_id
+
+        # Códigos postales sin asignación explícita: zona que contiene su centroide
+        for zip_code, lng, lat in zip_points:
+            if zip_code not in index.zip_zones:
+                zone = index.locate(lng, lat)
+                if zone:
+                    index.zip_zones[zip_code] = zone["zoneId"]
+        return index
+
+
+_index: Optional[DeliveryZoneIndex] = None
+_loaded = False
+
+
+def load_delivery_zones(path: str = DELIVERY_ZONES_FILE) -> Optional[DeliveryZoneIndex]:
+    """(Re)cargar las zonas desde el GeoJSON. Sin archivo, las zonas quedan desactivadas"""
+    global _index, _loaded
+    _loaded = True
+    if not path:
+        logger.info("Zonas de entrega desactivadas (DELIVERY_ZONES_FILE no configurado): cobertura sin restricción")
+        _index = None
+    elif not os.path.exists(path):
+        logger.warning("Archivo de zonas de entrega no encontrado (%s): cobertura sin restricción", path)
+        _index = None
+    else:
+        with open(path, encoding="utf-8") as f:
+            _index = DeliveryZoneIndex.from_geojson(json.load(f))
+        logger.info("Zonas de entrega cargadas: %d zonas, %d códigos postales", len(_index.zones), len(_index.zip_zones))
+    delivery_zone_cache.invalidate()
+    return _index
+
+
+def get_delivery_zone_index() -> Optional[DeliveryZoneIndex]:
+    """Índice de zonas (se carga en el primer uso); None si las zonas están desactivadas"""
+    if not _loaded:
+        load_delivery_zones()
+    return _index
+
+
+def resolve_delivery_zone(address: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Resolver la zona y tarifa de domicilio de una dirección.
+    Retorna {"zoneId", "name", "deliveryFee"} o None si está fuera de cobertura.
+    Con las zonas desactivadas (sin GeoJSON) toda dirección tiene cobertura sin tarifa.
+    """
+    index = get_delivery_zone_index()
+    if index is None:
+        return UNRESTRICTED_ZONE
+
+    cache_key = address.get("id")
+    if cache_key:
+        cached = delivery_zone_cache.get(cache_key)
+        if cached is not None:
+            return cached or None
+
+    zone = None
+    if address.get("latitude") is not None and address.get("longitude") is not None:
+        zone = index.locate(float(address["longitude"]), float(address["latitude"]))
+    if zone is None and address.get("zipCode"):
+        zone = index.zone_for_zip(str(address["zipCode"]))
+
+    if cache_key:
+        delivery_zone_cache.set(cache_key, zone or OUT_OF_AREA)
+    return zone
@@ -0,0 +1,184 @@
+"""
+Logging estructurado de la API.
+Los módulos usan logging.getLogger(__name__); los registros pasan por un
+QueueHandler (el hilo de la petición solo encola) y un QueueListener en un hilo
+de fondo los formatea como JSON (una línea por evento) y los escribe en stdout.
+
+- Nivel global con LOG_LEVEL y por módulo con LOG_LEVELS, p. ej.
+  "services.rabbitmq=DEBUG,services.query_stats=WARNING"
+- Cada registro lleva el requestId de la petición en curso (cabecera
+  X-Request-ID o uno generado), que también se devuelve en la respuesta
+- Los warnings/errores repetidos se muestrean: por cada mensaje se emiten como
+  máximo LOG_SAMPLE_BURST en cada ventana de LOG_SAMPLE_WINDOW_SECONDS; el
+  siguiente que pase indica cuántos se descartaron (campo "suppressed")
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "10"))
+LOG_SAMPLE_WINDOW_SECONDS = float(os.getenv("LOG_SAMPLE_WINDOW_SECONDS", "60"))
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# Id de la petición en curso (cada tarea de asyncio tiene su propio contexto)
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Atributos estándar de LogRecord: el resto son campos pasados con extra={...}
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por registro, con los campos de extra={...} al nivel raíz"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RequestIdFilter(logging.Filter):
+    """Añadir el requestId de la petición en curso (se ejecuta en el hilo que registra)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "requestId"):
+            record.requestId = request_id_var.get()
+        return True
+
+
+class ErrorSampler(logging.Filter):
+    """Limitar warnings/errores repetidos: LOG_SAMPLE_BURST por mensaje y ventana"""
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, window_seconds: float = LOG_SAMPLE_WINDOW_SECONDS):
+        super().__init__()
+        self.burst = burst
+        self.window_seconds = window_seconds
+        # (logger, plantilla, tipo de excepción) -> [inicio de ventana, emitidos, descartados]
+        self._windows: Dict[Tuple[str, str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.burst <= 0:
+            return True
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else ""
+        key = (record.name, str(record.msg), exc_type)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.window_seconds:
+                suppressed = window[2] if window else 0
+                if len(self._windows) >= 1000:
+                    self._windows.clear()
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler que deja el formateo (incluidas las trazas) al hilo del listener:
+    en el hilo de la petición solo se resuelve el mensaje con sus argumentos.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """'modulo=NIVEL,otro=NIVEL' -> {modulo: NIVEL}"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> Optional[QueueListener]:
+    """Configurar el logging de la API (idempotente)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(ErrorSampler())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(queue_handler)
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Vaciar la cola al salir del proceso
+    atexit.register(_listener.stop)
+    return _listener
+
+
+class RequestIdMiddleware:
+    """Middleware ASGI: fija el requestId de la petición y lo devuelve en X-Request-ID"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER.encode(), request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
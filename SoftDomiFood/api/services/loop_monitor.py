@@ -0,0 +1,137 @@
+"""
+Monitor del event loop.
+Una tarea de fondo duerme LOOP_LAG_INTERVAL_SECONDS y mide cuánto tarda de
+más en despertar: ese retraso es el tiempo que el loop estuvo ocupado con
+trabajo síncrono (bcrypt, json.dumps de respuestas grandes, escrituras a
+stdout...). Se exporta en /metrics (event_loop_lag_seconds).
+
+Con LOOP_BLOCKING_DEBUG=1 un hilo vigilante revisa el latido de esa tarea y,
+si el loop lleva más de LOOP_SLOW_CALLBACK_MS sin avanzar, captura la pila del
+hilo del loop en ese momento: es el código que lo está bloqueando. Las últimas
+capturas se guardan en memoria (GET /api/admin/loop/stalls), se cuentan en
+event_loop_blocked_total y se registran en el log.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from services.metrics import EVENT_LOOP_LAG, EVENT_LOOP_LAG_LAST, EVENT_LOOP_BLOCKED
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.5"))
+LOOP_BLOCKING_DEBUG = os.getenv("LOOP_BLOCKING_DEBUG", "0").lower() in ("1", "true", "yes")
+LOOP_SLOW_CALLBACK_MS = float(os.getenv("LOOP_SLOW_CALLBACK_MS", "100"))
+LOOP_STALL_BUFFER_SIZE = int(os.getenv("LOOP_STALL_BUFFER_SIZE", "50"))
+
+# Últimos bloqueos detectados (más recientes al final)
+_stalls: Deque[Dict[str, Any]] = deque(maxlen=LOOP_STALL_BUFFER_SIZE)
+
+_monitor_task: Optional[asyncio.Task] = None
+_watchdog: Optional["_BlockingWatchdog"] = None
+# Momento (time.monotonic) del último latido de la tarea de medición
+_last_beat = 0.0
+
+
+class _BlockingWatchdog(threading.Thread):
+    """Hilo que captura la pila del loop cuando deja de latir más del umbral"""
+
+    def __init__(self, loop_thread_id: int, interval: float, threshold: float):
+        super().__init__(name="loop-watchdog", daemon=True)
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.threshold = threshold
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(timeout=1)
+
+    def run(self):
+        captured_beat = None
+        while not self._stop_event.wait(self.threshold / 4):
+            beat = _last_beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.threshold or beat == captured_beat:
+                continue
+            captured_beat = beat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            _stalls.append({
+                "at": time.time(),
+                "beat": beat,
+                "blockedMs": round(blocked * 1000, 3),
+                "stack": [line.rstrip() for line in stack],
+            })
+            EVENT_LOOP_BLOCKED.inc()
+            logger.warning("Event loop bloqueado", extra={
+                "blockedMs": round(blocked * 1000, 3),
+                "where": stack[-1].strip() if stack else None,
+            })
+
+
+async def _lag_loop(interval: float):
+    """Medir el retraso del planificador en cada intervalo"""
+    global _last_beat
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        _last_beat = beat = time.monotonic()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        EVENT_LOOP_LAG.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
+        # Duración final del bloqueo capturado durante este intervalo
+        if _stalls and _stalls[-1]["beat"] == beat:
+            _stalls[-1]["blockedMs"] = round(lag * 1000, 3)
+
+
+def start_loop_monitor(interval: Optional[float] = None, debug: Optional[bool] = None,
+                       threshold_ms: Optional[float] = None):
+    """Iniciar la medición del retraso (y el vigilante de bloqueos en modo debug) (startup)"""
+    global _monitor_task, _watchdog, _last_beat
+    if _monitor_task is not None and not _monitor_task.done():
+        return
+    interval = LOOP_LAG_INTERVAL_SECONDS if interval is None else interval
+    debug = LOOP_BLOCKING_DEBUG if debug is None else debug
+    threshold = (LOOP_SLOW_CALLBACK_MS if threshold_ms is None else threshold_ms) / 1000
+    if interval <= 0:
+        return
+    if debug:
+        # El latido debe ser más frecuente que el umbral para detectar bloqueos a tiempo
+        interval = min(interval, threshold / 2)
+    _last_beat = time.monotonic()
+    _monitor_task = asyncio.create_task(_lag_loop(interval))
+    if debug:
+        _watchdog = _BlockingWatchdog(threading.get_ident(), interval, threshold)
+        _watchdog.start()
+        logger.info("Detector de bloqueos del event loop activo (umbral %.0f ms)", threshold * 1000)
+
+
+async def stop_loop_monitor():
+    """Detener la medición y el vigilante (shutdown)"""
+    global _monitor_task, _watchdog
+    if _watchdog is not None:
+        _watchdog.stop()
+        _watchdog = None
+    if _monitor_task is not None:
+        _monitor_task.cancel()
+        try:
+            await _monitor_task
+        except asyncio.CancelledError:
+            pass
+        _monitor_task = None
+
+
+def get_loop_stalls() -> List[Dict[str, Any]]:
+    """Bloqueos capturados, más recientes primero"""
+    return [
+        {key: value for key, value in stall.items() if key != "beat"}
+        for stall in reversed(_stalls)
+    ]
@@ -0,0 +1,161 @@
+"""
+Broker AMQP en memoria.
+Sustituye a RabbitMQ cuando BROKER_BACKEND=memory: implementa la parte de la
+API de aio_pika que usa services/rabbitmq.py (conexión, canal, declare_queue y
+default_exchange.publish con confirmaciones) dentro del mismo proceso. Sirve
+para pruebas, benchmarks y pruebas de carga del flujo de pedidos sin broker.
+
+Los mensajes confirmados quedan en memoria por cola (MEMORY_BROKER_MAX_MESSAGES
+por cola, se descartan los más antiguos). Se pueden simular:
+- latencia de confirmación: MEMORY_BROKER_LATENCY_MS (±50% de variación)
+- rechazos del broker (nack -> DeliveryError): MEMORY_BROKER_NACK_RATE
+- caídas de conexión al publicar (ConnectionClosed): MEMORY_BROKER_DISCONNECT_RATE
+Con MEMORY_BROKER_SEED las fallas simuladas son reproducibles.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import aio_pika
+from pamqp.commands import Basic
+
+logger = logging.getLogger(__name__)
+
+MEMORY_BROKER_LATENCY_MS = float(os.getenv("MEMORY_BROKER_LATENCY_MS", "0"))
+MEMORY_BROKER_NACK_RATE = float(os.getenv("MEMORY_BROKER_NACK_RATE", "0"))
+MEMORY_BROKER_DISCONNECT_RATE = float(os.getenv("MEMORY_BROKER_DISCONNECT_RATE", "0"))
+MEMORY_BROKER_MAX_MESSAGES = int(os.getenv("MEMORY_BROKER_MAX_MESSAGES", "100000"))
+MEMORY_BROKER_SEED = os.getenv("MEMORY_BROKER_SEED")
+
+# Estado del broker compartido por todas las conexiones del proceso
+_queues: Dict[str, Deque[Dict[str, Any]]] = {}
+_stats = {"published": 0, "nacked": 0, "disconnects": 0, "unroutable": 0}
+_settings = {
+    "latency_ms": MEMORY_BROKER_LATENCY_MS,
+    "nack_rate": MEMORY_BROKER_NACK_RATE,
+    "disconnect_rate": MEMORY_BROKER_DISCONNECT_RATE,
+}
+_random = random.Random(MEMORY_BROKER_SEED)
+
+
+class MemoryExchange:
+    """Exchange por defecto: enruta por nombre de cola"""
+
+    def __init__(self, channel: "MemoryChannel"):
+        self.channel = channel
+        self.name = ""
+
+    async def publish(self, message: aio_pika.Message, routing_key: str, *,
+                      mandatory: bool = True, immediate: bool = False, timeout: Optional[float] = None):
+        channel = self.channel
+        if channel.is_closed:
+            raise aio_pika.exceptions.ChannelInvalidStateError("Channel closed")
+        if _settings["disconnect_rate"] and _random.random() < _settings["disconnect_rate"]:
+            _stats["disconnects"] += 1
+            channel.connection._closed = True
+            raise aio_pika.exceptions.ConnectionClosed(320, "Simulated connection loss")
+
+        channel.delivery_tag += 1
+        delivery_tag = channel.delivery_tag
+        if channel.publisher_confirms:
+            latency = _settings["latency_ms"]
+            if latency:
+                await asyncio.sleep(latency * _random.uniform(0.5, 1.5) / 1000)
+            if _settings["nack_rate"] and _random.random() < _settings["nack_rate"]:
+                _stats["nacked"] += 1
+                raise aio_pika.exceptions.DeliveryError(None, Basic.Nack(delivery_tag=delivery_tag))
+
+        queue = _queues.get(routing_key)
+        if queue is None:
+            # El exchange por defecto descarta lo que no tiene cola declarada
+            _stats["unroutable"] += 1
+            logger.warning("Mensaje sin cola de destino descartado", extra={"routingKey": routing_key})
+        else:
+            queue.append({
+                "routingKey": routing_key,
+                "body": message.body,
+                "deliveryMode": int(message.delivery_mode or 1),
+                "deliveryTag": delivery_tag,
+                "publishedAt": time.time(),
+            })
+            _stats["published"] += 1
+
+        if not channel.publisher_confirms:
+            return None
+        return Basic.Ack(delivery_tag=delivery_tag)
+
+
+class MemoryChannel:
+    def __init__(self, connection: "MemoryConnection", publisher_confirms: bool = True):
+        self.connection = connection
+        self.publisher_confirms = publisher_confirms
+        self.delivery_tag = 0
+        self.default_exchange = MemoryExchange(self)
+        self._closed = False
+
+    @property
+    def is_closed(self) -> bool:
+        return self._closed or self.connection.is_closed
+
+    async def declare_queue(self, name: str, durable: bool = False, **kwargs):
+        _queues.setdefault(name, deque(maxlen=MEMORY_BROKER_MAX_MESSAGES))
+        return name
+
+    async def close(self):
+        self._closed = True
+
+
+class MemoryConnection:
+    def __init__(self):
+        self._closed = False
+
+    @property
+    def is_closed(self) -> bool:
+        return self._closed
+
+    async def channel(self, publisher_confirms: bool = True, **kwargs) -> MemoryChannel:
+        return MemoryChannel(self, publisher_confirms)
+
+    async def close(self):
+        self._closed = True
+
+
+async def connect(url: Optional[str] = None, **kwargs) -> MemoryConnection:
+    """Equivalente a aio_pika.connect_robust (la URL se ignora)"""
+    return MemoryConnection()
+
+
+def configure(latency_ms: Optional[float] = None, nack_rate: Optional[float] = None,
+              disconnect_rate: Optional[float] = None, seed: Optional[int] = None):
+    """Cambiar la simulación en caliente (pruebas)"""
+    if latency_ms is not None:
+        _settings["latency_ms"] = latency_ms
+    if nack_rate is not None:
+        _settings["nack_rate"] = nack_rate
+    if disconnect_rate is not None:
+        _settings["disconnect_rate"] = disconnect_rate
+    if seed is not None:
+        _random.seed(seed)
+
+
+def get_messages(queue_name: str) -> List[Dict[str, Any]]:
+    """Mensajes publicados en una cola, del más antiguo al más reciente"""
+    return list(_queues.get(queue_name, ()))
+
+
+def get_broker_stats() -> Dict[str, Any]:
+    return {**_stats, "queues": {name: len(queue) for name, queue in _queues.items()}}
+
+
+def reset_broker():
+    """Vaciar las colas (siguen declaradas), contadores y restaurar la simulación del entorno"""
+    for queue in _queues.values():
+        queue.clear()
+    for key in _stats:
+        _stats[key] = 0
+    configure(MEMORY_BROKER_LATENCY_MS, MEMORY_BROKER_NACK_RATE, MEMORY_BROKER_DISCONNECT_RATE)
+    _random.seed(MEMORY_BROKER_SEED)
@@ -0,0 +1,153 @@
+"""
+Métricas de la API en formato Prometheus (GET /metrics).
+
+Con varios workers de uvicorn, definir PROMETHEUS_MULTIPROC_DIR (directorio
+vacío y escribible, el mismo para todos los workers) antes de arrancar: cada
+worker escribe sus valores en archivos mmap y /metrics los agrega, sin importar
+qué worker atienda el scrape.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Buckets de latencia en segundos (pre-definidos: observar es O(log n) sin asignaciones)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Etiqueta para peticiones que no coinciden con ninguna ruta (evita una serie por URL)
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Peticiones HTTP atendidas",
+    ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP",
+    ["method", "route"], buckets=LATENCY_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso",
+    multiprocess_mode="livesum"
+)
+
+DB_CONNECT_LATENCY = Histogram(
+    "db_connection_acquire_seconds", "Tiempo de espera para obtener una conexión a PostgreSQL",
+    buckets=FAST_BUCKETS
+)
+DB_CONNECTIONS_IN_USE = Gauge(
+    "db_connections_in_use", "Conexiones a PostgreSQL abiertas por la API",
+    multiprocess_mode="livesum"
+)
+DB_CONNECT_FAILURES = Counter(
+    "db_connection_failures_total", "Errores al conectar con PostgreSQL"
+)
+
+RABBITMQ_PUBLISH_LATENCY = Histogram(
+    "rabbitmq_publish_duration_seconds", "Latencia de publicación de pedidos en RabbitMQ",
+    buckets=FAST_BUCKETS
+)
+RABBITMQ_PUBLISH_FAILURES = Counter(
+    "rabbitmq_publish_failures_total", "Publicaciones de pedidos fallidas en RabbitMQ"
+)
+
+BCRYPT_QUEUE_DEPTH = Gauge(
+    "bcrypt_queue_depth", "Operaciones bcrypt en espera o en ejecución en el pool de hilos",
+    multiprocess_mode="livesum"
+)
+BCRYPT_LATENCY = Histogram(
+    "bcrypt_duration_seconds", "Duración de las operaciones bcrypt (incluye la espera en cola)",
+    ["operation"], buckets=LATENCY_BUCKETS
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Retraso del planificador del event loop (tiempo extra sobre el sleep esperado)",
+    buckets=FAST_BUCKETS
+)
+EVENT_LOOP_LAG_LAST = Gauge(
+    "event_loop_lag_last_seconds", "Último retraso medido del event loop",
+    multiprocess_mode="max"
+)
+EVENT_LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total", "Callbacks que bloquearon el event loop más de LOOP_SLOW_CALLBACK_MS"
+)
+
+HTTP_COMPRESSION_BYTES = Counter(
+    "http_compression_bytes_total", "Bytes de las respuestas comprimidas antes (in) y después (out) de comprimir",
+    ["encoding", "stage"]
+)
+HTTP_COMPRESSION_SECONDS = Histogram(
+    "http_compression_duration_seconds", "Duración de la compresión de una respuesta (sin la espera del pool de hilos)",
+    ["encoding"], buckets=FAST_BUCKETS
+)
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "single_flight_calls_total", "Lecturas coalescidas: leader (lanzó la consulta), shared (la reutilizó), timeout",
+    ["name", "result"]
+)
+
+
+def render_metrics() -> bytes:
+    """Serializar las métricas (agregando todos los workers en modo multiproceso)"""
+    if MULTIPROCESS_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_worker_dead():
+    """Descartar los gauges 'live' de este worker al cerrar (modo multiproceso)"""
+    if MULTIPROCESS_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: cuenta peticiones por ruta (plantilla, p. ej. /api/orders/{order_id})
+    y mide su latencia. Es ASGI puro para no añadir el coste de BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app, exclude_paths=("/metrics",)):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            # FastAPI deja la ruta que atendió la petición en el scope
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            HTTP_REQUESTS.labels(method, route_path, str(status_code)).inc()
+            HTTP_LATENCY.labels(method, route_path).observe(elapsed)
+
@@ -0,0 +1,131 @@
+"""
+Exportación de pedidos en streaming para contabilidad.
+Los pedidos se leen de sus documentos de lectura (order_documents, y opcionalmente
+order_documents_archive) sin armar la lista completa en memoria:
+- NDJSON: cursor del lado del servidor dentro de una transacción; cada lote de
+  ORDER_EXPORT_BATCH_ROWS documentos se envía tal como lo devuelve PostgreSQL,
+  una línea por pedido, sin decodificar ni volver a codificar el JSON.
+- CSV: COPY (SELECT ...) TO STDOUT; los bloques de datos pasan por una cola
+  acotada (ORDER_EXPORT_QUEUE_CHUNKS) que frena el COPY si el cliente lee lento.
+La memoria usada no depende del tamaño de la exportación.
+"""
+import asyncio
+import os
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
+
+from services.database_service import get_connection
+
+ORDER_EXPORT_BATCH_ROWS = int(os.getenv("ORDER_EXPORT_BATCH_ROWS", "500"))
+ORDER_EXPORT_QUEUE_CHUNKS = int(os.getenv("ORDER_EXPORT_QUEUE_CHUNKS", "8"))
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+# Columnas del CSV: (encabezado, expresión sobre el documento)
+CSV_COLUMNS = (
+    ("id", "id"),
+    ("createdAt", '"createdAt"'),
+    ("updatedAt", '"updatedAt"'),
+    ("status", "status"),
+    ("paymentMethod", "document->>'paymentMethod'"),
+    ("total", "(document->>'total')::numeric"),
+    ("deliveryFee", "COALESCE((document->>'deliveryFee')::numeric, 0)"),
+    ("itemCount", "(document->>'itemCount')::int"),
+    ("customerId", "document->>'customer_id'"),
+    ("customerName", "document->>'customer_name'"),
+    ("customerEmail", "document->>'customer_email'"),
+    ("deliveryCity", "document->>'delivery_city'"),
+    ("deliveryZipCode", "document->>'delivery_zipcode'"),
+    ("notes", "document->>'notes'"),
+)
+
+# Fin de la exportación CSV en la cola
+_COPY_DONE = object()
+
+
+def build_export_query(columns: str, date_from: Optional[date], date_to: Optional[date],
+                       include_archived: bool = True) -> Tuple[str, List[datetime]]:
+    """SELECT de los documentos entre date_from y date_to (ambos inclusive), del más antiguo al más reciente"""
+    table = "order_documents_all" if include_archived else "order_documents"
+    query = f"SELECT {columns} FROM {table} WHERE 1=1"
+    params = []
+
+    if date_from is not None:
+        params.append(datetime.combine(date_from, time.min))
+        query += f' AND "createdAt" >= ${len(params)}'
+
+    if date_to is not None:
+        params.append(datetime.combine(date_to + timedelta(days=1), time.min))
+        query += f' AND "createdAt" < ${len(params)}'
+
+    query += ' ORDER BY "createdAt", id'
+    return query, params
+
+
+async def open_orders_export(fmt: str, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                             include_archived: bool = True) -> AsyncIterator[bytes]:
+    """
+    Abrir la conexión de la exportación y devolver el iterador de bytes que la
+    recorre (y la cierra al terminar). Conectar antes de responder permite
+    devolver un error HTTP si la base de datos no está disponible.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"fmt debe ser uno de: {', '.join(EXPORT_FORMATS)}")
+
+    conn = await get_connection()
+    if fmt == "csv":
+        columns = ", ".join(f'{expression} AS "{name}"' for name, expression in CSV_COLUMNS)
+        query, params = build_export_query(columns, date_from, date_to, include_archived)
+        return _stream_copy(conn, query, params)
+
+    query, params = build_export_query("document", date_from, date_to, include_archived)
+    return _stream_cursor(conn, query, params)
+
+
+async def _stream_cursor(conn, query: str, params: List[datetime]) -> AsyncIterator[bytes]:
+    """Documentos en NDJSON, un lote del cursor por bloque"""
+    try:
+        async with conn.transaction(readonly=True):
+            cursor = await conn.cursor(query, *params)
+            while True:
+                rows = await cursor.fetch(ORDER_EXPORT_BATCH_ROWS)
+                if not rows:
+                    break
+                # asyncpg entrega JSONB como texto: se copia sin decodificar
+                yield "".join(row["document"] + "\n" for row in rows).encode("utf-8")
+    finally:
+        await conn.close()
+
+
+async def _stream_copy(conn, query: str, params: List[datetime]) -> AsyncIterator[bytes]:
+    """Filas en CSV con encabezado, tal como las produce COPY"""
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=ORDER_EXPORT_QUEUE_CHUNKS)
+
+    async def copy():
+        # Si se cancela no se marca el fin: nadie lee ya la cola
+        try:
+            await conn.copy_from_query(query, *params, output=chunks.put, format="csv", header=True)
+        except Exception:
+            await chunks.put(_COPY_DONE)
+            raise
+        await chunks.put(_COPY_DONE)
+
+    task = asyncio.create_task(copy())
+    try:
+        while True:
+            chunk = await chunks.get()
+            if chunk is _COPY_DONE:
+                break
+            yield bytes(chunk)
+        # Propagar un error del COPY (la respuesta queda truncada)
+        await task
+    finally:
+        if not task.done():
+            # El cliente se desconectó: abortar el COPY en curso
+            task.cancel()
+            conn.terminate()
+        else:
+            await conn.close()
@@ -0,0 +1,235 @@
+"""
+Cliente de pasarela de pagos.
+PaymentGateway define la interfaz que usa el pool de pagos; la implementación se
+elige con PAYMENT_GATEWAY_URL:
+- sin configurar: SimulatedGateway (simulación local del datáfono)
+- con URL: HttpPaymentGateway (adquirente HTTP o payment_gateway_stub.py)
+"""
+import asyncio
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import httpx
+
+PAYMENT_GATEWAY_URL = os.getenv("PAYMENT_GATEWAY_URL", "")
+PAYMENT_GATEWAY_API_KEY = os.getenv("PAYMENT_GATEWAY_API_KEY", "")
+PAYMENT_GATEWAY_TIMEOUT_SECONDS = float(os.getenv("PAYMENT_GATEWAY_TIMEOUT_SECONDS", "10"))
+PAYMENT_GATEWAY_CONNECT_TIMEOUT_SECONDS = float(os.getenv("PAYMENT_GATEWAY_CONNECT_TIMEOUT_SECONDS", "2"))
+PAYMENT_GATEWAY_MAX_CONNECTIONS = int(os.getenv("PAYMENT_GATEWAY_MAX_CONNECTIONS", "20"))
+PAYMENT_GATEWAY_MAX_RETRIES = int(os.getenv("PAYMENT_GATEWAY_MAX_RETRIES", "2"))
+PAYMENT_GATEWAY_RETRY_BASE_SECONDS = float(os.getenv("PAYMENT_GATEWAY_RETRY_BASE_SECONDS", "0.2"))
+PAYMENT_GATEWAY_BREAKER_FAILURES = int(os.getenv("PAYMENT_GATEWAY_BREAKER_FAILURES", "5"))
+PAYMENT_GATEWAY_BREAKER_RESET_SECONDS = float(os.getenv("PAYMENT_GATEWAY_BREAKER_RESET_SECONDS", "30"))
+
+# Simulación del datáfono (sin pasarela configurada)
+CARD_SIMULATED_LATENCY_SECONDS = float(os.getenv("CARD_SIMULATED_LATENCY_SECONDS", "2"))
+CARD_APPROVAL_RATE = 0.95
+
+# Respuestas HTTP que se reintentan (además de errores de red y timeouts)
+RETRYABLE_STATUS_CODES = (429, 502, 503, 504)
+
+
+class PaymentGatewayError(Exception):
+    """La pasarela no pudo dar una respuesta definitiva sobre el pago"""
+
+
+class CircuitOpenError(PaymentGatewayError):
+    """El circuito está abierto: no se intenta contactar a la pasarela"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simple: tras `failure_threshold` fallos seguidos se abre
+    durante `reset_timeout` segundos; después deja pasar una llamada de prueba
+    (semiabierto) y se cierra si tiene éxito.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        """Lanzar CircuitOpenError si la llamada no debe intentarse"""
+        state = self.state
+        if state == "open" or (state == "half-open" and self._probing):
+            raise CircuitOpenError("Payment gateway circuit is open")
+        if state == "half-open":
+            self._probing = True
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self):
+        """La llamada se abandonó sin resultado (p. ej. cancelada): otra puede hacer la prueba"""
+        self._probing = False
+
+
+class PaymentGateway(ABC):
+    """Interfaz de la pasarela de pagos"""
+
+    @abstractmethod
+    async def authorize(self, payment: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Autorizar un pago. Retorna {"status": "APPROVED"|"DECLINED", "transactionId", "message"}
+        o lanza PaymentGatewayError si no hay respuesta definitiva.
+        """
+
+    async def close(self):
+        """Liberar recursos (conexiones)"""
+
+
+class SimulatedGateway(PaymentGateway):
+    """Simulación local del datáfono (95% de aprobación)"""
+
+    async def authorize(self, payment: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(CARD_SIMULATED_LATENCY_SECONDS)
+        if random.random() < CARD_APPROVAL_RATE:
+            return {
+                "status": "APPROVED",
+                "transactionId": f"CARD-{int(time.time() * 1000)}-{random.randint(1000, 9999)}",
+                "message": "Card payment processed successfully",
+            }
+        return {
+            "status": "DECLINED",
+            "message": "Card payment was rejected. Please verify your card and try again.",
+        }
+
+
+class HttpPaymentGateway(PaymentGateway):
+    """
+    Cliente HTTP de la pasarela: pool de conexiones keep-alive, timeout por
+    llamada, reintentos con backoff exponencial y jitter, y circuit breaker.
+    Los reintentos son seguros porque se envía Idempotency-Key = paymentId.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "",
+        timeout: float = PAYMENT_GATEWAY_TIMEOUT_SECONDS,
+        max_retries: int = PAYMENT_GATEWAY_MAX_RETRIES,
+        retry_base: float = PAYMENT_GATEWAY_RETRY_BASE_SECONDS,
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.breaker = breaker or CircuitBreaker(
+            PAYMENT_GATEWAY_BREAKER_FAILURES, PAYMENT_GATEWAY_BREAKER_RESET_SECONDS
+        )
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=httpx.Timeout(timeout, connect=PAYMENT_GATEWAY_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=PAYMENT_GATEWAY_MAX_CONNECTIONS,
+                max_keepalive_connections=PAYMENT_GATEWAY_MAX_CONNECTIONS,
+            ),
+            transport=transport,
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponencial con jitter completo"""
+        return random.uniform(0, self.retry_base * (2 ** attempt))
+
+    async def authorize(self, payment: Dict[str, Any]) -> Dict[str, Any]:
+        body = {
+            "paymentId": payment["paymentId"],
+            "orderId": payment["orderId"],
+            "amount": payment["amount"],
+            "currency": "COP",
+        }
+        headers = {"Idempotency-Key": payment["paymentId"]}
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                await asyncio.sleep(self._backoff(attempt - 1))
+            self.breaker.before_call()
+            try:
+                response = await self._client.post("/v1/authorizations", json=body, headers=headers)
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                last_error = e
+                continue
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                # Cancelada (cierre del worker o timeout del llamador): sin
+                # resultado, no cuenta como fallo pero libera la llamada de prueba
+                self.breaker.release()
+                raise
+
+            if response.status_code in RETRYABLE_STATUS_CODES or response.status_code >= 500:
+                self.breaker.record_failure()
+                last_error = PaymentGatewayError(f"Gateway responded {response.status_code}")
+                continue
+
+            self.breaker.record_success()
+            if response.status_code >= 400:
+                # Petición rechazada por la pasarela (no se reintenta)
+                raise PaymentGatewayError(f"Gateway rejected request: {response.status_code}")
+
+            data = response.json()
+            if data.get("status") == "APPROVED":
+                return {
+                    "status": "APPROVED",
+                    "transactionId": data.get("transactionId"),
+                    "message": "Card payment processed successfully",
+                }
+            return {
+                "status": "DECLINED",
+                "message": "Card payment was rejected. Please verify your card and try again.",
+                "declineReason": data.get("reason"),
+            }
+
+        raise PaymentGatewayError(f"Payment gateway unavailable: {last_error}")
+
+    async def close(self):
+        await self._client.aclose()
+
+
+_gateway: Optional[PaymentGateway] = None
+
+
+def get_payment_gateway() -> PaymentGateway:
+    """Obtener la pasarela configurada (se crea una sola vez por proceso)"""
+    global _gateway
+    if _gateway is None:
+        if PAYMENT_GATEWAY_URL:
+            _gateway = HttpPaymentGateway(PAYMENT_GATEWAY_URL, api_key=PAYMENT_GATEWAY_API_KEY)
+        else:
+            _gateway = SimulatedGateway()
+    return _gateway
+
+
+async def close_payment_gateway():
+    """Cerrar el pool de conexiones de la pasarela (shutdown)"""
+    global _gateway
+    if _gateway is not None:
+        await _gateway.close()
+        _gateway = None
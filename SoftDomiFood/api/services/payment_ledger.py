@@ -0,0 +1,273 @@
+"""
+Libro de pagos con escritura diferida (write-behind).
+claim_payment inserta cada intento nuevo en el momento, antes de llamar a la
+pasarela: el índice único parcial de payments garantiza un solo pago vigente
+por pedido y método entre todos los workers. Los cambios de estado posteriores
+(record_payment) se guardan en un buffer en memoria; una tarea de fondo lo
+vuelca a la tabla payments por lotes con COPY (cada PAYMENT_LEDGER_FLUSH_SECONDS
+o al llegar a PAYMENT_LEDGER_BATCH_SIZE pagos), y el buffer se vacía también al
+cerrar la aplicación.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from services.database_service import DATABASE_URL, get_connection, convert_uuid_to_str
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_LEDGER_FLUSH_SECONDS = float(os.getenv("PAYMENT_LEDGER_FLUSH_SECONDS", "1"))
+PAYMENT_LEDGER_BATCH_SIZE = int(os.getenv("PAYMENT_LEDGER_BATCH_SIZE", "500"))
+# Un pago PENDING sin actualizar en este tiempo (p. ej. se reinició la API a
+# mitad de la autorización) ya no bloquea un nuevo intento
+PAYMENT_PENDING_STALE_SECONDS = float(os.getenv("PAYMENT_PENDING_STALE_SECONDS", "600"))
+
+ACTIVE_STATUSES = ("PENDING", "APPROVED")
+# Reintentos de claim_payment cuando el pago vigente finaliza durante la inserción
+CLAIM_ATTEMPTS = 3
+
+LEDGER_COLUMNS = (
+    "id", "orderId", "paymentMethod", "amount", "status",
+    "transactionId", "message", "createdAt", "updatedAt"
+)
+
+# COPY no admite ON CONFLICT: se copia a una tabla temporal y desde allí se
+# insertan los pagos nuevos o se actualiza el estado de los ya registrados
+CREATE_STAGING_SQL = """
+CREATE TEMP TABLE payments_staging (LIKE payments INCLUDING DEFAULTS) ON COMMIT DROP
+"""
+
+# Un pago del lote que volvería a quedar vigente cuando su pedido ya tiene otro
+# pago vigente (p. ej. un PENDING que otro worker expiró y reemplazó, y que
+# aprobó tarde) violaría idx_payments_order_method_active y haría fallar todo el
+# lote: se escribe como FAILED y se registra para conciliarlo
+DEMOTE_SUPERSEDED_SQL = """
+UPDATE payments_staging s
+SET status = 'FAILED',
+    message = 'Superseded by another active payment (was ' || s.status || ')'
+WHERE s.status IN ('PENDING', 'APPROVED')
+  AND EXISTS (
+      SELECT 1
+      FROM payments p
+      LEFT JOIN payments_staging o ON o.id = p.id
+      WHERE p."orderId" = s."orderId" AND p."paymentMethod" = s."paymentMethod"
+        AND p.id <> s.id
+        AND p.status IN ('PENDING', 'APPROVED')
+        AND COALESCE(o.status, p.status) IN ('PENDING', 'APPROVED')
+  )
+RETURNING s.id, s."orderId", s."transactionId", s.message
+"""
+
+UPSERT_FROM_STAGING_SQL = """
+INSERT INTO payments AS p
+SELECT * FROM payments_staging
+ON CONFLICT (id) DO UPDATE
+SET status = EXCLUDED.status,
+    "transactionId" = EXCLUDED."transactionId",
+    message = EXCLUDED.message,
+    "updatedAt" = EXCLUDED."updatedAt"
+WHERE p."updatedAt" <= EXCLUDED."updatedAt"
+"""
+
+# El pago vigente se inserta sin esperar al lote: si otro worker ya registró
+# uno, ON CONFLICT sobre idx_payments_order_method_active no inserta nada
+CLAIM_PAYMENT_SQL = """
+INSERT INTO payments (id, "orderId", "paymentMethod", amount, status,
+                      "transactionId", message, "createdAt", "updatedAt")
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+ON CONFLICT ("orderId", "paymentMethod") WHERE status IN ('PENDING', 'APPROVED') DO NOTHING
+RETURNING id
+"""
+
+# Un PENDING abandonado (p. ej. se reinició la API a mitad de la autorización)
+# deja de ser el pago vigente
+EXPIRE_STALE_PENDING_SQL = """
+UPDATE payments
+SET status = 'FAILED', message = 'Payment processing interrupted', "updatedAt" = $3
+WHERE "orderId" = $1 AND "paymentMethod" = $2 AND status = 'PENDING' AND "updatedAt" <= $4
+"""
+
+ACTIVE_PAYMENT_SQL = """
+SELECT id AS "paymentId", "orderId", "paymentMethod", amount::float AS amount, status,
+       "transactionId", message, "createdAt", "updatedAt"
+FROM payments
+WHERE "orderId" = $1 AND "paymentMethod" = $2 AND status IN ('PENDING', 'APPROVED')
+"""
+
+# Último estado pendiente de escribir por paymentId (las actualizaciones de un
+# mismo pago dentro de un intervalo se escriben una sola vez)
+_buffer: Dict[str, Dict[str, Any]] = {}
+_flush_requested: Optional[asyncio.Event] = None
+_flush_task: Optional[asyncio.Task] = None
+_flush_lock: Optional[asyncio.Lock] = None
+
+
+def _to_record(payment: Dict[str, Any]) -> tuple:
+    """Convertir un pago al registro que se copia a la tabla payments"""
+    return (
+        UUID(payment["paymentId"]),
+        UUID(payment["orderId"]),
+        payment["paymentMethod"],
+        Decimal(str(payment["amount"])),
+        payment["status"],
+        payment.get("transactionId"),
+        payment.get("message"),
+        datetime.fromisoformat(payment["createdAt"]),
+        datetime.fromisoformat(payment["updatedAt"]),
+    )
+
+
+def record_payment(payment: Dict[str, Any]):
+    """Registrar el estado actual de un pago para escribirlo en el próximo lote"""
+    _buffer[payment["paymentId"]] = dict(payment)
+    if len(_buffer) >= PAYMENT_LEDGER_BATCH_SIZE and _flush_requested is not None:
+        _flush_requested.set()
+
+
+def pending_ledger_writes() -> int:
+    """Número de pagos en el buffer pendientes de escribir"""
+    return len(_buffer)
+
+
+async def flush_payment_ledger() -> int:
+    """Escribir el buffer en la tabla payments. Retorna cuántos pagos se escribieron"""
+    global _flush_lock
+    if _flush_lock is None:
+        _flush_lock = asyncio.Lock()
+
+    async with _flush_lock:
+        if not _buffer:
+            return 0
+        batch = dict(_buffer)
+        _buffer.clear()
+
+        try:
+            conn = await get_connection()
+            try:
+                async with conn.transaction():
+                    await conn.execute(CREATE_STAGING_SQL)
+                    await conn.copy_records_to_table(
+                        "payments_staging",
+                        records=[_to_record(p) for p in batch.values()],
+                        columns=LEDGER_COLUMNS
+                    )
+                    for row in await conn.fetch(DEMOTE_SUPERSEDED_SQL):
+                        logger.error(
+                            "Pago reemplazado por otro pago vigente del pedido; se registra como FAILED",
+                            extra={"paymentId": str(row["id"]), "orderId": str(row["orderId"]),
+                                   "transactionId": row["transactionId"]}
+                        )
+                    await conn.execute(UPSERT_FROM_STAGING_SQL)
+            finally:
+                await conn.close()
+        except Exception:
+            # Devolver el lote al buffer sin pisar estados más recientes
+            for payment_id, payment in batch.items():
+                _buffer.setdefault(payment_id, payment)
+            raise
+        return len(batch)
+
+
+async def _flush_loop():
+    """Vaciar el buffer periódicamente o cuando se llena"""
+    while True:
+        try:
+            await asyncio.wait_for(_flush_requested.wait(), timeout=PAYMENT_LEDGER_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _flush_requested.clear()
+        try:
+            await flush_payment_ledger()
+        except Exception as e:
+            logger.warning("Error escribiendo el libro de pagos: %s", e, extra={"pending": len(_buffer)})
+
+
+def start_payment_ledger():
+    """Iniciar la escritura diferida del libro de pagos (startup)"""
+    global _flush_task, _flush_requested, _flush_lock
+    if not DATABASE_URL:
+        return
+    if _flush_task is None or _flush_task.done():
+        _flush_requested = asyncio.Event()
+        _flush_lock = asyncio.Lock()
+        _flush_task = asyncio.create_task(_flush_loop())
+
+
+async def stop_payment_ledger():
+    """Detener la tarea de fondo y escribir lo que quede en el buffer (shutdown)"""
+    global _flush_task
+    if _flush_task is not None:
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+        _flush_task = None
+    if _buffer and DATABASE_URL:
+        try:
+            written = await flush_payment_ledger()
+            logger.info("Libro de pagos: %d pagos escritos al cerrar", written)
+        except Exception as e:
+            logger.error("No se pudieron escribir %d pagos del libro: %s", len(_buffer), e)
+
+
+async def claim_payment(payment: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Registrar un pago nuevo como el pago vigente de su pedido y método.
+    Retorna None si se insertó, o el pago vigente que ya existía (de este u otro
+    worker); en ese caso el pago nuevo no se registra.
+    """
+    record = _to_record(payment)
+    order_id, payment_method = record[1], record[2]
+    for _ in range(CLAIM_ATTEMPTS):
+        conn = await get_connection()
+        try:
+            now = datetime.utcnow()
+            await conn.execute(
+                EXPIRE_STALE_PENDING_SQL, order_id, payment_method,
+                now, now - timedelta(seconds=PAYMENT_PENDING_STALE_SECONDS)
+            )
+            if await conn.fetchval(CLAIM_PAYMENT_SQL, *record):
+                return None
+            row = await conn.fetchrow(ACTIVE_PAYMENT_SQL, order_id, payment_method)
+        finally:
+            await conn.close()
+
+        if row is None:
+            # El pago vigente finalizó entre la inserción y la consulta
+            continue
+        existing = convert_uuid_to_str(dict(row))
+        buffered = _buffer.get(existing["paymentId"])
+        if buffered is None:
+            return existing
+        if buffered["status"] in ACTIVE_STATUSES:
+            return dict(buffered)
+        # Finalizó en este worker pero la tabla aún no lo refleja
+        await flush_payment_ledger()
+    raise RuntimeError(f"Could not register payment for order {payment['orderId']}")
+
+
+async def get_ledger_payment(payment_id: str) -> Optional[Dict[str, Any]]:
+    """Obtener un pago del libro por su id"""
+    buffered = _buffer.get(payment_id)
+    if buffered:
+        return dict(buffered)
+
+    conn = await get_connection()
+    try:
+        row = await conn.fetchrow(
+            """
+            SELECT id AS "paymentId", "orderId", "paymentMethod", amount::float AS amount, status,
+                   "transactionId", message, "createdAt", "updatedAt"
+            FROM payments
+            WHERE id = $1
+            """,
+            UUID(payment_id)
+        )
+        return convert_uuid_to_str(dict(row)) if row else None
+    finally:
+        await conn.close()
@@ -0,0 +1,236 @@
+"""
+Procesamiento asíncrono de pagos con tarjeta.
+POST /api/payments/process encola el pago y responde de inmediato (202); un
+pool de workers asyncio en el mismo proceso realiza la autorización y el
+resultado se consulta en GET /api/payments/{paymentId}. Cada cambio de estado
+se registra en el libro de pagos (services/payment_ledger.py); el pago nuevo
+se inserta en el libro antes de encolarlo, de modo que dos workers no cobran
+dos veces el mismo pedido.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.payment_gateway import get_payment_gateway, close_payment_gateway
+from services.payment_ledger import record_payment, claim_payment
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_WORKERS = int(os.getenv("PAYMENT_WORKERS", "8"))
+PAYMENT_QUEUE_SIZE = int(os.getenv("PAYMENT_QUEUE_SIZE", "1000"))
+# Tiempo que se conserva el resultado de un pago ya finalizado
+PAYMENT_RESULT_TTL_SECONDS = float(os.getenv("PAYMENT_RESULT_TTL_SECONDS", "600"))
+
+PENDING = "PENDING"
+APPROVED = "APPROVED"
+DECLINED = "DECLINED"
+FAILED = "FAILED"
+FINAL_STATUSES = (APPROVED, DECLINED, FAILED)
+# Estados que impiden un nuevo cobro del mismo pedido con el mismo método
+ACTIVE_STATUSES = (PENDING, APPROVED)
+
+
+class PaymentQueueFull(Exception):
+    """La cola de pagos está llena: el cliente debe reintentar más tarde"""
+
+
+# Estado global del proceso (un pool por worker de uvicorn)
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_payments: Dict[str, Dict[str, Any]] = {}
+_events: Dict[str, asyncio.Event] = {}
+_finished_at: Dict[str, float] = {}
+# (orderId, paymentMethod) -> paymentId del último pago vigente en memoria
+_by_order: Dict[Tuple[str, str], str] = {}
+
+
+async def authorize_card_payment(payment: Dict[str, Any]) -> Dict[str, Any]:
+    """Autorizar un pago con tarjeta en la pasarela configurada"""
+    return await get_payment_gateway().authorize(payment)
+
+
+async def _worker():
+    """Tomar pagos de la cola y autorizarlos"""
+    while True:
+        payment_id = await _queue.get()
+        try:
+            payment = _payments.get(payment_id)
+            if payment is None:
+                continue
+            try:
+                result = await authorize_card_payment(payment)
+            except Exception:
+                logger.exception("Error autorizando pago", extra={"paymentId": payment_id})
+                result = {"status": FAILED, "message": "Payment processing failed"}
+            _finish(payment_id, result)
+        finally:
+            _queue.task_done()
+
+
+def _finish(payment_id: str, result: Dict[str, Any]):
+    """Guardar el resultado de un pago y despertar a quien lo espera"""
+    payment = _payments.get(payment_id)
+    if payment is None:
+        return
+    payment.update(result)
+    payment["updatedAt"] = datetime.utcnow().isoformat()
+    _finished_at[payment_id] = time.monotonic()
+    if payment["status"] not in ACTIVE_STATUSES:
+        _release_order(payment)
+    record_payment(payment)
+    event = _events.pop(payment_id, None)
+    if event is not None:
+        event.set()
+
+
+def _prune_finished():
+    """Descartar resultados finalizados más antiguos que PAYMENT_RESULT_TTL_SECONDS"""
+    limit = time.monotonic() - PAYMENT_RESULT_TTL_SECONDS
+    expired = [pid for pid, finished in _finished_at.items() if finished < limit]
+    for payment_id in expired:
+        _finished_at.pop(payment_id, None)
+        payment = _payments.pop(payment_id, None)
+        if payment:
+            _release_order(payment)
+
+
+def _release_order(payment: Dict[str, Any]):
+    """Quitar el pago del índice por pedido (permite un nuevo intento)"""
+    key = (payment["orderId"], payment["paymentMethod"])
+    if _by_order.get(key) == payment["paymentId"]:
+        del _by_order[key]
+
+
+def _find_in_memory(order_id: str, payment_method: str) -> Optional[Dict[str, Any]]:
+    payment_id = _by_order.get((order_id, payment_method))
+    payment = _payments.get(payment_id) if payment_id else None
+    if payment and payment["status"] in ACTIVE_STATUSES:
+        return dict(payment)
+    return None
+
+
+def _new_payment(order_id: str, amount: float, payment_method: str, status: str, message: str) -> Dict[str, Any]:
+    now = datetime.utcnow().isoformat()
+    return {
+        "paymentId": str(uuid.uuid4()),
+        "orderId": order_id,
+        "amount": amount,
+        "paymentMethod": payment_method,
+        "status": status,
+        "transactionId": None,
+        "message": message,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+def _track(payment: Dict[str, Any]):
+    """Guardar en memoria e indexar por pedido un pago ya registrado con claim_payment"""
+    _payments[payment["paymentId"]] = payment
+    _by_order[(payment["orderId"], payment["paymentMethod"])] = payment["paymentId"]
+
+
+def start_payment_workers():
+    """Iniciar el pool de workers de pagos en el event loop actual (startup)"""
+    global _queue, _workers, _loop
+    loop = asyncio.get_running_loop()
+    if _loop is loop and _queue is not None:
+        return
+    _loop = loop
+    _queue = asyncio.Queue(maxsize=PAYMENT_QUEUE_SIZE)
+    _workers = [asyncio.create_task(_worker()) for _ in range(PAYMENT_WORKERS)]
+    logger.info("Pool de pagos iniciado: %d workers", PAYMENT_WORKERS)
+
+
+async def stop_payment_workers(timeout: float = 5.0):
+    """Esperar a que se procesen los pagos encolados y detener los workers (shutdown)"""
+    global _queue, _workers, _loop
+    if _queue is None:
+        return
+    try:
+        await asyncio.wait_for(_queue.join(), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Pagos pendientes sin procesar al cerrar")
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    # Los pagos que no alcanzaron a procesarse quedan como fallidos
+    for payment_id, payment in list(_payments.items()):
+        if payment["status"] == PENDING:
+            _finish(payment_id, {"status": FAILED, "message": "Payment processing interrupted"})
+    _workers = []
+    _queue = None
+    _loop = None
+    await close_payment_gateway()
+
+
+async def submit_card_payment(order_id: str, amount: float) -> Tuple[Dict[str, Any], bool]:
+    """
+    Registrar un pago con tarjeta y encolarlo para autorización.
+    Si el pedido ya tiene un pago con tarjeta vigente (en este u otro worker)
+    se retorna ese pago (idempotencia por pedido + método). Retorna (pago, creado).
+    """
+    existing = _find_in_memory(order_id, "CARD")
+    if existing:
+        return existing, False
+
+    start_payment_workers()
+    _prune_finished()
+    if _queue.full():
+        raise PaymentQueueFull()
+
+    payment = _new_payment(order_id, amount, "CARD", PENDING, "Card payment is being processed")
+    existing = await claim_payment(payment)
+    if existing:
+        return existing, False
+
+    _track(payment)
+    try:
+        _queue.put_nowait(payment["paymentId"])
+    except asyncio.QueueFull:
+        # Se llenó mientras se registraba: el pago deja de estar vigente
+        _finish(payment["paymentId"], {"status": FAILED, "message": "Payment service is busy"})
+        raise PaymentQueueFull()
+
+    _events[payment["paymentId"]] = asyncio.Event()
+    return dict(payment), True
+
+
+async def register_cash_payment(order_id: str, amount: float) -> Tuple[Dict[str, Any], bool]:
+    """Registrar un pago en efectivo contra entrega (idempotente por pedido). Retorna (pago, creado)"""
+    existing = _find_in_memory(order_id, "CASH")
+    if existing:
+        return existing, False
+
+    _prune_finished()
+    payment = _new_payment(order_id, amount, "CASH", APPROVED, "Payment method registered: Cash on delivery")
+    payment["transactionId"] = f"CASH-{int(time.time() * 1000)}"
+    existing = await claim_payment(payment)
+    if existing:
+        return existing, False
+
+    _finished_at[payment["paymentId"]] = time.monotonic()
+    _track(payment)
+    return dict(payment), True
+
+
+def get_payment(payment_id: str) -> Optional[Dict[str, Any]]:
+    """Obtener el estado actual de un pago"""
+    payment = _payments.get(payment_id)
+    return dict(payment) if payment else None
+
+
+async def wait_for_payment(payment_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+    """Esperar (long polling) hasta que el pago finalice o se agote el timeout"""
+    event = _events.get(payment_id)
+    if event is not None and timeout > 0:
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    return get_payment(payment_id)
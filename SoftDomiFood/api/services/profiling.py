@@ -0,0 +1,135 @@
+"""
+Perfilado bajo demanda de peticiones.
+Una petición se perfila si trae la cabecera X-Profile: 1 con un token de
+administrador, o si cae en la fracción muestreada PROFILING_SAMPLE_RATE (0 por
+defecto). Se usa el profiler estadístico de pyinstrument en modo asíncrono:
+mide tiempo de reloj de la petición, incluidos los await, sin contar el trabajo
+de otras peticiones que corren en el mismo event loop.
+
+Los perfiles se guardan en un buffer circular en memoria (PROFILE_BUFFER_SIZE,
+por worker) y se listan/descargan desde /api/admin/profiles en formato
+speedscope (https://www.speedscope.app) o HTML de pyinstrument.
+"""
+import logging
+import os
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from pyinstrument import Profiler
+from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+
+from services.auth_service import decode_token
+
+logger = logging.getLogger(__name__)
+
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.001"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+PROFILE_FORMATS = {
+    "speedscope": ("application/json", "speedscope.json"),
+    "html": ("text/html; charset=utf-8", "html"),
+}
+
+# id -> perfil (metadatos + sesión de pyinstrument); se descarta el más antiguo
+_profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+def _store_profile(profile: Dict[str, Any]):
+    _profiles[profile["id"]] = profile
+    while len(_profiles) > PROFILE_BUFFER_SIZE:
+        _profiles.popitem(last=False)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Perfiles guardados (más recientes primero), sin la sesión"""
+    return [
+        {key: value for key, value in profile.items() if key != "session"}
+        for profile in reversed(_profiles.values())
+    ]
+
+
+def render_profile(profile_id: str, fmt: str = "speedscope") -> Optional[str]:
+    """Perfil en el formato indicado, o None si ya no está en el buffer"""
+    profile = _profiles.get(profile_id)
+    if profile is None:
+        return None
+    if fmt == "html":
+        return HTMLRenderer().render(profile["session"])
+    return SpeedscopeRenderer().render(profile["session"])
+
+
+def clear_profiles():
+    """Vaciar el buffer de perfiles"""
+    _profiles.clear()
+
+
+def _is_admin_request(headers: Dict[bytes, bytes]) -> bool:
+    """X-Profile activado y token Bearer de administrador"""
+    if headers.get(PROFILE_HEADER, b"").lower() not in (b"1", b"true"):
+        return False
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if not authorization.lower().startswith("bearer "):
+        return False
+    payload = decode_token(authorization[7:].strip())
+    return bool(payload) and payload.get("role") == "ADMIN"
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI: perfila las peticiones solicitadas o muestreadas"""
+
+    def __init__(self, app, sample_rate: Optional[float] = None):
+        self.app = app
+        self.sample_rate = PROFILING_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if _is_admin_request(dict(scope["headers"])):
+            trigger = "header"
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            trigger = "sample"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER, profile_id.encode())]
+            await send(message)
+
+        profiler = Profiler(interval=PROFILE_INTERVAL_SECONDS, async_mode="enabled")
+        started_at = time.time()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session = profiler.stop()
+            route = scope.get("route")
+            _store_profile({
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": status_code,
+                "trigger": trigger,
+                "durationMs": round(session.duration * 1000, 3),
+                "samples": session.sample_count,
+                "createdAt": started_at,
+                "session": session,
+            })
+            logger.info("Petición perfilada", extra={"profileId": profile_id, "path": scope["path"],
+                                                      "durationMs": round(session.duration * 1000, 3)})
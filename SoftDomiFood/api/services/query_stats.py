@@ -0,0 +1,243 @@
+"""
+Estadísticas de consultas a PostgreSQL desde el cliente (al estilo de
+pg_stat_statements). Cada consulta ejecutada por las conexiones de
+get_connection() se agrupa por huella (el SQL normalizado, sin literales) y
+acumula llamadas, duración, filas y espera de conexión. Además se guardan las
+N ejecuciones más lentas de la ventana reciente de cada huella, y las que
+superan SLOW_QUERY_MS se registran junto con la forma de sus parámetros (tipo
+y tamaño, nunca los valores).
+
+Las estadísticas son por worker de uvicorn: GET /api/admin/queries muestra
+las del worker que atiende la petición.
+"""
+import heapq
+import logging
+import os
+import re
+import sys
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+QUERY_STATS_TOP_N = int(os.getenv("QUERY_STATS_TOP_N", "10"))
+QUERY_STATS_WINDOW_SECONDS = float(os.getenv("QUERY_STATS_WINDOW_SECONDS", "300"))
+# Tope de huellas distintas (el SQL dinámico no debe crecer sin límite)
+QUERY_STATS_MAX_FINGERPRINTS = int(os.getenv("QUERY_STATS_MAX_FINGERPRINTS", "500"))
+
+SORT_KEYS = ("totalMs", "meanMs", "maxMs", "calls", "rows", "waitMs")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_COMMAND_ROWS = re.compile(r"(\d+)$")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> str:
+    """SQL normalizado: espacios colapsados y literales reemplazados por ?"""
+    normalized = _STRING_LITERAL.sub("?", sql)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (?...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def param_shape(value: Any) -> str:
+    """Forma de un parámetro: tipo y, para colecciones y textos, su tamaño"""
+    if value is None:
+        return "null"
+    type_name = type(value).__name__
+    if isinstance(value, (str, bytes)):
+        return f"{type_name}({len(value)})"
+    if isinstance(value, (list, tuple, set)):
+        inner = sorted({type(item).__name__ for item in value})
+        return f"{type_name}[{'|'.join(inner)}]({len(value)})"
+    return type_name
+
+
+class QueryStat:
+    """Acumulado de una huella de consulta"""
+
+    __slots__ = ("fingerprint", "name", "calls", "errors", "total", "min", "max",
+                 "rows", "wait", "slow_calls", "_slowest")
+
+    def __init__(self, query_fingerprint: str, name: str):
+        self.fingerprint = query_fingerprint
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.rows = 0
+        self.wait = 0.0
+        self.slow_calls = 0
+        # Min-heap de (duración, momento, muestra): las N más lentas de la ventana
+        self._slowest: List[Tuple[float, float, Dict[str, Any]]] = []
+
+    def _prune(self, now: float):
+        cutoff = now - QUERY_STATS_WINDOW_SECONDS
+        if any(ts < cutoff for _, ts, _ in self._slowest):
+            self._slowest = [entry for entry in self._slowest if entry[1] >= cutoff]
+            heapq.heapify(self._slowest)
+
+    def add(self, duration: float, rows: int, wait: float, shapes: List[str], error: bool, now: float):
+        self.calls += 1
+        self.errors += error
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+        self.rows += rows
+        self.wait += wait
+        if duration * 1000 >= SLOW_QUERY_MS:
+            self.slow_calls += 1
+
+        self._prune(now)
+        if len(self._slowest) < QUERY_STATS_TOP_N or duration > self._slowest[0][0]:
+            sample = {"durationMs": round(duration * 1000, 3), "rows": rows,
+                      "waitMs": round(wait * 1000, 3), "params": shapes, "error": error,
+                      "at": time.time()}
+            entry = (duration, now, sample)
+            if len(self._slowest) < QUERY_STATS_TOP_N:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heapreplace(self._slowest, entry)
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        self._prune(now)
+        return {
+            "fingerprint": self.fingerprint,
+            "name": self.name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "totalMs": round(self.total * 1000, 3),
+            "meanMs": round(self.total * 1000 / self.calls, 3) if self.calls else 0.0,
+            "minMs": round(self.min * 1000, 3) if self.calls else 0.0,
+            "maxMs": round(self.max * 1000, 3),
+            "waitMs": round(self.wait * 1000, 3),
+            "slowCalls": self.slow_calls,
+            "slowest": [sample for _, _, sample in sorted(self._slowest, key=lambda e: e[0], reverse=True)],
+        }
+
+
+_stats: Dict[str, QueryStat] = {}
+_since = time.time()
+
+
+def record_query(sql: str, name: str, duration: float, rows: int = 0, wait: float = 0.0,
+                 params: Tuple = (), error: bool = False):
+    """Registrar una ejecución (y escribirla en el log si es lenta)"""
+    key = fingerprint(sql)
+    stat = _stats.get(key)
+    if stat is None:
+        if len(_stats) >= QUERY_STATS_MAX_FINGERPRINTS:
+            # Descartar la huella con menos llamadas para hacer sitio
+            del _stats[min(_stats.values(), key=lambda s: s.calls).fingerprint]
+        stat = _stats[key] = QueryStat(key, name)
+    shapes = [param_shape(p) for p in params]
+    stat.add(duration, rows, wait, shapes, error, time.monotonic())
+
+    if duration * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Consulta lenta en %s", name, extra={
+            "durationMs": round(duration * 1000, 3), "rows": rows, "waitMs": round(wait * 1000, 3),
+            "fingerprint": key[:500], "params": shapes, "error": error,
+        })
+
+
+def get_query_stats(limit: int = 20, sort: str = "totalMs") -> Dict[str, Any]:
+    """Top de huellas ordenado por la métrica indicada"""
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort debe ser uno de: {', '.join(SORT_KEYS)}")
+    now = time.monotonic()
+    queries = [stat.to_dict(now) for stat in _stats.values()]
+    queries.sort(key=lambda q: q[sort], reverse=True)
+    return {
+        "since": _since,
+        "slowQueryMs": SLOW_QUERY_MS,
+        "fingerprints": len(queries),
+        "queries": queries[:limit],
+    }
+
+
+def reset_query_stats():
+    """Borrar las estadísticas acumuladas"""
+    global _since
+    _stats.clear()
+    _since = time.time()
+
+
+def _caller_name() -> str:
+    """Función de la API que ejecutó la consulta (saltando asyncpg y este módulo)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith("asyncpg") and module != __name__:
+            return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _command_rows(status: Optional[str]) -> int:
+    """Filas afectadas a partir del estado de execute() (p. ej. 'UPDATE 3')"""
+    match = _COMMAND_ROWS.search(status or "")
+    return int(match.group(1)) if match else 0
+
+
+class InstrumentedConnection(asyncpg.Connection):
+    """
+    Conexión de asyncpg que mide cada consulta. La espera para abrir la conexión
+    (connect_wait, fijada por get_connection) se atribuye a su primera consulta.
+    """
+
+    connect_wait = 0.0
+
+    def _take_wait(self) -> float:
+        wait, self.connect_wait = self.connect_wait, 0.0
+        return wait
+
+    async def _instrumented(self, sql: str, params: Tuple, call, count_rows):
+        name = _caller_name()
+        wait = self._take_wait()
+        start = time.perf_counter()
+        try:
+            result = await call
+        except Exception:
+            record_query(sql, name, time.perf_counter() - start, 0, wait, params, error=True)
+            raise
+        record_query(sql, name, time.perf_counter() - start, count_rows(result), wait, params)
+        return result
+
+    async def execute(self, query, *args, **kwargs):
+        return await self._instrumented(query, args, super().execute(query, *args, **kwargs), _command_rows)
+
+    async def executemany(self, command, args, **kwargs):
+        args = list(args)
+        return await self._instrumented(
+            command, (args,), super().executemany(command, args, **kwargs), lambda _: len(args))
+
+    async def fetch(self, query, *args, **kwargs):
+        return await self._instrumented(query, args, super().fetch(query, *args, **kwargs), len)
+
+    async def fetchrow(self, query, *args, **kwargs):
+        return await self._instrumented(
+            query, args, super().fetchrow(query, *args, **kwargs), lambda row: int(row is not None))
+
+    async def fetchval(self, query, *args, **kwargs):
+        return await self._instrumented(
+            query, args, super().fetchval(query, *args, **kwargs), lambda value: int(value is not None))
+
+    async def copy_records_to_table(self, table_name, *, records, **kwargs):
+        records = list(records)
+        return await self._instrumented(
+            f"COPY {table_name} FROM STDIN", (records,),
+            super().copy_records_to_table(table_name, records=records, **kwargs), lambda _: len(records))
+
+    async def copy_from_query(self, query, *args, **kwargs):
+        return await self._instrumented(
+            f"COPY ({query}) TO STDOUT", args, super().copy_from_query(query, *args, **kwargs), _command_rows)
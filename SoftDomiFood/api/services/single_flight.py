@@ -0,0 +1,70 @@
+"""
+Coalescencia de lecturas idénticas concurrentes (single-flight).
+Las llamadas con la misma clave que llegan mientras una consulta está en curso
+esperan esa misma consulta en lugar de lanzar otra: con la caché del catálogo
+fría o recién expirada, cientos de peticiones simultáneas producen una sola
+consulta a PostgreSQL.
+
+La consulta compartida corre en su propia tarea. Cada llamador la espera
+protegido con asyncio.shield: si se cancela (el cliente se desconectó) o
+supera su timeout, se desengancha sin cancelar la consulta que esperan los
+demás, que termina y llena la caché igualmente.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from services.metrics import SINGLE_FLIGHT_CALLS
+
+SINGLE_FLIGHT_TIMEOUT_SECONDS = float(os.getenv("SINGLE_FLIGHT_TIMEOUT_SECONDS", "10"))
+
+T = TypeVar("T")
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Un llamador superó su timeout esperando la consulta compartida"""
+
+
+class SingleFlight:
+    """Grupo de llamadas coalescidas por clave (una instancia por tipo de lectura)"""
+
+    def __init__(self, name: str, timeout: Optional[float] = None):
+        self.name = name
+        self.timeout = SINGLE_FLIGHT_TIMEOUT_SECONDS if timeout is None else timeout
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """
+        Resultado de fn() para key, compartido con las llamadas concurrentes con
+        la misma clave. timeout (segundos, <= 0 sin límite) acota la espera de
+        este llamador; al vencer lanza SingleFlightTimeout.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+        # Una tarea de otro event loop (p. ej. otro TestClient) no se puede esperar
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            SINGLE_FLIGHT_CALLS.labels(self.name, "leader").inc()
+        else:
+            SINGLE_FLIGHT_CALLS.labels(self.name, "shared").inc()
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            if timeout > 0:
+                return await asyncio.wait_for(asyncio.shield(task), timeout)
+            return await asyncio.shield(task)
+        except asyncio.TimeoutError:
+            SINGLE_FLIGHT_CALLS.labels(self.name, "timeout").inc()
+            raise SingleFlightTimeout(f"{self.name}: sin respuesta en {timeout} s para {key!r}") from None
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Marcar la excepción como recuperada aunque todos los llamadores se hayan ido
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from services.database_service import DATABASE_URL, get_connection, convert_uuid_to_str
+
+logger = logging.getLogger(__name__)
+
+# Suma periódica de los incrementos pendientes (*_delta) a los agregados
+STATS_FOLD_INTERVAL_SECONDS = float(os.getenv("STATS_FOLD_INTERVAL_SECONDS", "10"))
+
+# Reconciliación periódica de los agregados del dashboard
+STATS_RECONCILE_INTERVAL_SECONDS = float(os.getenv("STATS_RECONCILE_INTERVAL_SECONDS", "900"))
+STATS_RECONCILE_DAYS = int(os.getenv("STATS_RECONCILE_DAYS", "2"))
+
+# Número de productos en el ranking de más vendidos
+TOP_PRODUCTS_LIMIT = 10
+
+_reconcile_task: Optional[asyncio.Task] = None
+_fold_task: Optional[asyncio.Task] = None
+
+async def get_dashboard_stats(days: int = 30) -> Dict[str, Any]:
+    """
+    Obtener estadísticas del dashboard desde las tablas de agregados (admin).
+    Las vistas *_current suman los incrementos aún no plegados: el resultado no
+    depende de cuándo corrió fold_order_stats.
+    """
+    conn = await get_connection()
+    try:
+        today = await conn.fetchrow(
+            """
+            SELECT
+                COALESCE(SUM(orders) FILTER (WHERE status <> 'CANCELLED'), 0)::int AS orders,
+                COALESCE(SUM(amount) FILTER (WHERE status <> 'CANCELLED'), 0) AS revenue
+            FROM stats_daily_current
+            WHERE day = CURRENT_DATE
+            """
+        )
+
+        by_status = await conn.fetch(
+            """
+            SELECT status, SUM(orders)::int AS orders
+            FROM stats_daily_current
+            WHERE day > CURRENT_DATE - $1::int
+            GROUP BY status
+            HAVING SUM(orders) > 0
+            """,
+            days
+        )
+
+        daily = await conn.fetch(
+            """
+            SELECT
+                day,
+                SUM(orders)::int AS orders,
+                COALESCE(SUM(amount) FILTER (WHERE status <> 'CANCELLED'), 0) AS revenue
+            FROM stats_daily_current
+            WHERE day > CURRENT_DATE - $1::int
+            GROUP BY day
+            ORDER BY day
+            """,
+            days
+        )
+
+        hourly = await conn.fetch(
+            """
+            SELECT bucket, SUM(orders)::int AS orders, SUM(revenue) AS revenue
+            FROM stats_hourly_current
+            WHERE bucket >= date_trunc('hour', NOW()) - INTERVAL '23 hours'
+            GROUP BY bucket
+            ORDER BY bucket
+            """
+        )
+
+        top_products = await conn.fetch(
+            """
+            SELECT
+                "productId",
+                MAX("productName") AS "productName",
+                SUM(units)::int AS units,
+                SUM(revenue) AS revenue
+            FROM stats_product_daily_current
+            WHERE day > CURRENT_DATE - $1::int
+            GROUP BY "productId"
+            HAVING SUM(units) > 0
+            ORDER BY units DESC
+            LIMIT $2
+            """,
+            days, TOP_PRODUCTS_LIMIT
+        )
+
+        return {
+            "days": days,
+            "today": convert_uuid_to_str(dict(today)),
+            "ordersByStatus": {row["status"]: row["orders"] for row in by_status},
+            "daily": [convert_uuid_to_str(dict(row)) for row in daily],
+            "hourly": [convert_uuid_to_str(dict(row)) for row in hourly],
+            "topProducts": [convert_uuid_to_str(dict(row)) for row in top_products],
+        }
+    finally:
+        await conn.close()
+
+async def reconcile_order_stats(days: Optional[int] = STATS_RECONCILE_DAYS) -> bool:
+    """
+    Recalcular los agregados de los últimos `days` días (None = todo el historial).
+    Retorna False si otro worker ya está reconciliando.
+    """
+    conn = await get_connection()
+    try:
+        async with conn.transaction():
+            # Con varios workers de uvicorn, solo uno reconcilia a la vez
+            acquired = await conn.fetchval(
+                "SELECT pg_try_advisory_xact_lock(hashtext('reconcile_order_stats'))"
+            )
+            if not acquired:
+                return False
+
+            if days is None:
+                await conn.execute("SELECT reconcile_order_stats('-infinity')")
+            else:
+                await conn.execute(
+                    "SELECT reconcile_order_stats(NOW()::timestamp - make_interval(days => $1))",
+                    days
+                )
+            return True
+    finally:
+        await conn.close()
+
+async def fold_order_stats() -> Optional[int]:
+    """
+    Sumar los incrementos pendientes a los agregados. Retorna cuántas filas de
+    incrementos se sumaron, o None si otro worker ya lo está haciendo.
+    """
+    conn = await get_connection()
+    try:
+        async with conn.transaction():
+            # Con varios workers de uvicorn, solo uno pliega a la vez
+            acquired = await conn.fetchval(
+                "SELECT pg_try_advisory_xact_lock(hashtext('fold_order_stats'))"
+            )
+            if not acquired:
+                return None
+            return await conn.fetchval("SELECT fold_order_stats()")
+    finally:
+        await conn.close()
+
+async def _fold_loop():
+    """Plegar los incrementos pendientes cada STATS_FOLD_INTERVAL_SECONDS"""
+    while True:
+        await asyncio.sleep(STATS_FOLD_INTERVAL_SECONDS)
+        try:
+            await fold_order_stats()
+        except Exception as e:
+            logger.warning("Error plegando estadísticas: %s", e)
+
+async def _reconcile_loop():
+    """Reconciliar los agregados recientes cada STATS_RECONCILE_INTERVAL_SECONDS"""
+    while True:
+        await asyncio.sleep(STATS_RECONCILE_INTERVAL_SECONDS)
+        try:
+            await reconcile_order_stats()
+        except Exception as e:
+            logger.warning("Error reconciliando estadísticas: %s", e)
+
+def start_stats_reconciliation():
+    """Iniciar las tareas periódicas de plegado y reconciliación (startup)"""
+    global _reconcile_task, _fold_task
+    if not DATABASE_URL:
+        return
+    if STATS_FOLD_INTERVAL_SECONDS > 0 and (_fold_task is None or _fold_task.done()):
+        _fold_task = asyncio.create_task(_fold_loop())
+    if STATS_RECONCILE_INTERVAL_SECONDS > 0 and (_reconcile_task is None or _reconcile_task.done()):
+        _reconcile_task = asyncio.create_task(_reconcile_loop())
+
+async def stop_stats_reconciliation():
+    """Detener las tareas periódicas de plegado y reconciliación (shutdown)"""
+    global _reconcile_task, _fold_task
+    for task in (_fold_task, _reconcile_task):
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    _fold_task = _reconcile_task = None
+
+if __name__ == "__main__":
+    # Reconstrucción manual: python -m services.stats_service [--days N]
+    import sys
+    days = int(sys.argv[sys.argv.index("--days") + 1]) if "--days" in sys.argv else None
+    asyncio.run(reconcile_order_stats(days))
+    print("✅ Estadísticas reconciliadas")
@@ -0,0 +1,410 @@
+"""
+Generador de datos sintéticos a gran escala.
+Crea millones de usuarios, direcciones, pedidos, items y documentos de lectura
+con distribuciones realistas:
+- popularidad de productos sesgada (Zipf) y clientes frecuentes
+- picos de almuerzo y cena, más pedidos viernes y sábado
+- pedidos antiguos entregados o cancelados, los de las últimas horas en curso
+
+Los datos se cargan con COPY (copy_records_to_table). Cada lote se genera en
+un proceso aparte y se copia por su propia conexión, en paralelo. Todo sale de
+la semilla: con el mismo --seed, --end-date y catálogo se obtienen los mismos
+datos, ids incluidos.
+
+Durante la carga se desactiva el trigger de estadísticas de order_documents
+(toma un bloqueo exclusivo breve sobre la tabla); al terminar se reconcilian
+los agregados del periodo generado.
+
+Uso:
+    python seed_data.py --generate --users 1000000 --orders 5000000 --seed 42 --workers 4
+    python seed_data.py --generate --users 1000000 --orders 5000000 --seed 42 --clear
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import asyncpg
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+
+# Dominio de los correos generados: identifica los datos sintéticos para --clear
+SYNTHETIC_EMAIL_DOMAIN = "synthetic.softdomi.test"
+SYNTHETIC_PASSWORD = "cliente123"
+
+USERS_PER_BATCH = int(os.getenv("SYNTHETIC_USERS_PER_BATCH", "10000"))
+ORDERS_PER_BATCH = int(os.getenv("SYNTHETIC_ORDERS_PER_BATCH", "20000"))
+
+USER_COLUMNS = ["id", "email", "password", "name", "phone", "role", "createdAt", "updatedAt"]
+ADDRESS_COLUMNS = ["id", "userId", "street", "city", "state", "zipCode", "country", "isDefault",
+                   "instructions", "createdAt", "updatedAt"]
+ORDER_COLUMNS = ["id", "userId", "addressId", "status", "total", "paymentMethod", "notes", "createdAt", "updatedAt"]
+ITEM_COLUMNS = ["id", "orderId", "productId", "quantity", "price", "notes", "createdAt"]
+DOCUMENT_COLUMNS = ["id", "userId", "status", "createdAt", "updatedAt", "document"]
+
+FIRST_NAMES = ["Juan", "María", "Carlos", "Ana", "Luis", "Laura", "Andrés", "Camila", "Jorge", "Valentina",
+               "Felipe", "Daniela", "Santiago", "Natalia", "Diego", "Paula", "Sebastián", "Carolina",
+               "Mateo", "Juliana", "Alejandro", "Sofía", "Nicolás", "Mariana"]
+LAST_NAMES = ["Pérez", "García", "Rodríguez", "Martínez", "Gómez", "López", "González", "Hernández",
+              "Sánchez", "Ramírez", "Torres", "Díaz", "Vargas", "Moreno", "Rojas", "Castro",
+              "Jiménez", "Ortiz", "Suárez", "Romero"]
+STREET_TYPES = ["Calle", "Carrera", "Avenida", "Diagonal", "Transversal"]
+# Códigos postales con centroide en data/delivery_zones.geojson (dentro de cobertura)
+ZIP_CODES = ["110111", "110221", "110231", "110911", "111011", "110411", "110511", "111511",
+             "110931", "111071", "110311"]
+INSTRUCTIONS = [None, None, None, "Portería", "Timbre dañado, llamar", "Apartamento 302", "Dejar en recepción"]
+ORDER_NOTES = ["Sin cebolla", "Salsas aparte", "Bien tostadas", "Sin picante", "Cubiertos extra"]
+
+# Pesos por hora del día (0-23): almuerzo 12-14 y cena 19-21
+HOUR_WEIGHTS = [1, 0.5, 0.2, 0, 0, 0, 0.2, 0.5, 1, 1.5, 3, 6,
+                14, 15, 9, 4, 3, 5, 9, 14, 16, 12, 6, 3]
+# Pesos por día de la semana (lunes = 0): más pedidos viernes y sábado
+WEEKDAY_WEIGHTS = [0.8, 0.85, 0.9, 1.0, 1.35, 1.5, 1.2]
+ITEMS_PER_ORDER = [1, 2, 3, 4, 5]
+ITEMS_PER_ORDER_WEIGHTS = list(accumulate([45, 30, 15, 7, 3]))
+QUANTITY_WEIGHTS = list(accumulate([75, 20, 5]))
+# Exponente de Zipf para la popularidad de productos y sesgo de clientes frecuentes
+PRODUCT_ZIPF_EXPONENT = 1.1
+CUSTOMER_SKEW = 2.2
+CANCELLED_RATE = 0.06
+CARD_RATE = 0.45
+NOTES_RATE = 0.1
+# Pedidos más recientes que esto siguen en curso
+ACTIVE_ORDER_WINDOW = timedelta(hours=2)
+ACTIVE_STATUSES = ["PENDING", "CONFIRMED", "PREPARING", "READY", "ON_DELIVERY"]
+
+
+class GenerationPlan(NamedTuple):
+    """Parámetros de la generación (se envían a los procesos generadores)"""
+    seed: int
+    users: int
+    start: datetime
+    end: datetime
+    password_hash: str
+    # (id, nombre, descripción, categoría, precio) ordenados por nombre
+    products: List[Tuple[uuid.UUID, str, Optional[str], str, Decimal]]
+    product_cum_weights: List[float]
+    day_cum_weights: List[float]
+    hour_cum_weights: List[float]
+
+
+# ============================================================================
+# IDS Y ATRIBUTOS DETERMINISTAS
+# ============================================================================
+
+def _digest(seed: int, kind: str, key: Any) -> bytes:
+    return hashlib.blake2b(f"{seed}:{kind}:{key}".encode(), digest_size=16).digest()
+
+
+def synthetic_uuid(seed: int, kind: str, key: Any) -> uuid.UUID:
+    """UUID v4 derivado de la semilla: el mismo (seed, kind, key) da el mismo id"""
+    return uuid.UUID(bytes=_digest(seed, kind, key), version=4)
+
+
+def user_profile(seed: int, index: int, start: datetime) -> Dict[str, Any]:
+    """Usuario `index`: se puede recalcular desde cualquier lote sin consultar la base"""
+    digest = _digest(seed, "user", index)
+    return {
+        "id": uuid.UUID(bytes=digest, version=4),
+        "email": f"cliente{index}.{seed}@{SYNTHETIC_EMAIL_DOMAIN}",
+        "name": f"{FIRST_NAMES[digest[0] % len(FIRST_NAMES)]} {LAST_NAMES[digest[1] % len(LAST_NAMES)]}",
+        "phone": "3" + str(int.from_bytes(digest[2:6], "big") % 10**9).zfill(9),
+        # Registrado hasta un año antes del inicio del periodo
+        "createdAt": start - timedelta(minutes=int.from_bytes(digest[6:9], "big") % (365 * 24 * 60)),
+        # 70% una dirección, 20% dos, 10% tres
+        "addresses": 1 if digest[9] < 179 else 2 if digest[9] < 230 else 3,
+    }
+
+
+def address_profile(seed: int, user_index: int, position: int) -> Dict[str, Any]:
+    """Dirección `position` del usuario `user_index` (la 0 es la predeterminada)"""
+    digest = _digest(seed, "address", f"{user_index}:{position}")
+    return {
+        "id": uuid.UUID(bytes=digest, version=4),
+        "street": f"{STREET_TYPES[digest[0] % len(STREET_TYPES)]} {digest[1] % 180 + 1} "
+                  f"#{digest[2] % 120 + 1}-{digest[3] % 99 + 1}",
+        "city": "Bogotá",
+        "state": "Cundinamarca",
+        "zipCode": ZIP_CODES[digest[4] % len(ZIP_CODES)],
+        "country": "Colombia",
+        "instructions": INSTRUCTIONS[digest[5] % len(INSTRUCTIONS)],
+    }
+
+
+# ============================================================================
+# GENERACIÓN DE LOTES (procesos del pool)
+# ============================================================================
+
+def generate_user_batch(plan: GenerationPlan, first: int, last: int) -> Tuple[List[tuple], List[tuple]]:
+    """Registros de users y addresses para los usuarios [first, last)"""
+    users, addresses = [], []
+    for index in range(first, last):
+        user = user_profile(plan.seed, index, plan.start)
+        users.append((user["id"], user["email"], plan.password_hash, user["name"], user["phone"],
+                      "CUSTOMER", user["createdAt"], user["createdAt"]))
+        for position in range(user["addresses"]):
+            address = address_profile(plan.seed, index, position)
+            addresses.append((address["id"], user["id"], address["street"], address["city"], address["state"],
+                              address["zipCode"], address["country"], position == 0, address["instructions"],
+                              user["createdAt"], user["createdAt"]))
+    return users, addresses
+
+
+def _order_status(rng: random.Random, created: datetime, end: datetime) -> Tuple[str, datetime]:
+    """Estado y fecha de actualización según la antigüedad del pedido"""
+    if end - created < ACTIVE_ORDER_WINDOW:
+        return rng.choice(ACTIVE_STATUSES), created + timedelta(minutes=rng.randint(0, 20))
+    if rng.random() < CANCELLED_RATE:
+        return "CANCELLED", created + timedelta(minutes=rng.randint(1, 15))
+    return "DELIVERED", created + timedelta(minutes=rng.randint(30, 75))
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def generate_order_batch(plan: GenerationPlan, first: int, last: int) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+    """Registros de orders, order_items y order_documents para los pedidos [first, last)"""
+    rng = random.Random(f"{plan.seed}:orders:{first}")
+    product_count = len(plan.products)
+    profiles: Dict[int, Dict[str, Any]] = {}
+    orders, items, documents = [], [], []
+
+    for index in range(first, last):
+        # Clientes frecuentes: los índices bajos concentran la mayoría de pedidos
+        user_index = min(int(plan.users * rng.random() ** CUSTOMER_SKEW), plan.users - 1)
+        user = profiles.get(user_index)
+        if user is None:
+            user = profiles[user_index] = user_profile(plan.seed, user_index, plan.start)
+        position = 0 if user["addresses"] == 1 or rng.random() < 0.85 else rng.randrange(user["addresses"])
+        address = address_profile(plan.seed, user_index, position)
+
+        day = bisect_left(plan.day_cum_weights, rng.random() * plan.day_cum_weights[-1])
+        hour = bisect_left(plan.hour_cum_weights, rng.random() * plan.hour_cum_weights[-1])
+        created = plan.start + timedelta(days=day, hours=hour, seconds=rng.randrange(3600))
+        status, updated = _order_status(rng, created, plan.end)
+
+        order_id = synthetic_uuid(plan.seed, "order", index)
+        # Productos sin repetir dentro del pedido, sesgados por popularidad
+        count = rng.choices(ITEMS_PER_ORDER, cum_weights=ITEMS_PER_ORDER_WEIGHTS)[0]
+        chosen = dict.fromkeys(rng.choices(range(product_count), cum_weights=plan.product_cum_weights, k=count))
+        total = Decimal(0)
+        document_items = []
+        for position_in_order, product_index in enumerate(chosen):
+            product_id, product_name, description, category, price = plan.products[product_index]
+            quantity = rng.choices((1, 2, 3), cum_weights=QUANTITY_WEIGHTS)[0]
+            total += price * quantity
+            item_id = synthetic_uuid(plan.seed, "item", f"{index}:{position_in_order}")
+            items.append((item_id, order_id, product_id, quantity, price, None, created))
+            document_items.append({
+                "id": item_id, "productId": product_id, "product_id": product_id, "quantity": quantity,
+                "price": price, "product_name": product_name, "product_description": description,
+                "product_category": category,
+            })
+
+        payment_method = "CARD" if rng.random() < CARD_RATE else "CASH"
+        notes = rng.choice(ORDER_NOTES) if rng.random() < NOTES_RATE else None
+        orders.append((order_id, user["id"], address["id"], status, total, payment_method, notes, created, updated))
+
+        # Mismo contenido que build_order_document (init_db.py)
+        document = {
+            "id": order_id, "userId": user["id"], "addressId": address["id"], "status": status,
+            "total": total, "deliveryFee": 0, "paymentMethod": payment_method, "notes": notes,
+            "createdAt": created, "updatedAt": updated,
+            "customer_id": user["id"], "customer_name": user["name"], "customer_email": user["email"],
+            "customer_phone": user["phone"],
+            "delivery_street": address["street"], "delivery_city": address["city"],
+            "delivery_state": address["state"], "delivery_zipcode": address["zipCode"],
+            "delivery_country": address["country"], "delivery_instructions": address["instructions"],
+            "itemCount": sum(item["quantity"] for item in document_items),
+            "items": document_items,
+        }
+        documents.append((order_id, user["id"], status, created, updated,
+                          json.dumps(document, default=_json_default, ensure_ascii=False)))
+    return orders, items, documents
+
+
+# ============================================================================
+# PLAN Y CARGA
+# ============================================================================
+
+def build_plan(seed: int, users: int, end: datetime, days: int, password_hash: str,
+               products: List[Tuple[uuid.UUID, str, Optional[str], str, Decimal]]) -> GenerationPlan:
+    """Distribuciones acumuladas para el periodo [end - days, end)"""
+    start = end - timedelta(days=days)
+    # Ranking de popularidad: orden de productos barajado con la semilla
+    ranking = list(range(len(products)))
+    random.Random(f"{seed}:products").shuffle(ranking)
+    weights = [0.0] * len(products)
+    for rank, product_index in enumerate(ranking):
+        weights[product_index] = 1 / (rank + 1) ** PRODUCT_ZIPF_EXPONENT
+    day_weights = [WEEKDAY_WEIGHTS[(start + timedelta(days=day)).weekday()] for day in range(days)]
+    return GenerationPlan(
+        seed=seed, users=users, start=start, end=end, password_hash=password_hash, products=products,
+        product_cum_weights=list(accumulate(weights)),
+        day_cum_weights=list(accumulate(day_weights)),
+        hour_cum_weights=list(accumulate(HOUR_WEIGHTS)),
+    )
+
+
+async def load_user_batch(conn: asyncpg.Connection, batch):
+    users, addresses = batch
+    await conn.copy_records_to_table("users", records=users, columns=USER_COLUMNS)
+    await conn.copy_records_to_table("addresses", records=addresses, columns=ADDRESS_COLUMNS)
+    return len(users) + len(addresses)
+
+
+async def load_order_batch(conn: asyncpg.Connection, batch):
+    orders, items, documents = batch
+    await conn.copy_records_to_table("orders", records=orders, columns=ORDER_COLUMNS)
+    await conn.copy_records_to_table("order_items", records=items, columns=ITEM_COLUMNS)
+    await conn.copy_records_to_table("order_documents", records=documents, columns=DOCUMENT_COLUMNS)
+    return len(orders) + len(items) + len(documents)
+
+
+async def run_batches(pool: ProcessPoolExecutor, workers: int, generate, plan: GenerationPlan,
+                      total: int, batch_size: int, load, label: str) -> int:
+    """Generar lotes en el pool y copiarlos en paralelo, una conexión por worker"""
+    loop = asyncio.get_running_loop()
+    ranges = iter([(first, min(first + batch_size, total)) for first in range(0, total, batch_size)])
+    done = 0
+    rows = 0
+    started = time.perf_counter()
+
+    async def worker():
+        nonlocal done, rows
+        conn = await asyncpg.connect(DATABASE_URL)
+        try:
+            for first, last in ranges:
+                batch = await loop.run_in_executor(pool, generate, plan, first, last)
+                async with conn.transaction():
+                    loaded = await load(conn, batch)
+                rows += loaded
+                done += last - first
+                elapsed = time.perf_counter() - started
+                print(f"   {label}: {done}/{total} ({rows / elapsed:,.0f} filas/s)")
+        finally:
+            await conn.close()
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return rows
+
+
+async def clear_synthetic_data(conn: asyncpg.Connection):
+    """Eliminar todos los datos sintéticos (cualquier semilla)"""
+    pattern = f"%@{SYNTHETIC_EMAIL_DOMAIN}"
+    synthetic_users = "SELECT id FROM users WHERE email LIKE $1"
+    await conn.execute(f'DELETE FROM order_documents WHERE "userId" IN ({synthetic_users})', pattern)
+    await conn.execute(f"""
+        DELETE FROM order_items WHERE "orderId" IN (
+            SELECT id FROM orders WHERE "userId" IN ({synthetic_users})
+        )
+    """, pattern)
+    await conn.execute(f'DELETE FROM orders WHERE "userId" IN ({synthetic_users})', pattern)
+    # Las direcciones se eliminan en cascada
+    await conn.execute("DELETE FROM users WHERE email LIKE $1", pattern)
+
+
+async def generate_dataset(users: int, orders: int, seed: int = 42, workers: int = 4, days: int = 365,
+                           end_date: date = None, clear: bool = False) -> bool:
+    """Generar y cargar el conjunto de datos sintético"""
+    # Importación diferida: seed_data importa este módulo para --generate
+    from seed_data import pwd_context, seed_products
+
+    if not DATABASE_URL:
+        print("❌ DATABASE_URL no está configurada")
+        return False
+    if users < 1 or days < 1:
+        print("❌ --users y --days deben ser mayores que 0")
+        return False
+
+    end = datetime.combine(end_date or date.today(), datetime.min.time())
+    started = time.perf_counter()
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        existing = await conn.fetchval("SELECT COUNT(*) FROM users WHERE email LIKE $1", f"%@{SYNTHETIC_EMAIL_DOMAIN}")
+        if existing and not clear:
+            print(f"❌ Ya hay {existing} usuarios sintéticos; use --clear para reemplazarlos")
+            return False
+        if existing:
+            print(f"🧹 Eliminando {existing} usuarios sintéticos y sus pedidos...")
+            await clear_synthetic_data(conn)
+
+        await seed_products(conn)
+        products = [
+            (row["id"], row["name"], row["description"], row["category"], row["price"])
+            for row in await conn.fetch(
+                'SELECT id, name, description, category::text AS category, price FROM products '
+                'WHERE "isAvailable" ORDER BY name, id'
+            )
+        ]
+        if not products:
+            print("❌ No hay productos disponibles")
+            return False
+
+        plan = build_plan(seed, users, end, days, pwd_context.hash(SYNTHETIC_PASSWORD), products)
+        await conn.execute("SELECT ensure_order_partitions($1, $2)", plan.start.date(), plan.end.date())
+        print(f"🌱 Generando {users} usuarios y {orders} pedidos ({plan.start.date()} a {plan.end.date()}, "
+              f"semilla {seed}, {workers} workers)...")
+
+        await conn.execute("ALTER TABLE order_documents DISABLE TRIGGER trg_order_documents_stats")
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                rows = await run_batches(pool, workers, generate_user_batch, plan, users,
+                                         USERS_PER_BATCH, load_user_batch, "usuarios")
+                rows += await run_batches(pool, workers, generate_order_batch, plan, orders,
+                                          ORDERS_PER_BATCH, load_order_batch, "pedidos")
+        finally:
+            await conn.execute("ALTER TABLE order_documents ENABLE TRIGGER trg_order_documents_stats")
+
+        print("📊 Recalculando agregados del dashboard...")
+        if existing:
+            await conn.execute("SELECT reconcile_order_stats('-infinity')")
+        else:
+            await conn.execute("SELECT reconcile_order_stats($1)", plan.start)
+        await conn.execute("ANALYZE users, addresses, orders, order_items, order_documents")
+
+        elapsed = time.perf_counter() - started
+        print(f"✅ {rows} filas cargadas en {elapsed:.1f}s ({rows / elapsed:,.0f} filas/s)")
+        return True
+    finally:
+        await conn.close()
+
+
+def main(argv: List[str]):
+    def read_arg(name: str, default: int) -> int:
+        if name in argv:
+            return int(argv[argv.index(name) + 1])
+        return default
+
+    end_date = argv[argv.index("--end-date") + 1] if "--end-date" in argv else None
+    ok = asyncio.run(generate_dataset(
+        users=read_arg("--users", 10000),
+        orders=read_arg("--orders", 50000),
+        seed=read_arg("--seed", 42),
+        workers=read_arg("--workers", os.cpu_count() or 4),
+        days=read_arg("--days", 365),
+        end_date=date.fromisoformat(end_date) if end_date else None,
+        clear="--clear" in argv,
+    ))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -126,7 +126,12 @@ const OrderManagement = ({ orders, onStatusChange }) => {
                 </div>
 
                 <div className="flex justify-between items-center">
-                  <p className="font-semibold text-gray-800">Total: ${(parseFloat(order.total) || 0).toFixed(2)}</p>
+                  <div>
+                    {parseFloat(order.deliveryFee) > 0 && (
+                      <p className="text-sm text-gray-600">Domicilio: ${parseFloat(order.deliveryFee).toFixed(2)}</p>
+                    )}
+                    <p className="font-semibold text-gray-800">Total: ${(parseFloat(order.total) || 0).toFixed(2)}</p>
+                  </div>
                   <p className="text-sm text-gray-600">
                     <MapPin className="inline w-4 h-4 mr-1" />
                     {address}
@@ -1,7 +1,7 @@
 import React from 'react';
 import { Trash2 } from 'lucide-react';
 
-const Cart = ({ cart, onUpdateQuantity, onRemoveFromCart, totalPrice }) => {
+const Cart = ({ cart, onUpdateQuantity, onRemoveFromCart, totalPrice, deliveryFee = 0 }) => {
   if (cart.length === 0) {
     return (
       <div className="bg-white rounded-xl shadow-lg p-6">
@@ -48,9 +48,21 @@ const Cart = ({ cart, onUpdateQuantity, onRemoveFromCart, totalPrice }) => {
       </div>
 
       <div className="border-t pt-4">
+        {deliveryFee > 0 && (
+          <div className="space-y-1 mb-2 text-gray-600">
+            <div className="flex justify-between items-center">
+              <span>Subtotal:</span>
+              <span>${totalPrice.toFixed(2)}</span>
+            </div>
+            <div className="flex justify-between items-center">
+              <span>Domicilio:</span>
+              <span>${deliveryFee.toFixed(2)}</span>
+            </div>
+          </div>
+        )}
         <div className="flex justify-between items-center">
           <span className="text-lg font-semibold text-gray-800">Total:</span>
-          <span className="text-2xl font-bold text-orange-600">${totalPrice.toFixed(2)}</span>
+          <span className="text-2xl font-bold text-orange-600">${(totalPrice + deliveryFee).toFixed(2)}</span>
         </div>
       </div>
     </div>
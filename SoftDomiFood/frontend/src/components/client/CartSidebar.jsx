@@ -1,7 +1,7 @@
 import React from 'react';
 import { X, Trash2 } from 'lucide-react';
 
-const CartSidebar = ({ isOpen, onClose, cart, onUpdateQuantity, onRemoveFromCart, totalPrice }) => {
+const CartSidebar = ({ isOpen, onClose, cart, onUpdateQuantity, onRemoveFromCart, totalPrice, deliveryFee = 0 }) => {
   return (
     <>
       {/* Overlay */}
@@ -104,10 +104,22 @@ const CartSidebar = ({ isOpen, onClose, cart, onUpdateQuantity, onRemoveFromCart
 
               {/* Total */}
               <div className="border-t-2 border-gray-200 pt-4 mb-4">
+                {deliveryFee > 0 && (
+                  <div className="space-y-1 mb-2 text-gray-600">
+                    <div className="flex justify-between items-center">
+                      <span>Subtotal:</span>
+                      <span>${totalPrice.toFixed(2)}</span>
+                    </div>
+                    <div className="flex justify-between items-center">
+                      <span>Domicilio:</span>
+                      <span>${deliveryFee.toFixed(2)}</span>
+                    </div>
+                  </div>
+                )}
                 <div className="flex justify-between items-center">
                   <span className="text-xl font-semibold text-gray-800">Total:</span>
                   <span className="text-3xl font-bold text-orange-600">
-                    ${totalPrice.toFixed(2)}
+                    ${(totalPrice + deliveryFee).toFixed(2)}
                   </span>
                 </div>
               </div>
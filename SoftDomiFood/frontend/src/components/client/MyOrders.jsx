@@ -4,6 +4,7 @@ import { ordersAPI } from '../../utils/api';
 
 const MyOrders = ({ user, toast }) => {
   const [orders, setOrders] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -22,7 +23,15 @@ const MyOrders = ({ user, toast }) => {
       setLoading(true);
       const data = await ordersAPI.getAll();
       const ordersList = data.orders || data || [];
-      setOrders(ordersList);
+      // Conservar las páginas anteriores ya cargadas al refrescar la primera
+      setOrders((prev) => {
+        const freshIds = new Set(ordersList.map((order) => order.id));
+        const older = prev.slice(ordersList.length).filter((order) => !freshIds.has(order.id));
+        if (older.length === 0) {
+          setNextCursor(data.nextCursor || null);
+        }
+        return [...ordersList, ...older];
+      });
     } catch (error) {
       console.error('Error loading orders:', error);
       toast.error('Error al cargar tus pedidos');
@@ -32,6 +41,19 @@ const MyOrders = ({ user, toast }) => {
     }
   };
 
+  const loadMoreOrders = async () => {
+    if (!nextCursor) return;
+    
+    try {
+      const data = await ordersAPI.getAll(nextCursor);
+      setOrders((prev) => [...prev, ...(data.orders || [])]);
+      setNextCursor(data.nextCursor || null);
+    } catch (error) {
+      console.error('Error loading more orders:', error);
+      toast.error('Error al cargar más pedidos');
+    }
+  };
+
   const getStatusColor = (status) => {
     const statusLower = status?.toLowerCase();
     switch (statusLower) {
@@ -122,6 +144,7 @@ const MyOrders = ({ user, toast }) => {
           {orders.map((order) => {
             const status = (order.status || 'PENDING').toLowerCase();
             const items = order.items || [];
+            const productNames = order.productNames || [];
             
             return (
               <div
@@ -171,6 +194,11 @@ const MyOrders = ({ user, toast }) => {
                           </span>
                         </div>
                       ))
+                    ) : productNames.length > 0 ? (
+                      <p className="pl-4">
+                        {productNames.join(', ')}
+                        {order.itemCount ? ` (${order.itemCount} unidades)` : ''}
+                      </p>
                     ) : (
                       <p className="text-gray-500 pl-4">No hay productos en este pedido</p>
                     )}
@@ -182,9 +210,16 @@ const MyOrders = ({ user, toast }) => {
                     <MapPin className="w-4 h-4 mr-1" />
                     <span>Dirección de entrega registrada</span>
                   </div>
-                  <p className="font-bold text-lg text-gray-800">
-                    Total: ${(parseFloat(order.total) || 0).toFixed(2)}
-                  </p>
+                  <div className="text-right">
+                    {parseFloat(order.deliveryFee) > 0 && (
+                      <p className="text-sm text-gray-600">
+                        Domicilio: ${parseFloat(order.deliveryFee).toFixed(2)}
+                      </p>
+                    )}
+                    <p className="font-bold text-lg text-gray-800">
+                      Total: ${(parseFloat(order.total) || 0).toFixed(2)}
+                    </p>
+                  </div>
                 </div>
 
                 {order.notes && (
@@ -197,6 +232,14 @@ const MyOrders = ({ user, toast }) => {
               </div>
             );
           })}
+          {nextCursor && (
+            <button
+              onClick={loadMoreOrders}
+              className="w-full text-sm text-orange-600 hover:text-orange-700 font-medium py-2"
+            >
+              Ver pedidos anteriores
+            </button>
+          )}
         </div>
       )}
     </div>
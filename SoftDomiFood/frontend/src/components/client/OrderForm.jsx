@@ -81,7 +81,7 @@ const OrderForm = ({
               <option value="">Seleccionar dirección</option>
               {addresses.map(addr => (
                 <option key={addr.id} value={addr.id}>
-                  {addr.street}, {addr.city} {addr.isDefault ? '(Principal)' : ''}
+                  {addr.street}, {addr.city} {addr.isDefault ? '(Principal)' : ''} {addr.deliveryZone === null ? '(sin cobertura)' : ''}
                 </option>
               ))}
             </select>
@@ -198,6 +198,12 @@ const ClientPage = ({ switchToAdmin, toast, adminUser = null, isAdminView = fals
     return cart.reduce((total, item) => total + (item.price * item.quantity), 0);
   };
 
+  // Domicilio de la zona de la dirección seleccionada (el backend lo suma al total)
+  const getDeliveryFee = () => {
+    const address = addresses.find(addr => addr.id === orderForm.addressId);
+    return parseFloat(address?.deliveryZone?.deliveryFee) || 0;
+  };
+
   const handlePlaceOrder = async () => {
     // Si es vista de admin, no permitir crear pedidos
     if (isAdminView) {
@@ -236,7 +242,7 @@ const ClientPage = ({ switchToAdmin, toast, adminUser = null, isAdminView = fals
         addressId: orderForm.addressId,
         paymentMethod: orderForm.paymentMethod,
         notes: orderForm.notes || null,
-        total: total  // Incluir el total calculado
+        total: total  // Subtotal de los productos: el backend agrega el domicilio
       };
 
       await ordersAPI.create(orderData);
@@ -372,6 +378,7 @@ const ClientPage = ({ switchToAdmin, toast, adminUser = null, isAdminView = fals
                   onUpdateQuantity={updateQuantity}
                   onRemoveFromCart={removeFromCart}
                   totalPrice={getTotalPrice()}
+                  deliveryFee={getDeliveryFee()}
                 />
               )}
 
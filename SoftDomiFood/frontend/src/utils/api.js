@@ -88,8 +88,13 @@ export const productsAPI = {
 
 // Orders
 export const ordersAPI = {
-  getAll: async () => {
-    const response = await api.get('/orders');
+  getAll: async (cursor = null) => {
+    const response = await api.get('/orders', { params: cursor ? { cursor } : {} });
+    return response.data;
+  },
+
+  getDetails: async (orderId) => {
+    const response = await api.get(`/orders/${orderId}/details`);
     return response.data;
   },
 
@@ -0,0 +1,189 @@
+"""
+📦 Benchmark - Compresión de respuestas por endpoint
+======================================================
+
+Mide, para las respuestas grandes de la API, los bytes enviados y el tiempo de
+CPU por petición sin comprimir, con gzip y con brotli. Las peticiones pasan por
+la aplicación completa (middlewares incluidos) con httpx + ASGI; la base de
+datos se simula con datos deterministas de tamaño configurable:
+- GET /api/admin/orders          (get_all_orders)
+- GET /api/admin/customers       (get_all_customers_with_addresses)
+- GET /api/products/             (catálogo con descripciones largas)
+
+El costo de la compresión es la diferencia de CPU contra la fila "identity".
+El catálogo sale de la instantánea pre-codificada: con gzip no hay compresión
+por petición.
+
+Uso:
+    python qa_automated/benchmarks/bench_compression.py
+    python qa_automated/benchmarks/bench_compression.py --orders 2000 --requests 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+project_root = Path(__file__).parent.parent.parent
+api_dir = project_root / "api"
+if str(api_dir) not in sys.path:
+    sys.path.insert(0, str(api_dir))
+
+os.environ.setdefault("DATABASE_URL", "")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key")
+os.environ.setdefault("BROKER_BACKEND", "memory")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+from main import app
+from services.auth_service import create_access_token
+from services.cache import catalog_cache
+
+REPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports")
+ENCODINGS = ("identity", "gzip", "br")
+BASE_TIME = datetime(2025, 11, 20, 12, 0)
+CATEGORIES = ["SALCHIPAPAS", "BEBIDAS", "ADICIONALES", "COMBOS"]
+
+
+def make_uuid(i: int) -> str:
+    return str(uuid.UUID(int=i + 1))
+
+
+def make_orders(count: int):
+    """Documentos de pedido como los devuelve get_all_orders"""
+    return [
+        {
+            "id": make_uuid(i), "userId": make_uuid(i % 300), "addressId": make_uuid(10000 + i % 300),
+            "status": ["PENDING", "PREPARING", "DELIVERED"][i % 3], "total": 25000 + i * 10,
+            "paymentMethod": "CASH", "notes": None,
+            "createdAt": (BASE_TIME + timedelta(minutes=i)).isoformat(),
+            "updatedAt": (BASE_TIME + timedelta(minutes=i)).isoformat(),
+            "customer_id": make_uuid(i % 300), "customer_name": f"Cliente {i % 300}",
+            "customer_email": f"cliente{i % 300}@example.com", "customer_phone": "3000000000",
+            "delivery_street": f"Calle {i % 120} # {i % 40}-{i % 90}", "delivery_city": "Bogotá",
+            "delivery_state": "Cundinamarca", "delivery_zipcode": "110111", "delivery_country": "Colombia",
+            "delivery_instructions": None, "itemCount": 3,
+            "items": [
+                {"id": make_uuid(50000 + i * 3 + j), "productId": make_uuid(90000 + j), "quantity": 1,
+                 "price": 12000, "product_name": f"Producto {j}", "product_category": CATEGORIES[j % 4]}
+                for j in range(3)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def make_customers(count: int):
+    """Clientes con direcciones como los devuelve get_all_customers_with_addresses"""
+    return [
+        {
+            "id": make_uuid(i), "email": f"cliente{i}@example.com", "name": f"Cliente {i}",
+            "phone": "3000000000", "role": "CUSTOMER",
+            "createdAt": BASE_TIME.isoformat(), "updatedAt": BASE_TIME.isoformat(),
+            "addresses": [
+                {"id": make_uuid(20000 + i * 2 + j), "userId": make_uuid(i), "street": f"Calle {j} # {i}-10",
+                 "city": "Bogotá", "state": "Cundinamarca", "zipCode": "110111", "country": "Colombia",
+                 "isDefault": j == 0, "instructions": "Portería", "createdAt": BASE_TIME.isoformat(),
+                 "updatedAt": BASE_TIME.isoformat()}
+                for j in range(2)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def make_products(count: int):
+    """Catálogo con descripciones largas"""
+    description = ("Papas a la francesa con salchicha, queso gratinado, salsas de la casa y "
+                   "toppings a elección. Ideal para compartir. ") * 3
+    return [
+        {"id": make_uuid(90000 + i), "name": f"Producto {i}", "description": description,
+         "price": 12000 + i * 500, "image": f"/images/producto-{i}.jpg", "category": CATEGORIES[i % 4],
+         "isAvailable": True, "createdAt": BASE_TIME.isoformat()}
+        for i in range(count)
+    ]
+
+
+async def measure(client, url, headers, encoding, requests):
+    """Bytes en el cable y CPU promedio por petición"""
+    headers = {**headers, "Accept-Encoding": encoding}
+    # Petición de calentamiento (p. ej. construir la instantánea del catálogo)
+    (await client.get(url, headers=headers)).raise_for_status()
+    wire_bytes = 0
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(requests):
+        async with client.stream("GET", url, headers=headers) as response:
+            response.raise_for_status()
+            wire_bytes = sum([len(chunk) async for chunk in response.aiter_raw()])
+    return {
+        "encoding": encoding,
+        "wireBytes": wire_bytes,
+        "cpuMsPerRequest": round((time.process_time() - cpu_start) * 1000 / requests, 3),
+        "wallMsPerRequest": round((time.perf_counter() - wall_start) * 1000 / requests, 3),
+    }
+
+
+async def run(args):
+    token = create_access_token({"userId": "admin-1", "role": "ADMIN"})
+    admin = {"Authorization": f"Bearer {token}"}
+    endpoints = [
+        ("GET /api/admin/orders", "/api/admin/orders", admin,
+         patch("routers.admin.get_all_orders", new=AsyncMock(return_value=make_orders(args.orders)))),
+        ("GET /api/admin/customers", "/api/admin/customers", admin,
+         patch("routers.admin.get_all_customers_with_addresses",
+               new=AsyncMock(return_value=make_customers(args.customers)))),
+        ("GET /api/products/", "/api/products/", {},
+         patch("services.catalog_snapshot.get_products", new=AsyncMock(return_value=make_products(args.products)))),
+    ]
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, url, headers, patcher in endpoints:
+            catalog_cache.invalidate()
+            with patcher:
+                rows = [await measure(client, url, headers, encoding, args.requests) for encoding in ENCODINGS]
+            identity = rows[0]
+            for row in rows:
+                row["ratio"] = round(row["wireBytes"] / identity["wireBytes"], 4)
+                row["compressionCpuMs"] = round(row["cpuMsPerRequest"] - identity["cpuMsPerRequest"], 3)
+            results.append({"endpoint": name, "results": rows})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes en el cable y CPU de la compresión por endpoint")
+    parser.add_argument("--orders", type=int, default=1000, help="Pedidos en /api/admin/orders")
+    parser.add_argument("--customers", type=int, default=500, help="Clientes en /api/admin/customers")
+    parser.add_argument("--products", type=int, default=60, help="Productos del catálogo")
+    parser.add_argument("--requests", type=int, default=20, help="Peticiones por endpoint y codificación")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print("=" * 84)
+    print(f"{'Endpoint':<28}{'Codificación':<14}{'Bytes':>12}{'Ratio':>8}{'CPU ms':>10}{'Compr. ms':>11}")
+    print("-" * 84)
+    for endpoint in results:
+        for row in endpoint["results"]:
+            print(f"{endpoint['endpoint']:<28}{row['encoding']:<14}{row['wireBytes']:>12}{row['ratio']:>8.3f}"
+                  f"{row['cpuMsPerRequest']:>10.2f}{row['compressionCpuMs']:>11.2f}")
+    print("=" * 84)
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_file = os.path.join(REPORT_DIR, f"compression_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump({"config": vars(args), "endpoints": results}, f, indent=2)
+    print(f"📄 Reporte: {report_file}")
+
+
+if __name__ == "__main__":
+    main()
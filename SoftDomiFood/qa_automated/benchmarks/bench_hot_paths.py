@@ -0,0 +1,183 @@
+"""
+⏱️ Microbenchmarks - Rutas calientes de la API
+================================================
+
+Mide las piezas de CPU puro de la API, sin servicios externos:
+- convert_uuid_to_str sobre un listado grande de filas
+- Formato del mensaje de publish_order y json.dumps
+- create_access_token / decode_token
+- create_new_order con muchos items, publicando en el broker en memoria
+- Validación Pydantic de CreateOrderRequest con muchos items
+
+Cada resultado se compara con qa_automated/benchmarks/baseline.json
+normalizado por el benchmark de calibración (bucle de Python puro), de modo que
+la comparación tolere máquinas más rápidas o más lentas.
+
+Uso:
+    pip install pytest-benchmark
+    ./qa_automated/benchmarks/run_benchmarks.sh            # medir y comparar
+    ./qa_automated/benchmarks/run_benchmarks.sh --update   # regrabar la línea base
+"""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services.database_service import convert_uuid_to_str
+from services import memory_broker
+from services.rabbitmq import QUEUE_NAME, build_order_message, json_serial
+from services.auth_service import create_access_token, decode_token
+from routers.orders import CreateOrderRequest, create_new_order
+
+
+# ============================================================================
+# DATOS DE PRUEBA (deterministas)
+# ============================================================================
+
+ROWS = 5000
+ORDER_ITEMS = 50
+BASE_TIME = datetime(2025, 11, 20, 12, 0)
+
+
+def make_uuid(i: int) -> uuid.UUID:
+    return uuid.UUID(int=i + 1)
+
+
+@pytest.fixture(scope="module")
+def order_rows():
+    """Filas como las devuelve asyncpg para el listado de pedidos del admin"""
+    return [
+        {
+            "id": make_uuid(i),
+            "userId": make_uuid(i % 300),
+            "addressId": make_uuid(10000 + i % 300),
+            "status": "PENDING",
+            "total": 25000.0 + i,
+            "paymentMethod": "CASH",
+            "notes": None,
+            "createdAt": BASE_TIME + timedelta(minutes=i),
+            "updatedAt": BASE_TIME + timedelta(minutes=i),
+            "items": [{"productId": str(make_uuid(50000 + j)), "quantity": 1, "price": 12000.0} for j in range(3)],
+        }
+        for i in range(ROWS)
+    ]
+
+
+@pytest.fixture(scope="module")
+def order_document():
+    """Pedido recién creado como lo recibe publish_order"""
+    return {
+        "id": str(make_uuid(1)),
+        "userId": str(make_uuid(2)),
+        "addressId": str(make_uuid(3)),
+        "total": Decimal("154000.00"),
+        "notes": "Sin cebolla",
+        "createdAt": BASE_TIME,
+        "items": [
+            {"productId": str(make_uuid(100 + j)), "quantity": 2, "price": Decimal("12000.00")}
+            for j in range(ORDER_ITEMS)
+        ],
+    }
+
+
+@pytest.fixture(scope="module")
+def products():
+    return {
+        str(make_uuid(100 + j)): {"id": str(make_uuid(100 + j)), "name": f"Producto {j}",
+                                  "price": Decimal("12000.00"), "isAvailable": True}
+        for j in range(ORDER_ITEMS)
+    }
+
+
+@pytest.fixture(scope="module")
+def order_payload(products):
+    return {
+        "addressId": str(make_uuid(3)),
+        "items": [{"productId": product_id, "quantity": 2} for product_id in products],
+        "paymentMethod": "CASH",
+        "notes": "Sin cebolla",
+    }
+
+
+@pytest.fixture(scope="module")
+def event_loop_runner():
+    """Un solo event loop para todas las rondas (no medir su creación)"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+# ============================================================================
+# CALIBRACIÓN
+# ============================================================================
+
+def calibration_workload():
+    """Trabajo fijo de Python puro: referencia de la velocidad de la máquina"""
+    total = 0
+    data = {}
+    for i in range(20000):
+        data[i % 512] = str(i)
+        total += len(data[i % 512])
+    return total
+
+
+def test_calibration(benchmark):
+    assert benchmark(calibration_workload) > 0
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def test_convert_uuid_to_str_rows(benchmark, order_rows):
+    result = benchmark(convert_uuid_to_str, order_rows)
+    assert len(result) == ROWS and isinstance(result[0]["id"], str)
+
+
+def test_publish_order_message_and_json(benchmark, order_document):
+    def build_and_serialize():
+        return json.dumps(build_order_message(order_document), default=json_serial)
+
+    body = benchmark(build_and_serialize)
+    assert json.loads(body)["items"][0]["price"] == 12000.0
+
+
+def test_create_access_token(benchmark):
+    token = benchmark(create_access_token, {"userId": str(make_uuid(7)), "role": "CUSTOMER"})
+    assert token.count(".") == 2
+
+
+def test_decode_token(benchmark):
+    token = create_access_token({"userId": str(make_uuid(7)), "role": "CUSTOMER"})
+    payload = benchmark(decode_token, token)
+    assert payload["role"] == "CUSTOMER"
+
+
+def test_validate_create_order_request(benchmark, order_payload):
+    request = benchmark(CreateOrderRequest.model_validate, order_payload)
+    assert len(request.items) == ORDER_ITEMS
+
+
+def test_create_order_pricing_loop(benchmark, event_loop_runner, order_payload, products):
+    """create_new_order completo: base de datos simulada y broker en memoria"""
+    request = CreateOrderRequest.model_validate(order_payload)
+    address = {"id": order_payload["addressId"], "userId": "user-1", "zipCode": "110111"}
+
+    async def get_products(product_ids):
+        return {product_id: products[product_id] for product_id in product_ids}
+
+    async def fake_create_order(**kwargs):
+        return {"id": str(make_uuid(1)), **kwargs}
+
+    with patch("routers.orders.get_address_by_id", new=AsyncMock(return_value=address)), \
+            patch("routers.orders.get_products_by_ids", new=get_products), \
+            patch("routers.orders.create_order", new=fake_create_order):
+        result = benchmark(lambda: event_loop_runner(create_new_order(request, {"userId": "user-1"})))
+
+    assert len(result["order"]["items"]) == ORDER_ITEMS
+    assert memory_broker.get_messages(QUEUE_NAME)
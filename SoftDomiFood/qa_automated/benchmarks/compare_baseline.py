@@ -0,0 +1,131 @@
+"""
+Comparar resultados de pytest-benchmark con la línea base
+=========================================================
+
+Cada benchmark se resume con su tiempo mínimo (el menos afectado por otros
+procesos de la máquina) dividido por el mínimo del benchmark de calibración de
+la misma corrida; así una máquina más lenta o más rápida no cuenta como
+regresión. Con varias corridas se toma, por benchmark, la menor razón: una
+corrida perturbada no basta para fallar. Termina con código 1 si algún
+benchmark empeora más que el umbral.
+
+Uso:
+    python compare_baseline.py baseline.json corrida1.json [corrida2.json ...] [--threshold 0.25]
+    python compare_baseline.py baseline.json corrida1.json [corrida2.json ...] --update
+"""
+
+import argparse
+import json
+import sys
+
+CALIBRATION = "test_calibration"
+# Estadísticas que se guardan en la línea base (sin los tiempos de cada ronda)
+BASELINE_STATS = ("min", "median", "mean", "stddev", "iqr", "rounds")
+
+
+def load_run(path):
+    """{nombre: estadísticas} de un JSON de pytest-benchmark"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {bench["name"]: bench["stats"] for bench in data["benchmarks"]}
+
+
+def normalize(run):
+    """{nombre: mínimo / mínimo de la calibración} de una corrida"""
+    calibration = run.get(CALIBRATION)
+    if not calibration:
+        raise SystemExit(f"❌ Falta el benchmark de calibración '{CALIBRATION}'")
+    return {name: stats["min"] / calibration["min"] for name, stats in run.items() if name != CALIBRATION}
+
+
+def best_of(runs):
+    """{nombre: (menor razón normalizada, estadísticas de esa corrida)} entre varias corridas"""
+    best = {}
+    for run in runs:
+        for name, ratio in normalize(run).items():
+            if name not in best or ratio < best[name][0]:
+                best[name] = (ratio, run[name])
+    return best
+
+
+def load_baseline(path):
+    """{nombre: razón normalizada} de la línea base"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {bench["name"]: bench["normalized"] for bench in data["benchmarks"]}
+
+
+def write_baseline(result_paths, baseline_path):
+    """Guardar la línea base con la mejor razón de cada benchmark y sus estadísticas"""
+    with open(result_paths[0], encoding="utf-8") as f:
+        data = json.load(f)
+    best = best_of([load_run(path) for path in result_paths])
+    baseline = {
+        "machine_info": {key: data["machine_info"].get(key) for key in ("python_version", "python_implementation", "machine")},
+        "commit_info": {key: data.get("commit_info", {}).get(key) for key in ("id", "time")},
+        "datetime": data.get("datetime"),
+        "runs": len(result_paths),
+        "benchmarks": [
+            {"name": name, "normalized": ratio, "stats": {key: stats[key] for key in BASELINE_STATS}}
+            for name, (ratio, stats) in sorted(best.items())
+        ],
+    }
+    with open(baseline_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def compare(current, baseline, threshold):
+    """Lista de (nombre, cambio relativo o None si es nuevo, ¿regresión?)"""
+    results = []
+    for name, value in sorted(current.items()):
+        reference = baseline.get(name)
+        if reference is None:
+            results.append((name, None, False))
+            continue
+        change = value / reference - 1
+        results.append((name, change, change > threshold))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparar microbenchmarks con la línea base")
+    parser.add_argument("baseline")
+    parser.add_argument("results", nargs="+", help="JSON de una o varias corridas de pytest-benchmark")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Empeoramiento relativo máximo permitido (0.25 = 25%%)")
+    parser.add_argument("--update", action="store_true", help="Regrabar la línea base con estas corridas")
+    args = parser.parse_args()
+
+    if args.update:
+        write_baseline(args.results, args.baseline)
+        print(f"✅ Línea base actualizada: {args.baseline} ({len(args.results)} corridas)")
+        return
+
+    best = best_of([load_run(path) for path in args.results])
+    current = {name: ratio for name, (ratio, _) in best.items()}
+    baseline = load_baseline(args.baseline)
+
+    print("="*78)
+    print(f"⏱️  MICROBENCHMARKS vs LÍNEA BASE (mínimo de {len(args.results)} corridas, umbral +{args.threshold * 100:.0f}%)")
+    print("="*78)
+    regressions = 0
+    for name, change, regressed in compare(current, baseline, args.threshold):
+        min_us = best[name][1]["min"] * 1e6
+        if change is None:
+            print(f"🆕 {name:<45} {min_us:>12.1f} µs   (sin línea base)")
+        elif regressed:
+            regressions += 1
+            print(f"❌ {name:<45} {min_us:>12.1f} µs   {change * 100:+.1f}%")
+        else:
+            print(f"✅ {name:<45} {min_us:>12.1f} µs   {change * 100:+.1f}%")
+    print("="*78)
+
+    if regressions:
+        print(f"❌ {regressions} benchmark(s) empeoraron más del {args.threshold * 100:.0f}%")
+        sys.exit(1)
+    print("✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Configuración de los microbenchmarks
+====================================
+
+Igual que tests/conftest.py: agrega api/ al path y fija las variables de
+entorno antes de importar la aplicación. No se necesita ningún servicio
+externo: PostgreSQL se simula donde hace falta y RabbitMQ se reemplaza por
+el broker en memoria.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+api_dir = project_root / "api"
+
+if str(api_dir) not in sys.path:
+    sys.path.insert(0, str(api_dir))
+
+os.environ.setdefault("DATABASE_URL", "")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key")
+os.environ.setdefault("BROKER_BACKEND", "memory")
+# Los benchmarks no deben escribir logs por petición
+os.environ.setdefault("LOG_LEVEL", "WARNING")
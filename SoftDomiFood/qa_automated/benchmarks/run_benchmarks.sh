@@ -0,0 +1,39 @@
+#!/bin/bash
+
+# Microbenchmarks de la API (sin servicios externos)
+# Uso: ./qa_automated/benchmarks/run_benchmarks.sh [--update]
+#   --update  regrabar baseline.json con los resultados de esta corrida
+
+set -e
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+REPORT_DIR="$SCRIPT_DIR/../reports"
+RESULT_PREFIX="${BENCHMARK_OUTPUT:-$REPORT_DIR/benchmarks}"
+BASELINE_FILE="$SCRIPT_DIR/baseline.json"
+MAX_REGRESSION="${BENCHMARK_MAX_REGRESSION:-0.25}"
+# Corridas completas: por benchmark se compara la mejor (ver compare_baseline.py)
+RUNS="${BENCHMARK_RUNS:-3}"
+
+mkdir -p "$(dirname "$RESULT_PREFIX")"
+
+RESULT_FILES=()
+for run in $(seq 1 "$RUNS"); do
+    RESULT_FILE="$RESULT_PREFIX-$run.json"
+    echo "⏱️  Ejecutando microbenchmarks (corrida $run de $RUNS)..."
+    # min-time agrupa varias iteraciones por ronda en los benchmarks de microsegundos
+    python -m pytest "$SCRIPT_DIR/bench_hot_paths.py" -q -p no:cacheprovider \
+        --benchmark-only \
+        --benchmark-warmup=on \
+        --benchmark-min-rounds=50 \
+        --benchmark-min-time=0.001 \
+        --benchmark-disable-gc \
+        --benchmark-sort=name \
+        --benchmark-json="$RESULT_FILE"
+    RESULT_FILES+=("$RESULT_FILE")
+done
+
+if [ "$1" == "--update" ]; then
+    python "$SCRIPT_DIR/compare_baseline.py" "$BASELINE_FILE" "${RESULT_FILES[@]}" --update
+else
+    python "$SCRIPT_DIR/compare_baseline.py" "$BASELINE_FILE" "${RESULT_FILES[@]}" --threshold "$MAX_REGRESSION"
+fi
@@ -40,6 +40,10 @@ if not os.getenv("DATABASE_URL"):
 if not os.getenv("JWT_SECRET"):
     os.environ["JWT_SECRET"] = "test-secret-key-for-testing-only"
 
+# Broker en memoria: publicar pedidos sin RabbitMQ (services/memory_broker.py)
+if not os.getenv("BROKER_BACKEND"):
+    os.environ["BROKER_BACKEND"] = "memory"
+
 # ============================================================================
 # FIXTURES GLOBALES
 # ============================================================================
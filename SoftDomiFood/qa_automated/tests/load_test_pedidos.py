@@ -0,0 +1,403 @@
+"""
+📈 Script de Pruebas de Carga - Embudo de Pedidos
+===================================================
+
+Pruebas de carga del flujo real de pedidos usando Locust: clientes que navegan
+el catálogo, registran una dirección, crean pedidos y consultan su estado;
+administradores que refrescan el dashboard; y cocina, que toma los pedidos
+pendientes y avanza su estado.
+
+Componente bajo prueba: Endpoints del embudo de pedidos
+- GET  /api/products/, GET /api/products/{product_id}
+- POST /api/addresses, GET /api/addresses
+- POST /api/orders/, GET /api/orders/{order_id}, GET /api/orders/
+- GET  /api/admin/orders, GET /api/admin/stats
+- PATCH /api/admin/orders/{order_id}/status
+
+Escenario de Carga (mezcla por defecto):
+- CustomerUser (peso 20): navegar (50%), crear pedido y consultar su estado
+  hasta 3 veces (20%), historial (15%), detalle de producto (10%), direcciones (5%)
+- AdminUser (peso 2): tablero de pedidos cada 3-8 s y estadísticas
+- KitchenUser (peso 1): toma pedidos pendientes y avanza su estado
+
+Métricas Clave (SLO por escenario, ver SLOS):
+- Latencia p95 y p99 por endpoint
+- Tasa de error por endpoint
+Si algún SLO no se cumple, Locust termina con código de salida 1.
+
+Prerrequisitos:
+- API corriendo con catálogo (python api/seed_data.py) y el admin por defecto
+- Usuarios de cocina/admin: LOAD_TEST_ADMIN_EMAIL / LOAD_TEST_ADMIN_PASSWORD
+
+Uso:
+    # Con interfaz web
+    locust -f qa_automated/tests/load_test_pedidos.py --host=http://localhost:5000
+
+    # Headless: reportes CSV (--csv) y JSON (LOAD_TEST_REPORT_DIR) con los SLO
+    mkdir -p qa_automated/reports
+    locust -f qa_automated/tests/load_test_pedidos.py --host=http://localhost:5000 \\
+           --headless -u 300 -r 30 -t 5m \\
+           --csv qa_automated/reports/pedidos --csv-full-history \\
+           --html qa_automated/reports/pedidos.html
+
+    # Solo un tipo de usuario
+    locust -f qa_automated/tests/load_test_pedidos.py --host=http://localhost:5000 \\
+           --headless -u 20 -r 5 -t 2m AdminUser
+"""
+
+from locust import FastHttpUser, task, between, events
+import json
+import os
+import random
+import time
+import uuid
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+ADMIN_EMAIL = os.getenv("LOAD_TEST_ADMIN_EMAIL", "Admin@sofka.com")
+ADMIN_PASSWORD = os.getenv("LOAD_TEST_ADMIN_PASSWORD", "Admin 123")
+CUSTOMER_PASSWORD = "LoadTest123!"
+
+# Directorio de los reportes JSON (los CSV los escribe Locust con --csv)
+REPORT_DIR = os.getenv(
+    "LOAD_TEST_REPORT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports")
+)
+
+# Códigos postales con cobertura en api/data/delivery_zones.geojson
+ZIP_CODES = ["110111", "110221", "110231", "110311", "110411", "110511", "110911", "111011"]
+
+CATEGORIES = ["SALCHIPAPAS", "BEBIDAS", "ADICIONALES", "COMBOS"]
+
+# Siguiente estado en cocina para cada estado del pedido
+KITCHEN_FLOW = {
+    "PENDING": "CONFIRMED",
+    "CONFIRMED": "PREPARING",
+    "PREPARING": "READY",
+    "READY": "ON_DELIVERY",
+    "ON_DELIVERY": "DELIVERED",
+}
+
+# SLO por escenario (nombre de la petición en Locust): latencias en ms y tasa
+# de error máxima (0.01 = 1%). "Aggregated" aplica a todas las peticiones.
+SLOS = {
+    "GET /api/products/":                 {"p95": 150, "p99": 400, "error_rate": 0.01},
+    "GET /api/products/{product_id}":     {"p95": 100, "p99": 300, "error_rate": 0.01},
+    "POST /api/auth/register":            {"p95": 800, "p99": 1500, "error_rate": 0.02},
+    "POST /api/auth/login":               {"p95": 800, "p99": 1500, "error_rate": 0.02},
+    "POST /api/addresses":                {"p95": 300, "p99": 800, "error_rate": 0.01},
+    "GET /api/addresses":                 {"p95": 150, "p99": 400, "error_rate": 0.01},
+    "POST /api/orders/":                  {"p95": 500, "p99": 1200, "error_rate": 0.01},
+    "GET /api/orders/{order_id}":         {"p95": 100, "p99": 300, "error_rate": 0.01},
+    "GET /api/orders/":                   {"p95": 200, "p99": 500, "error_rate": 0.01},
+    "GET /api/admin/orders":              {"p95": 800, "p99": 2000, "error_rate": 0.01},
+    "GET /api/admin/stats":               {"p95": 300, "p99": 800, "error_rate": 0.01},
+    "PATCH /api/admin/orders/{order_id}/status": {"p95": 300, "p99": 800, "error_rate": 0.02},
+    "Aggregated":                         {"p95": 500, "p99": 1500, "error_rate": 0.01},
+}
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+# ============================================================================
+# CLASES DE USUARIO LOCUST
+# ============================================================================
+
+class CustomerUser(FastHttpUser):
+    """
+    Cliente: se registra, crea una dirección y recorre el embudo de compra.
+    Tiempo de reflexión de 2 a 6 segundos entre acciones.
+    """
+
+    wait_time = between(2, 6)
+    weight = 20
+
+    def on_start(self):
+        """Registrar un cliente nuevo con una dirección por defecto"""
+        self.token = None
+        self.address_id = None
+        self.products = []
+        self.order_ids = []
+
+        email = f"loadtest_{uuid.uuid4().hex[:12]}@example.com"
+        with self.client.post(
+            "/api/auth/register",
+            json={"email": email, "password": CUSTOMER_PASSWORD, "name": "Cliente Carga",
+                  "phone": f"3{random.randint(100000000, 999999999)}"},
+            catch_response=True,
+            name="POST /api/auth/register"
+        ) as response:
+            if response.status_code == 200 and "token" in response.json():
+                self.token = response.json()["token"]
+            else:
+                response.failure(f"Registro falló: {response.status_code}")
+                return
+
+        with self.client.post(
+            "/api/addresses",
+            json={"street": f"Calle {random.randint(1, 200)} # {random.randint(1, 99)}-{random.randint(1, 99)}",
+                  "city": "Bogotá", "state": "Cundinamarca", "zipCode": random.choice(ZIP_CODES),
+                  "isDefault": True},
+            headers=auth_headers(self.token),
+            catch_response=True,
+            name="POST /api/addresses"
+        ) as response:
+            if response.status_code == 201:
+                self.address_id = response.json()["address"]["id"]
+            else:
+                response.failure(f"Dirección no creada: {response.status_code}")
+
+    @task(10)
+    def browse_products(self):
+        """Navegar el catálogo (todo o por categoría)"""
+        params = {"category": random.choice(CATEGORIES)} if random.random() < 0.5 else None
+        with self.client.get("/api/products/", params=params, catch_response=True,
+                             name="GET /api/products/") as response:
+            if response.status_code == 200:
+                available = [p for p in response.json()["products"] if p.get("isAvailable", True)]
+                if available:
+                    self.products = available
+                response.success()
+            else:
+                response.failure(f"Status code inesperado: {response.status_code}")
+
+    @task(2)
+    def view_product(self):
+        """Ver el detalle de un producto"""
+        if not self.products:
+            return
+        product = random.choice(self.products)
+        self.client.get(f"/api/products/{product['id']}", name="GET /api/products/{product_id}")
+
+    @task(4)
+    def place_order_and_track(self):
+        """Crear un pedido y consultar su estado con pausas, como la pantalla de seguimiento"""
+        if not self.token or not self.address_id or not self.products:
+            return
+        picks = random.sample(self.products, k=min(len(self.products), random.randint(1, 4)))
+        payload = {
+            "addressId": self.address_id,
+            "items": [{"productId": p["id"], "quantity": random.randint(1, 3)} for p in picks],
+            "paymentMethod": random.choice(["CASH", "CASH", "CARD"]),
+        }
+        with self.client.post("/api/orders/", json=payload, headers=auth_headers(self.token),
+                              catch_response=True, name="POST /api/orders/") as response:
+            if response.status_code != 200:
+                response.failure(f"Pedido no creado: {response.status_code}")
+                return
+            order_id = response.json()["order"]["id"]
+            self.order_ids.append(order_id)
+
+        for _ in range(random.randint(1, 3)):
+            time.sleep(random.uniform(1, 3))
+            self.client.get(f"/api/orders/{order_id}", headers=auth_headers(self.token),
+                            name="GET /api/orders/{order_id}")
+
+    @task(3)
+    def order_history(self):
+        """Historial de pedidos del cliente"""
+        if self.token:
+            self.client.get("/api/orders/", headers=auth_headers(self.token), name="GET /api/orders/")
+
+    @task(1)
+    def list_addresses(self):
+        """Libreta de direcciones"""
+        if self.token:
+            self.client.get("/api/addresses", headers=auth_headers(self.token), name="GET /api/addresses")
+
+
+class StaffUser(FastHttpUser):
+    """Base para usuarios del panel (inician sesión con la cuenta de administrador)"""
+
+    abstract = True
+
+    def on_start(self):
+        self.token = None
+        with self.client.post(
+            "/api/auth/login",
+            json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD},
+            catch_response=True,
+            name="POST /api/auth/login"
+        ) as response:
+            if response.status_code == 200 and "token" in response.json():
+                self.token = response.json()["token"]
+            else:
+                response.failure(f"Login de administrador falló: {response.status_code}")
+
+    def fetch_orders(self):
+        """Tablero de pedidos del panel"""
+        if not self.token:
+            return []
+        with self.client.get("/api/admin/orders", headers=auth_headers(self.token),
+                             catch_response=True, name="GET /api/admin/orders") as response:
+            if response.status_code == 200:
+                return response.json().get("orders", [])
+            response.failure(f"Status code inesperado: {response.status_code}")
+            return []
+
+
+class AdminUser(StaffUser):
+    """Administrador: refresca el tablero de pedidos y las estadísticas"""
+
+    wait_time = between(3, 8)
+    weight = 2
+
+    @task(8)
+    def poll_orders(self):
+        self.fetch_orders()
+
+    @task(2)
+    def dashboard_stats(self):
+        if self.token:
+            self.client.get("/api/admin/stats", params={"days": random.choice([1, 7, 30])},
+                            headers=auth_headers(self.token), name="GET /api/admin/stats")
+
+
+class KitchenUser(StaffUser):
+    """Cocina: revisa el tablero y avanza un pedido activo al siguiente estado"""
+
+    wait_time = between(5, 10)
+    weight = 1
+
+    @task
+    def advance_order(self):
+        active = [o for o in self.fetch_orders() if o.get("status") in KITCHEN_FLOW]
+        if not active:
+            return
+        # Atender primero los más antiguos
+        order = min(active, key=lambda o: o.get("createdAt") or "")
+        with self.client.patch(
+            f"/api/admin/orders/{order['id']}/status",
+            json={"status": KITCHEN_FLOW[order["status"]]},
+            headers=auth_headers(self.token),
+            catch_response=True,
+            name="PATCH /api/admin/orders/{order_id}/status"
+        ) as response:
+            # Otro usuario de cocina pudo haberlo avanzado primero
+            if response.status_code in (200, 404, 409):
+                response.success()
+            else:
+                response.failure(f"Status code inesperado: {response.status_code}")
+
+
+# ============================================================================
+# SLO Y REPORTES
+# ============================================================================
+
+def evaluate_slos(stats):
+    """Comparar las estadísticas de Locust con SLOS; retorna la lista de resultados"""
+    results = []
+    entries = {entry.name: entry for entry in stats.entries.values()}
+    entries["Aggregated"] = stats.total
+    for scenario, slo in SLOS.items():
+        entry = entries.get(scenario)
+        if entry is None or entry.num_requests == 0:
+            results.append({"scenario": scenario, "requests": 0, "passed": None})
+            continue
+        measured = {
+            "p95": entry.get_response_time_percentile(0.95),
+            "p99": entry.get_response_time_percentile(0.99),
+            "error_rate": entry.num_failures / entry.num_requests,
+        }
+        violations = [f"{key} {measured[key]:.3g} > {limit}" for key, limit in slo.items() if measured[key] > limit]
+        results.append({
+            "scenario": scenario,
+            "requests": entry.num_requests,
+            "failures": entry.num_failures,
+            "measured": measured,
+            "slo": slo,
+            "violations": violations,
+            "passed": not violations,
+        })
+    return results
+
+
+def write_json_report(environment, results):
+    """Reporte JSON con estadísticas por endpoint y el resultado de los SLO"""
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    stats = environment.stats
+    report = {
+        "host": environment.host,
+        "startTime": stats.start_time,
+        "endTime": time.time(),
+        "userClasses": [cls.__name__ for cls in environment.user_classes],
+        "endpoints": [
+            {
+                "name": entry.name,
+                "requests": entry.num_requests,
+                "failures": entry.num_failures,
+                "rps": entry.total_rps,
+                "avgMs": entry.avg_response_time,
+                "p50Ms": entry.get_response_time_percentile(0.5),
+                "p95Ms": entry.get_response_time_percentile(0.95),
+                "p99Ms": entry.get_response_time_percentile(0.99),
+                "maxMs": entry.max_response_time,
+            }
+            for entry in stats.entries.values()
+        ],
+        "slos": results,
+        "passed": all(r["passed"] is not False for r in results),
+    }
+    path = os.path.join(REPORT_DIR, f"load_test_pedidos_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return path
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    """Ejecutado cuando inicia el test de carga"""
+    print("="*70)
+    print("📈 INICIANDO PRUEBAS DE CARGA - EMBUDO DE PEDIDOS")
+    print("="*70)
+    print(f"👥 Usuarios: {', '.join(cls.__name__ for cls in environment.user_classes)}")
+    print(f"🌐 Host: {environment.host}")
+    print("="*70)
+
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    """Validar los SLO al terminar y fijar el código de salida"""
+    results = evaluate_slos(environment.stats)
+    report_path = write_json_report(environment, results)
+
+    print("\n" + "="*70)
+    print("🎯 VALIDACIÓN DE SLO POR ESCENARIO")
+    print("="*70)
+    for result in results:
+        if result["passed"] is None:
+            print(f"⏭️  {result['scenario']}: sin peticiones")
+        elif result["passed"]:
+            m = result["measured"]
+            print(f"✅ {result['scenario']}: p95 {m['p95']:.0f}ms | p99 {m['p99']:.0f}ms | "
+                  f"error {m['error_rate'] * 100:.2f}%")
+        else:
+            print(f"❌ {result['scenario']}: {'; '.join(result['violations'])}")
+    print("="*70)
+    print(f"📄 Reporte JSON: {report_path}")
+
+    if any(result["passed"] is False for result in results):
+        print("❌ ALGUNOS SLO NO SE CUMPLIERON")
+        environment.process_exit_code = 1
+    else:
+        print("✅ TODOS LOS SLO CUMPLIDOS")
+
+
+if __name__ == "__main__":
+    # Si se ejecuta directamente, mostrar instrucciones
+    print("="*70)
+    print("📈 SCRIPT DE PRUEBAS DE CARGA - EMBUDO DE PEDIDOS")
+    print("="*70)
+    print("\nEste script debe ejecutarse con Locust:")
+    print("\n1. Ejecutar con interfaz web:")
+    print("   locust -f qa_automated/tests/load_test_pedidos.py --host=http://localhost:5000")
+    print("\n2. Ejecutar en modo headless con reportes CSV, HTML y JSON:")
+    print("   locust -f qa_automated/tests/load_test_pedidos.py --host=http://localhost:5000 \\")
+    print("          --headless -u 300 -r 30 -t 5m --csv qa_automated/reports/pedidos \\")
+    print("          --html qa_automated/reports/pedidos.html")
+    print("="*70)
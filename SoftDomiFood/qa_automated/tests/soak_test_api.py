@@ -0,0 +1,373 @@
+"""
+🕒 Prueba de Resistencia (Soak) - Crecimiento de Memoria
+==========================================================
+
+Ejecuta la API en el mismo proceso (httpx + ASGI, con su lifespan) bajo
+tráfico sintético sostenido durante un tiempo configurable, y vigila la
+memoria del worker:
+- tracemalloc: memoria asignada por Python y sitios de asignación que crecen
+- RSS del proceso (/proc/self/statm), sin la memoria interna de tracemalloc
+
+Después del calentamiento se toma la línea base; luego una muestra cada
+--interval segundos (con gc.collect() antes). La prueba falla si la memoria
+del último tercio supera a la del primero en más de la tolerancia y sigue
+creciendo en el tercio central, o si la tasa de error supera --max-error-rate.
+El reporte lista los sitios de asignación que más crecieron.
+
+Tráfico (por usuario virtual): catálogo, crear pedido y consultar su estado,
+historial, tablero de admin (respuestas grandes), estadísticas y /metrics.
+RabbitMQ se reemplaza por el broker en memoria con caídas de conexión
+simuladas (MEMORY_BROKER_DISCONNECT_RATE, 5% por defecto) para ejercitar la
+reconexión del canal global.
+
+Componente bajo prueba: Worker de la API (api/main.py) en ejecución prolongada
+
+Prerrequisitos:
+- DATABASE_URL de una base con catálogo (python api/seed_data.py) y el admin
+  por defecto (SOAK_ADMIN_EMAIL / SOAK_ADMIN_PASSWORD)
+
+Uso:
+    python qa_automated/tests/soak_test_api.py --duration 1800 --concurrency 20
+    python qa_automated/tests/soak_test_api.py --duration 300 --warmup 30 --interval 10 \\
+           --max-traced-growth-mb 5 --max-rss-growth-mb 40
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import linecache
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# Configurar el entorno ANTES de importar la aplicación
+project_root = Path(__file__).parent.parent.parent
+api_dir = project_root / "api"
+if str(api_dir) not in sys.path:
+    sys.path.insert(0, str(api_dir))
+
+os.environ.setdefault("BROKER_BACKEND", "memory")
+os.environ.setdefault("MEMORY_BROKER_DISCONNECT_RATE", "0.05")
+# Cola del broker en memoria acotada: no confundir mensajes retenidos con una fuga
+os.environ.setdefault("MEMORY_BROKER_MAX_MESSAGES", "1000")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import httpx
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+ADMIN_EMAIL = os.getenv("SOAK_ADMIN_EMAIL", "Admin@sofka.com")
+ADMIN_PASSWORD = os.getenv("SOAK_ADMIN_PASSWORD", "Admin 123")
+CUSTOMER_PASSWORD = "SoakTest123!"
+
+REPORT_DIR = os.getenv(
+    "SOAK_TEST_REPORT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports")
+)
+
+# Códigos postales con cobertura en api/data/delivery_zones.geojson
+ZIP_CODES = ["110111", "110221", "110231", "110311", "110411", "110511", "110911", "111011"]
+
+# Mezcla de acciones por usuario virtual: (acción, peso)
+ACTIONS = [
+    ("browse_catalog", 8),
+    ("place_order", 4),
+    ("order_history", 3),
+    ("admin_orders", 2),
+    ("admin_stats", 1),
+    ("metrics", 1),
+]
+
+# Marcos ignorados al buscar sitios de asignación
+IGNORED_FRAMES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+MB = 1024 * 1024
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def current_rss() -> int:
+    """RSS actual en bytes (pico de RSS si no hay /proc)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# ============================================================================
+# TRÁFICO SINTÉTICO
+# ============================================================================
+
+class SoakTraffic:
+    """Usuarios virtuales que recorren la API hasta la fecha límite"""
+
+    def __init__(self, client: httpx.AsyncClient, customers: int):
+        self.client = client
+        self.customers_needed = customers
+        self.customers = []  # (token, address_id)
+        self.admin_token = None
+        self.products = []
+        self.requests = Counter()
+        self.errors = Counter()
+
+    async def request(self, name, method, url, **kwargs):
+        self.requests[name] += 1
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception as e:
+            self.errors[f"{name}: {type(e).__name__}"] += 1
+            return None
+        if response.status_code >= 400:
+            self.errors[f"{name}: {response.status_code}"] += 1
+        return response
+
+    async def setup(self):
+        """Token de admin, catálogo y clientes con una dirección"""
+        response = await self.client.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        if response.status_code != 200:
+            raise SystemExit(f"❌ Login de admin falló ({response.status_code}): revise SOAK_ADMIN_EMAIL/PASSWORD")
+        self.admin_token = response.json()["token"]
+
+        response = await self.client.get("/api/products/")
+        self.products = [p for p in response.json()["products"] if p.get("isAvailable", True)]
+        if not self.products:
+            raise SystemExit("❌ No hay productos: ejecute python api/seed_data.py")
+
+        for _ in range(self.customers_needed):
+            email = f"soak_{uuid.uuid4().hex[:12]}@example.com"
+            response = await self.client.post("/api/auth/register", json={
+                "email": email, "password": CUSTOMER_PASSWORD, "name": "Cliente Soak", "phone": "3000000000"
+            })
+            token = response.json()["token"]
+            response = await self.client.post("/api/addresses", headers=auth_headers(token), json={
+                "street": "Calle 1 # 2-3", "city": "Bogotá", "state": "Cundinamarca",
+                "zipCode": random.choice(ZIP_CODES), "isDefault": True
+            })
+            self.customers.append((token, response.json()["address"]["id"]))
+
+    async def browse_catalog(self, customer):
+        await self.request("GET /api/products/", "GET", "/api/products/")
+
+    async def place_order(self, customer):
+        token, address_id = customer
+        items = [{"productId": p["id"], "quantity": random.randint(1, 3)}
+                 for p in random.sample(self.products, min(len(self.products), random.randint(1, 3)))]
+        response = await self.request("POST /api/orders/", "POST", "/api/orders/", headers=auth_headers(token),
+                                      json={"addressId": address_id, "items": items, "paymentMethod": "CASH"})
+        if response is not None and response.status_code == 200:
+            order_id = response.json()["order"]["id"]
+            await self.request("GET /api/orders/{order_id}", "GET", f"/api/orders/{order_id}",
+                               headers=auth_headers(token))
+
+    async def order_history(self, customer):
+        await self.request("GET /api/orders/", "GET", "/api/orders/", headers=auth_headers(customer[0]))
+
+    async def admin_orders(self, customer):
+        await self.request("GET /api/admin/orders", "GET", "/api/admin/orders", headers=auth_headers(self.admin_token))
+
+    async def admin_stats(self, customer):
+        await self.request("GET /api/admin/stats", "GET", "/api/admin/stats",
+                           params={"days": random.choice([1, 7, 30])}, headers=auth_headers(self.admin_token))
+
+    async def metrics(self, customer):
+        await self.request("GET /metrics", "GET", "/metrics")
+
+    async def virtual_user(self, index: int, deadline: float, think_time: float):
+        customer = self.customers[index % len(self.customers)]
+        names = [name for name, _ in ACTIONS]
+        weights = [weight for _, weight in ACTIONS]
+        while time.monotonic() < deadline:
+            action = random.choices(names, weights=weights)[0]
+            await getattr(self, action)(customer)
+            await asyncio.sleep(random.uniform(0, think_time))
+
+
+# ============================================================================
+# MUESTREO DE MEMORIA
+# ============================================================================
+
+def take_sample(started: float, baseline_snapshot, top: int):
+    """Muestra de memoria tras un gc.collect(), con los sitios que más crecen"""
+    gc.collect()
+    # RSS antes de la instantánea y sin las estructuras internas de tracemalloc
+    rss = current_rss() - tracemalloc.get_tracemalloc_memory()
+    traced, _ = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED_FRAMES)
+    sample = {
+        "elapsedSeconds": round(time.monotonic() - started, 1),
+        "tracedBytes": traced,
+        "rssBytes": rss,
+    }
+    if baseline_snapshot is not None:
+        sample["topGrowth"] = growing_sites(snapshot, baseline_snapshot, top)
+    return sample, snapshot
+
+
+def growing_sites(snapshot, baseline_snapshot, top: int):
+    """Sitios de asignación con mayor crecimiento respecto a la línea base"""
+    sites = []
+    for stat in snapshot.compare_to(baseline_snapshot, "traceback"):
+        if stat.size_diff <= 0:
+            continue
+        frames = stat.traceback.format(most_recent_first=True)
+        sites.append({
+            "site": frames[0].strip() if frames else "?",
+            "traceback": [line.strip() for line in frames[:8]],
+            "sizeDiffBytes": stat.size_diff,
+            "countDiff": stat.count_diff,
+            "sizeBytes": stat.size,
+        })
+        if len(sites) == top:
+            break
+    return sites
+
+
+def evaluate_growth(samples, key: str, tolerance_bytes: float):
+    """Crecimiento entre el primer y el último tercio de las muestras"""
+    values = [sample[key] for sample in samples]
+    third = max(1, len(values) // 3)
+    first = statistics.median(values[:third])
+    middle = statistics.median(values[third:-third] or values)
+    last = statistics.median(values[-third:])
+    growth = last - first
+    return {
+        "firstBytes": first,
+        "lastBytes": last,
+        "growthBytes": growth,
+        "toleranceBytes": tolerance_bytes,
+        # Fuga: creció más que la tolerancia y seguía creciendo a mitad de la prueba
+        "passed": not (growth > tolerance_bytes and middle > first),
+    }
+
+
+# ============================================================================
+# EJECUCIÓN
+# ============================================================================
+
+async def run_soak(args):
+    # Importar la app después de iniciar tracemalloc para ver sus asignaciones
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://soak", timeout=60) as client:
+            traffic = SoakTraffic(client, customers=min(args.concurrency, 20))
+            await traffic.setup()
+
+            started = time.monotonic()
+            deadline = started + args.warmup + args.duration
+            users = [asyncio.create_task(traffic.virtual_user(i, deadline, args.think_time))
+                     for i in range(args.concurrency)]
+
+            print(f"🔥 Calentamiento: {args.warmup}s con {args.concurrency} usuarios virtuales...")
+            await asyncio.sleep(args.warmup)
+            baseline_sample, baseline_snapshot = take_sample(started, None, args.top)
+            samples = [baseline_sample]
+            print(f"📏 Línea base: tracemalloc {baseline_sample['tracedBytes'] / MB:.1f} MB, "
+                  f"RSS {baseline_sample['rssBytes'] / MB:.1f} MB")
+
+            while time.monotonic() + args.interval <= deadline:
+                await asyncio.sleep(args.interval)
+                sample, snapshot = take_sample(started, baseline_snapshot, args.top)
+                samples.append(sample)
+                top_site = sample["topGrowth"][0] if sample["topGrowth"] else None
+                print(f"   t={sample['elapsedSeconds']:>7.0f}s  tracemalloc {sample['tracedBytes'] / MB:7.1f} MB  "
+                      f"RSS {sample['rssBytes'] / MB:7.1f} MB  peticiones {sum(traffic.requests.values())}"
+                      + (f"  ↑ {top_site['sizeDiffBytes'] / 1024:.0f} KiB {top_site['site']}" if top_site else ""))
+
+            await asyncio.gather(*users)
+            final_sites = growing_sites(snapshot, baseline_snapshot, args.top) if len(samples) > 1 else []
+    return traffic, samples, final_sites
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de resistencia con detección de crecimiento de memoria")
+    parser.add_argument("--duration", type=float, default=600, help="Segundos de prueba después del calentamiento")
+    parser.add_argument("--warmup", type=float, default=60, help="Segundos de calentamiento antes de la línea base")
+    parser.add_argument("--interval", type=float, default=15, help="Segundos entre muestras de memoria")
+    parser.add_argument("--concurrency", type=int, default=20, help="Usuarios virtuales")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Pausa máxima entre acciones (s)")
+    parser.add_argument("--max-traced-growth-mb", type=float, default=10)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=50)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--top", type=int, default=15, help="Sitios de asignación en el reporte")
+    parser.add_argument("--frames", type=int, default=5, help="Profundidad de pila de tracemalloc")
+    args = parser.parse_args()
+
+    tracemalloc.start(args.frames)
+    traffic, samples, final_sites = asyncio.run(run_soak(args))
+    tracemalloc.stop()
+
+    if len(samples) < 3:
+        print("❌ Muy pocas muestras: aumente --duration o reduzca --interval")
+        sys.exit(1)
+
+    traced = evaluate_growth(samples, "tracedBytes", args.max_traced_growth_mb * MB)
+    rss = evaluate_growth(samples, "rssBytes", args.max_rss_growth_mb * MB)
+    total_requests = sum(traffic.requests.values())
+    total_errors = sum(traffic.errors.values())
+    error_rate = total_errors / total_requests if total_requests else 0
+    passed = traced["passed"] and rss["passed"] and error_rate <= args.max_error_rate
+
+    print("="*78)
+    print("🕒 RESULTADO DE LA PRUEBA DE RESISTENCIA")
+    print("="*78)
+    for label, result in (("tracemalloc", traced), ("RSS", rss)):
+        icon = "✅" if result["passed"] else "❌"
+        print(f"{icon} {label:<12} {result['firstBytes'] / MB:8.1f} MB -> {result['lastBytes'] / MB:8.1f} MB "
+              f"({result['growthBytes'] / MB:+.1f} MB, tolerancia {result['toleranceBytes'] / MB:.0f} MB)")
+    icon = "✅" if error_rate <= args.max_error_rate else "❌"
+    print(f"{icon} errores      {total_errors}/{total_requests} ({error_rate * 100:.2f}%)")
+    for error, count in traffic.errors.most_common(5):
+        print(f"      {count:>6}  {error}")
+    print("-"*78)
+    print("📈 Sitios de asignación que más crecieron:")
+    for site in final_sites:
+        print(f"   {site['sizeDiffBytes'] / 1024:>10.1f} KiB  {site['countDiff']:>+8} objetos  {site['site']}")
+    print("="*78)
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_file = os.path.join(REPORT_DIR, f"soak_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump({
+            "passed": passed,
+            "config": vars(args),
+            "tracemalloc": traced,
+            "rss": rss,
+            "requests": dict(traffic.requests),
+            "errors": dict(traffic.errors),
+            "errorRate": round(error_rate, 4),
+            "topGrowth": final_sites,
+            "samples": samples,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"📄 Reporte: {report_file}")
+
+    if not passed:
+        print("❌ La prueba de resistencia falló")
+        sys.exit(1)
+    print("✅ Memoria estable")
+
+
+if __name__ == "__main__":
+    main()
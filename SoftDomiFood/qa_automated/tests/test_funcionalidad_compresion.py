@@ -0,0 +1,142 @@
+"""
+⚙️ Script de Validación Funcional - Compresión de Respuestas
+==============================================================
+
+Pruebas de la negociación de Accept-Encoding y del middleware que comprime las
+respuestas grandes con gzip o brotli: umbral mínimo, respuestas en streaming,
+tipos ya comprimidos y ETag (las funciones de BD se simulan).
+
+Componente bajo prueba: api/services/compression.py
+"""
+
+import gzip
+import pytest
+import brotli
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from unittest.mock import patch, AsyncMock
+
+from main import app
+from services.auth_service import create_access_token
+from services.compression import CompressionMiddleware, select_encoding
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def client():
+    """Cliente de pruebas de la API"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin_headers():
+    """Cabeceras con token de administrador"""
+    token = create_access_token({"userId": "admin-1", "role": "ADMIN"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def orders():
+    """Listado grande de pedidos como lo devuelve get_all_orders"""
+    return [
+        {"id": f"order-{i}", "status": "PENDING", "total": 42000, "customer_name": "Cliente",
+         "delivery_street": "Calle 123", "items": [{"productId": "p1", "quantity": 2, "product_name": "Salchipapa"}]}
+        for i in range(200)
+    ]
+
+
+@pytest.fixture
+def raw_app():
+    """Aplicación mínima con el middleware para probar tipos y cabeceras"""
+    test_app = FastAPI()
+    test_app.add_middleware(CompressionMiddleware, min_size=100)
+
+    @test_app.get("/image")
+    async def image():
+        return Response(content=b"\x89PNG" + b"0" * 5000, media_type="image/png")
+
+    @test_app.get("/etag")
+    async def etag():
+        return Response(content=b"{}" + b" " * 5000, media_type="application/json", headers={"ETag": '"v1"'})
+
+    @test_app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield b'{"id": 1}\n' * 200
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    return TestClient(test_app)
+
+
+# ============================================================================
+# TESTS UNITARIOS - Negociación
+# ============================================================================
+
+class TestSelectEncoding:
+    """Tests para select_encoding"""
+
+    @pytest.mark.parametrize("accept_encoding, expected", [
+        ("gzip, deflate, br", "br"),
+        ("gzip, deflate", "gzip"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("*", "br"),
+        ("identity", None),
+        ("", None),
+        (None, None),
+    ])
+    def test_negotiation(self, accept_encoding, expected):
+        assert select_encoding(accept_encoding) == expected
+
+
+# ============================================================================
+# TESTS FUNCIONALES - Middleware
+# ============================================================================
+
+class TestCompressionMiddleware:
+    """Tests del middleware sobre la API"""
+
+    @pytest.mark.parametrize("encoding, decompress", [("br", brotli.decompress), ("gzip", gzip.decompress)])
+    def test_large_admin_response_is_compressed(self, client, admin_headers, orders, encoding, decompress):
+        with patch("routers.admin.get_all_orders", new=AsyncMock(return_value=orders)):
+            with client.stream("GET", "/api/admin/orders",
+                               headers={**admin_headers, "Accept-Encoding": encoding}) as response:
+                raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == encoding
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) == len(raw)
+        assert b"order-199" in decompress(raw)
+
+    def test_identity_is_not_compressed(self, client, admin_headers, orders):
+        with patch("routers.admin.get_all_orders", new=AsyncMock(return_value=orders)):
+            response = client.get("/api/admin/orders", headers={**admin_headers, "Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert len(response.json()["orders"]) == 200
+
+    def test_small_response_is_not_compressed(self, client):
+        response = client.get("/api/health", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_already_compressed_type_is_skipped(self, raw_app):
+        response = raw_app.get("/image", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert "vary" not in response.headers
+
+    def test_streaming_response_is_skipped(self, raw_app):
+        response = raw_app.get("/stream", headers={"Accept-Encoding": "br"})
+        assert "content-encoding" not in response.headers
+        assert len(response.text.splitlines()) == 600
+
+    def test_etag_is_weakened(self, raw_app):
+        response = raw_app.get("/etag", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["etag"] == 'W/"v1"'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
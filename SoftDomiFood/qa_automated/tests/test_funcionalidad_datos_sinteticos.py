@@ -0,0 +1,157 @@
+"""
+⚙️ Script de Validación Funcional - Generador de Datos Sintéticos
+===================================================================
+
+Pruebas del generador a gran escala (seed_data.py --generate): lotes
+deterministas a partir de la semilla, referencias consistentes entre lotes y
+distribuciones sesgadas (productos populares, horas pico).
+
+Componente bajo prueba: api/synthetic_data.py
+"""
+
+import json
+import uuid
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from synthetic_data import (
+    ACTIVE_ORDER_WINDOW, ADDRESS_COLUMNS, DOCUMENT_COLUMNS, ITEM_COLUMNS, ORDER_COLUMNS, USER_COLUMNS,
+    build_plan, generate_order_batch, generate_user_batch, synthetic_uuid
+)
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+END = datetime(2025, 11, 20)
+
+
+@pytest.fixture(scope="module")
+def products():
+    """Catálogo de prueba: (id, nombre, descripción, categoría, precio) ordenado por nombre"""
+    return [
+        (uuid.UUID(int=i + 1), f"Producto {i:02d}", f"Descripción {i:02d}", "SALCHIPAPAS",
+         Decimal(f"{(i + 1) * 1000}.00"))
+        for i in range(10)
+    ]
+
+
+@pytest.fixture(scope="module")
+def plan(products):
+    return build_plan(seed=42, users=500, end=END, days=60, password_hash="hash", products=products)
+
+
+@pytest.fixture(scope="module")
+def order_batch(plan):
+    return generate_order_batch(plan, 0, 5000)
+
+
+# ============================================================================
+# TESTS UNITARIOS - Determinismo
+# ============================================================================
+
+class TestDeterminism:
+    """La misma semilla produce los mismos datos"""
+
+    def test_same_seed_same_batches(self, plan, order_batch):
+        assert generate_order_batch(plan, 0, 5000) == order_batch
+        assert generate_user_batch(plan, 0, 100) == generate_user_batch(plan, 0, 100)
+
+    def test_batches_do_not_depend_on_split(self, plan):
+        """Los usuarios son los mismos con cualquier tamaño de lote"""
+        whole_users, whole_addresses = generate_user_batch(plan, 0, 200)
+        first_users, first_addresses = generate_user_batch(plan, 0, 80)
+        rest_users, rest_addresses = generate_user_batch(plan, 80, 200)
+        assert first_users + rest_users == whole_users
+        assert first_addresses + rest_addresses == whole_addresses
+
+    def test_other_seed_other_ids(self, plan, products):
+        other = build_plan(seed=7, users=500, end=END, days=60, password_hash="hash", products=products)
+        assert generate_user_batch(other, 0, 10)[0][0][0] != generate_user_batch(plan, 0, 10)[0][0][0]
+        assert synthetic_uuid(42, "order", 1) == synthetic_uuid(42, "order", 1)
+        assert synthetic_uuid(42, "order", 1).version == 4
+
+
+# ============================================================================
+# TESTS UNITARIOS - Integridad de los registros
+# ============================================================================
+
+class TestRecords:
+    """Los registros coinciden con las columnas y se referencian entre sí"""
+
+    def test_record_shapes(self, plan, order_batch):
+        users, addresses = generate_user_batch(plan, 0, 50)
+        orders, items, documents = order_batch
+        assert all(len(record) == len(USER_COLUMNS) for record in users)
+        assert all(len(record) == len(ADDRESS_COLUMNS) for record in addresses)
+        assert all(len(record) == len(ORDER_COLUMNS) for record in orders)
+        assert all(len(record) == len(ITEM_COLUMNS) for record in items)
+        assert all(len(record) == len(DOCUMENT_COLUMNS) for record in documents)
+
+    def test_one_default_address_per_user(self, plan):
+        users, addresses = generate_user_batch(plan, 0, 300)
+        defaults = Counter(address[1] for address in addresses if address[7])
+        assert set(defaults) == {user[0] for user in users}
+        assert set(defaults.values()) == {1}
+
+    def test_orders_reference_generated_users_and_addresses(self, plan, order_batch):
+        users, addresses = generate_user_batch(plan, 0, plan.users)
+        address_owner = {address[0]: address[1] for address in addresses}
+        orders, _, _ = order_batch
+        for order in orders:
+            assert address_owner[order[2]] == order[1]
+
+    def test_totals_and_documents_match_items(self, order_batch):
+        orders, items, documents = order_batch
+        items_by_order = {}
+        for item in items:
+            items_by_order.setdefault(item[1], []).append(item)
+        for order, document_record in zip(orders[:200], documents[:200]):
+            order_items = items_by_order[order[0]]
+            assert order[4] == sum(item[3] * item[4] for item in order_items)
+            # Los items comparten la partición mensual del pedido
+            assert all(item[6] == order[7] for item in order_items)
+            document = json.loads(document_record[5])
+            assert document["id"] == str(order[0])
+            assert document["itemCount"] == sum(item[3] for item in order_items)
+            assert len(document["items"]) == len(order_items)
+            # Mismas claves por item que build_order_document
+            assert all(item["product_description"].startswith("Descripción") for item in document["items"])
+
+
+# ============================================================================
+# TESTS UNITARIOS - Distribuciones
+# ============================================================================
+
+class TestDistributions:
+    """Sesgos realistas en productos, horas y estados"""
+
+    def test_product_popularity_is_skewed(self, order_batch):
+        _, items, _ = order_batch
+        units = Counter()
+        for item in items:
+            units[item[2]] += item[3]
+        ranked = [count for _, count in units.most_common()]
+        assert ranked[0] > 4 * ranked[-1]
+
+    def test_lunch_and_dinner_peaks(self, order_batch):
+        orders, _, _ = order_batch
+        hours = Counter(order[7].hour for order in orders)
+        top_hours = {hour for hour, _ in hours.most_common(4)}
+        assert top_hours <= {12, 13, 19, 20, 21}
+        assert hours[4] == 0
+
+    def test_orders_inside_period_and_status_by_age(self, plan, order_batch):
+        orders, _, _ = order_batch
+        for order in orders:
+            assert plan.start <= order[7] < plan.end
+            if plan.end - order[7] >= ACTIVE_ORDER_WINDOW:
+                assert order[3] in ("DELIVERED", "CANCELLED")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,249 @@
+"""
+⚙️ Script de Validación Funcional - Módulo de Direcciones
+===========================================================
+
+Pruebas de la libreta de direcciones en caché (lecturas por usuario y por ID,
+invalidación al crear una dirección; la conexión a PostgreSQL se simula) y de
+la resolución de zonas de entrega con el índice espacial.
+
+Componente bajo prueba: api/services/database_service.py, api/services/cache.py,
+api/services/delivery_zones.py
+"""
+
+import asyncio
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from main import app
+
+from services import database_service, delivery_zones
+from services.auth_service import create_access_token
+from services.cache import address_cache
+from services.delivery_zones import DeliveryZoneIndex, point_in_polygon, resolve_delivery_zone
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture(autouse=True)
+def empty_address_cache():
+    """Caché de direcciones vacía en cada test"""
+    address_cache.invalidate()
+    yield
+    address_cache.invalidate()
+
+
+@pytest.fixture
+def zones_geojson():
+    """Dos zonas (una con hueco) y centroides de códigos postales"""
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature",
+             "properties": {"zoneId": "A", "name": "Zona A", "deliveryFee": 4000, "zipCodes": ["000001"]},
+             "geometry": {"type": "Polygon", "coordinates": [
+                 [[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]],
+                 [[0.4, 0.4], [0.6, 0.4], [0.6, 0.6], [0.4, 0.6], [0.4, 0.4]]
+             ]}},
+            {"type": "Feature",
+             "properties": {"zoneId": "B", "name": "Zona B", "deliveryFee": 6000},
+             "geometry": {"type": "MultiPolygon", "coordinates": [
+                 [[[1, 0], [2, 0], [2, 1], [1, 1], [1, 0]]]
+             ]}},
+            {"type": "Feature", "properties": {"zipCode": "000002"},
+             "geometry": {"type": "Point", "coordinates": [1.5, 0.5]}},
+            {"type": "Feature", "properties": {"zipCode": "000003"},
+             "geometry": {"type": "Point", "coordinates": [5, 5]}},
+        ]
+    }
+
+
+@pytest.fixture
+def zone_index(zones_geojson):
+    """Índice de zonas de prueba instalado como índice global"""
+    index = DeliveryZoneIndex.from_geojson(zones_geojson, cell_degrees=0.25)
+    delivery_zones.delivery_zone_cache.invalidate()
+    with patch.object(delivery_zones, "_index", index), patch.object(delivery_zones, "_loaded", True):
+        yield index
+    delivery_zones.delivery_zone_cache.invalidate()
+
+
+@pytest.fixture
+def address_rows():
+    """Filas de la tabla addresses de un usuario"""
+    now = datetime(2025, 11, 20, 12, 30)
+    return [
+        {"id": "addr-1", "userId": "user-1", "street": "Calle 1", "city": "Bogotá", "state": "Cundinamarca",
+         "zipCode": "110111", "country": "Colombia", "isDefault": True, "instructions": None,
+         "createdAt": now, "updatedAt": now},
+        {"id": "addr-2", "userId": "user-1", "street": "Calle 2", "city": "Bogotá", "state": "Cundinamarca",
+         "zipCode": "110111", "country": "Colombia", "isDefault": False, "instructions": None,
+         "createdAt": now, "updatedAt": now},
+    ]
+
+
+@pytest.fixture
+def mock_conn(address_rows):
+    """Conexión simulada de asyncpg"""
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=address_rows)
+    conn.fetchrow = AsyncMock(return_value=address_rows[0])
+    conn.close = AsyncMock()
+    with patch.object(database_service, "get_connection", new=AsyncMock(return_value=conn)):
+        yield conn
+
+
+# ============================================================================
+# TESTS UNITARIOS - Libreta de direcciones en caché
+# ============================================================================
+
+class TestAddressBookCache:
+    """Tests para get_user_addresses, get_address_by_id y create_address"""
+
+    def test_addresses_are_cached_per_user(self, mock_conn):
+        first = asyncio.run(database_service.get_user_addresses("user-1"))
+        second = asyncio.run(database_service.get_user_addresses("user-1"))
+        assert first == second
+        assert mock_conn.fetch.await_count == 1
+
+    def test_address_by_id_served_from_book(self, mock_conn):
+        asyncio.run(database_service.get_user_addresses("user-1"))
+        address = asyncio.run(database_service.get_address_by_id("addr-2"))
+        assert address["street"] == "Calle 2"
+        mock_conn.fetchrow.assert_not_awaited()
+
+    def test_address_by_id_uncached_queries_database(self, mock_conn):
+        asyncio.run(database_service.get_user_addresses("user-1"))
+        address = asyncio.run(database_service.get_address_by_id("addr-1", cached=False))
+        assert address["userId"] == "user-1"
+        mock_conn.fetchrow.assert_awaited_once()
+
+    def test_address_by_id_miss_queries_database(self, mock_conn):
+        address = asyncio.run(database_service.get_address_by_id("addr-1"))
+        assert address["userId"] == "user-1"
+        assert address["createdAt"] == "2025-11-20T12:30:00"
+        mock_conn.fetchrow.assert_awaited_once()
+
+    def test_create_address_invalidates_book(self, mock_conn, address_rows):
+        asyncio.run(database_service.get_user_addresses("user-1"))
+        asyncio.run(database_service.create_address("user-1", "Calle 3", "Bogotá", "Cundinamarca", "110111", is_default=True))
+        asyncio.run(database_service.get_user_addresses("user-1"))
+        assert mock_conn.fetch.await_count == 2
+
+    def test_create_address_uses_single_statement(self, mock_conn):
+        asyncio.run(database_service.create_address("user-1", "Calle 3", "Bogotá", "Cundinamarca", "110111", is_default=True))
+        mock_conn.fetchrow.assert_awaited_once()
+        sql = mock_conn.fetchrow.await_args.args[0]
+        assert "WITH cleared AS" in sql and "INSERT INTO addresses" in sql
+
+
+# ============================================================================
+# TESTS UNITARIOS - Zonas de entrega
+# ============================================================================
+
+class TestDeliveryZones:
+    """Tests para el índice de zonas de entrega"""
+
+    def test_point_in_polygon_respects_holes(self):
+        rings = [[(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)], [(0.4, 0.4), (0.6, 0.4), (0.6, 0.6), (0.4, 0.6), (0.4, 0.4)]]
+        assert point_in_polygon(0.2, 0.2, rings)
+        assert not point_in_polygon(0.5, 0.5, rings)
+
+    def test_locate_point(self, zone_index):
+        assert zone_index.locate(0.2, 0.8)["zoneId"] == "A"
+        assert zone_index.locate(1.5, 0.5)["zoneId"] == "B"
+        assert zone_index.locate(0.5, 0.5) is None
+        assert zone_index.locate(5, 5) is None
+
+    def test_zip_mapping(self, zone_index):
+        assert zone_index.zip_zones == {"000001": "A", "000002": "B"}
+
+    def test_resolve_address_by_zip(self, zone_index):
+        zone = resolve_delivery_zone({"id": "addr-1", "zipCode": " 000002 "})
+        assert zone == {"zoneId": "B", "name": "Zona B", "deliveryFee": 6000.0}
+
+    def test_out_of_area_is_cached(self, zone_index):
+        assert resolve_delivery_zone({"id": "addr-9", "zipCode": "000003"}) is None
+        with patch.object(zone_index, "zone_for_zip") as mock_lookup:
+            assert resolve_delivery_zone({"id": "addr-9", "zipCode": "000003"}) is None
+        mock_lookup.assert_not_called()
+
+    def test_coordinates_take_precedence(self, zone_index):
+        zone = resolve_delivery_zone({"zipCode": "000001", "latitude": 0.5, "longitude": 1.5})
+        assert zone["zoneId"] == "B"
+
+    def test_without_zone_file_everything_is_covered(self):
+        with patch.object(delivery_zones, "_index", None), patch.object(delivery_zones, "_loaded", True):
+            zone = resolve_delivery_zone({"id": "addr-1", "zipCode": "999999"})
+        assert zone["deliveryFee"] == 0
+
+    def test_zone_file_is_opt_in(self):
+        with patch.object(delivery_zones, "_index", None), patch.object(delivery_zones, "_loaded", False):
+            assert delivery_zones.load_delivery_zones("") is None
+            assert resolve_delivery_zone({"zipCode": "999999"}) == delivery_zones.UNRESTRICTED_ZONE
+
+    def test_sample_zone_file_covers_seed_address(self):
+        with patch.object(delivery_zones, "_index", None), patch.object(delivery_zones, "_loaded", False):
+            index = delivery_zones.load_delivery_zones(delivery_zones.SAMPLE_DELIVERY_ZONES_FILE)
+        assert index.zone_for_zip("110111") is not None
+
+
+# ============================================================================
+# TESTS DE INTEGRACIÓN - Cobertura en /api/addresses y /api/orders
+# ============================================================================
+
+class TestAddressCoverage:
+    """Tests de la zona de entrega al guardar direcciones y al pedir"""
+
+    @pytest.fixture
+    def client(self):
+        return TestClient(app)
+
+    @pytest.fixture
+    def headers(self):
+        token = create_access_token({"userId": "user-1", "role": "CUSTOMER"})
+        return {"Authorization": f"Bearer {token}"}
+
+    @staticmethod
+    def new_address(zip_code):
+        return {"street": "Calle 3", "city": "Bogotá", "state": "Cundinamarca", "zipCode": zip_code}
+
+    def test_uncovered_address_is_rejected_on_create(self, client, headers, zone_index):
+        with patch("routers.addresses.create_address", new=AsyncMock()) as mock_create:
+            response = client.post("/api/addresses", json=self.new_address("000003"), headers=headers)
+        assert response.status_code == 422
+        assert "cobertura" in response.json()["detail"]
+        mock_create.assert_not_awaited()
+
+    def test_covered_address_returns_its_zone(self, client, headers, zone_index, address_rows):
+        created = {**address_rows[0], "zipCode": "000001"}
+        with patch("routers.addresses.create_address", new=AsyncMock(return_value=created)):
+            response = client.post("/api/addresses", json=self.new_address("000001"), headers=headers)
+        assert response.status_code == 201
+        assert response.json()["address"]["deliveryZone"]["zoneId"] == "A"
+
+    def test_existing_unmapped_address_is_flagged(self, client, headers, zone_index, mock_conn):
+        # Direcciones guardadas antes de activar las zonas (110111 no está en el índice de prueba)
+        response = client.get("/api/addresses", headers=headers)
+        assert response.status_code == 200
+        assert [address["deliveryZone"] for address in response.json()["addresses"]] == [None, None]
+
+    def test_existing_unmapped_address_orders_without_zone_file(self, client, headers, address_rows):
+        address = {**address_rows[0], "zipCode": "999999"}
+        product = {"id": "p1", "name": "Salchipapa", "price": 10000, "isAvailable": True}
+        with patch.object(delivery_zones, "_index", None), patch.object(delivery_zones, "_loaded", True), \
+             patch("routers.orders.get_address_by_id", new=AsyncMock(return_value=address)), \
+             patch("routers.orders.get_products_by_ids", new=AsyncMock(return_value={"p1": product})), \
+             patch("routers.orders.create_order", new=AsyncMock(return_value={"id": "o1"})) as mock_create, \
+             patch("routers.orders.publish_order", new=AsyncMock()):
+            response = client.post("/api/orders/", json={"addressId": "addr-1", "items": [{"productId": "p1", "quantity": 2}]},
+                                   headers=headers)
+        assert response.status_code == 200
+        assert mock_create.await_args.kwargs["total"] == 20000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,217 @@
+"""
+⚙️ Script de Validación Funcional - Agregados del Dashboard
+=============================================================
+
+Pruebas de los agregados de /api/admin/stats: el trigger de order_documents
+solo agrega incrementos (*_delta), fold_order_stats los suma a los agregados y
+reconcile_order_stats los recalcula desde los documentos.
+
+Las pruebas de TestStatsOnPostgres ejecutan el SQL real y solo corren con
+POSTGRES_TEST_URL apuntando a una base de datos desechable (se borra su
+esquema public):
+    POSTGRES_TEST_URL=postgresql://postgres@localhost:5432/softdomifood_test pytest tests/test_funcionalidad_estadisticas.py
+
+Componente bajo prueba: api/init_db.py, api/services/stats_service.py
+"""
+
+import asyncio
+import json
+import os
+import re
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import init_db
+from init_db import SCHEMA_UPDATES_SQL
+from services import database_service, stats_service
+
+POSTGRES_TEST_URL = os.getenv("POSTGRES_TEST_URL")
+DELTA_TABLES = ("stats_daily_delta", "stats_hourly_delta", "stats_product_daily_delta")
+
+
+def sql_function(name: str) -> str:
+    """Cuerpo de una función PL/pgSQL de SCHEMA_UPDATES_SQL"""
+    return re.search(rf"FUNCTION {name}\(.*?\$\$(.*?)\$\$", SCHEMA_UPDATES_SQL, re.S).group(1)
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def mock_conn():
+    """Conexión simulada de asyncpg"""
+    conn = MagicMock()
+    conn.fetchrow = AsyncMock(return_value={"orders": 0, "revenue": 0})
+    conn.fetch = AsyncMock(return_value=[])
+    conn.fetchval = AsyncMock(return_value=True)
+    conn.close = AsyncMock()
+    conn.transaction = MagicMock(return_value=AsyncMock())
+    with patch.object(stats_service, "get_connection", new=AsyncMock(return_value=conn)):
+        yield conn
+
+
+@pytest.fixture
+def postgres():
+    """Esquema recién creado en POSTGRES_TEST_URL con un cliente, una dirección y un producto"""
+    if not POSTGRES_TEST_URL:
+        pytest.skip("POSTGRES_TEST_URL no está configurada")
+    import asyncpg
+
+    async def setup():
+        conn = await asyncpg.connect(POSTGRES_TEST_URL)
+        try:
+            await conn.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+            await conn.execute(init_db.INIT_SQL)
+            await conn.execute(SCHEMA_UPDATES_SQL)
+            await init_db.ensure_partitions(conn)
+            user_id = await conn.fetchval(
+                "INSERT INTO users (email, password, name) VALUES ('stats@example.com', 'x', 'Stats') RETURNING id"
+            )
+            address_id = await conn.fetchval(
+                """INSERT INTO addresses ("userId", street, city, state, "zipCode")
+                   VALUES ($1, 'Calle 1', 'Bogotá', 'Cundinamarca', '110111') RETURNING id""",
+                user_id
+            )
+            product_id = await conn.fetchval(
+                "INSERT INTO products (name, price, category) VALUES ('Salchipapa', 10000, 'SALCHIPAPAS') RETURNING id"
+            )
+            return {"userId": str(user_id), "addressId": str(address_id), "productId": str(product_id)}
+        finally:
+            await conn.close()
+
+    with patch.object(database_service, "DATABASE_URL", POSTGRES_TEST_URL):
+        yield asyncio.run(setup())
+
+
+# ============================================================================
+# TESTS UNITARIOS - SQL de los agregados
+# ============================================================================
+
+class TestStatsSql:
+    """Tests para el trigger, el plegado y la reconciliación de los agregados"""
+
+    def test_trigger_only_appends_deltas(self):
+        # Sin ON CONFLICT ni UPDATE: los pedidos concurrentes no comparten filas
+        for function in ("apply_order_document_stats", "stats_apply_sales"):
+            body = sql_function(function)
+            assert "ON CONFLICT" not in body
+            assert "UPDATE" not in body
+            inserted = set(re.findall(r"INSERT INTO (\w+)", body))
+            assert inserted and inserted <= set(DELTA_TABLES)
+
+    def test_fold_moves_every_delta_table(self):
+        body = sql_function("fold_order_stats")
+        for table in DELTA_TABLES:
+            assert f"DELETE FROM {table} RETURNING" in body
+            assert f"INSERT INTO {table.removesuffix('_delta')} AS" in body
+
+    def test_reconcile_folds_before_recomputing(self):
+        body = sql_function("reconcile_order_stats")
+        assert body.index("LOCK TABLE order_documents") < body.index("PERFORM fold_order_stats()")
+        assert body.index("PERFORM fold_order_stats()") < body.index("DELETE FROM stats_daily")
+
+    def test_current_views_include_pending_deltas(self):
+        for table in DELTA_TABLES:
+            rollup = table.removesuffix("_delta")
+            view = re.search(rf'VIEW "{rollup}_current" AS(.*?);', SCHEMA_UPDATES_SQL, re.S).group(1)
+            assert f"FROM {rollup}\n" in view and f"FROM {table}" in view
+
+
+class TestStatsService:
+    """Tests para get_dashboard_stats y fold_order_stats"""
+
+    def test_dashboard_reads_current_views(self, mock_conn):
+        asyncio.run(stats_service.get_dashboard_stats(days=7))
+        queries = [call.args[0] for call in mock_conn.fetch.await_args_list + mock_conn.fetchrow.await_args_list]
+        for query in queries:
+            tables = re.findall(r"FROM (\w+)", query)
+            assert tables and all(table.endswith("_current") for table in tables)
+
+    def test_fold_returns_folded_rows(self, mock_conn):
+        mock_conn.fetchval = AsyncMock(side_effect=[True, 12])
+        assert asyncio.run(stats_service.fold_order_stats()) == 12
+        assert mock_conn.fetchval.await_args.args[0] == "SELECT fold_order_stats()"
+
+    def test_fold_skipped_when_other_worker_folds(self, mock_conn):
+        mock_conn.fetchval = AsyncMock(return_value=False)
+        assert asyncio.run(stats_service.fold_order_stats()) is None
+        assert mock_conn.fetchval.await_count == 1
+
+
+# ============================================================================
+# TESTS DE INTEGRACIÓN - PostgreSQL (POSTGRES_TEST_URL)
+# ============================================================================
+
+class TestStatsOnPostgres:
+    """Tests del SQL de los agregados contra PostgreSQL"""
+
+    @staticmethod
+    async def create_orders(ids, count):
+        order_ids = []
+        for _ in range(count):
+            order = await database_service.create_order(
+                ids["userId"], ids["addressId"], [{"productId": ids["productId"], "quantity": 2, "price": 10000}], 20000
+            )
+            order_ids.append(order["id"])
+        return order_ids
+
+    @staticmethod
+    def snapshot(stats):
+        return json.dumps(stats, default=str, sort_keys=True)
+
+    def test_fold_and_reconcile_keep_dashboard_exact(self, postgres):
+        import asyncpg
+
+        async def scenario():
+            order_ids = await self.create_orders(postgres, 3)
+            pending = await stats_service.get_dashboard_stats(days=7)
+            assert pending["today"]["orders"] == 3
+            assert pending["topProducts"][0]["units"] == 6
+
+            assert await stats_service.fold_order_stats() > 0
+            assert self.snapshot(await stats_service.get_dashboard_stats(days=7)) == self.snapshot(pending)
+
+            conn = await asyncpg.connect(POSTGRES_TEST_URL)
+            try:
+                await conn.execute("UPDATE orders SET status = 'CANCELLED' WHERE id = $1", order_ids[0])
+                cancelled = await stats_service.get_dashboard_stats(days=7)
+                assert cancelled["ordersByStatus"] == {"PENDING": 2, "CANCELLED": 1}
+                assert cancelled["today"]["revenue"] == 40000
+
+                assert await stats_service.reconcile_order_stats(days=2)
+                assert self.snapshot(await stats_service.get_dashboard_stats(days=7)) == self.snapshot(cancelled)
+                for table in DELTA_TABLES:
+                    assert await conn.fetchval(f"SELECT COUNT(*) FROM {table}") == 0
+            finally:
+                await conn.close()
+
+        asyncio.run(scenario())
+
+    def test_concurrent_order_transactions_do_not_block(self, postgres):
+        import asyncpg
+
+        async def scenario():
+            first_id, second_id = await self.create_orders(postgres, 2)
+            first = await asyncpg.connect(POSTGRES_TEST_URL)
+            second = await asyncpg.connect(POSTGRES_TEST_URL)
+            try:
+                first_tx, second_tx = first.transaction(), second.transaction()
+                await first_tx.start()
+                await first.execute("UPDATE orders SET status = 'PREPARING' WHERE id = $1", first_id)
+                # Mismo bucket de hora y día: antes esperaba el bloqueo de la primera
+                await second_tx.start()
+                await asyncio.wait_for(
+                    second.execute("UPDATE orders SET status = 'PREPARING' WHERE id = $1", second_id), 5
+                )
+                await asyncio.wait_for(stats_service.fold_order_stats(), 5)
+                await first_tx.commit()
+                await second_tx.commit()
+            finally:
+                await first.close()
+                await second.close()
+
+            stats = await stats_service.get_dashboard_stats(days=7)
+            assert stats["ordersByStatus"] == {"PREPARING": 2}
+
+        asyncio.run(scenario())
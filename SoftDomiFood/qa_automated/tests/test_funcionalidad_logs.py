@@ -0,0 +1,131 @@
+"""
+⚙️ Script de Validación Funcional - Módulo de Logs
+====================================================
+
+Pruebas del logging estructurado: formato JSON con campos extra, correlación
+por requestId (cabecera X-Request-ID), muestreo de errores repetidos y
+niveles por módulo.
+
+Componente bajo prueba: api/services/logging_config.py
+"""
+
+import json
+import logging
+import sys
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from main import app
+from services.logging_config import (
+    ErrorSampler, JsonFormatter, RequestIdFilter, parse_levels, request_id_var
+)
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def client():
+    """Cliente de pruebas de la API"""
+    return TestClient(app)
+
+
+def make_record(msg="Error publicando mensaje", level=logging.ERROR, name="services.rabbitmq", args=(), **extra):
+    """LogRecord de prueba con campos extra"""
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+# ============================================================================
+# TESTS UNITARIOS - Formato y correlación
+# ============================================================================
+
+class TestJsonFormatter:
+    """Tests para JsonFormatter y RequestIdFilter"""
+
+    def test_one_json_object_with_extras(self):
+        record = make_record("Pool de pagos iniciado: %d workers", logging.INFO, args=(8,), orderId="o-1")
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry["msg"] == "Pool de pagos iniciado: 8 workers"
+        assert entry["level"] == "INFO" and entry["logger"] == "services.rabbitmq"
+        assert entry["orderId"] == "o-1"
+        assert "args" not in entry and "exc" not in entry
+
+    def test_exception_included(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord("x", logging.ERROR, __file__, 1, "fallo", (), sys.exc_info())
+        entry = json.loads(JsonFormatter().format(record))
+        assert "ValueError: boom" in entry["exc"]
+
+    def test_request_id_from_context(self):
+        token = request_id_var.set("req-123")
+        try:
+            record = make_record()
+            RequestIdFilter().filter(record)
+        finally:
+            request_id_var.reset(token)
+        assert record.requestId == "req-123"
+
+    def test_parse_levels(self):
+        assert parse_levels("services.rabbitmq=debug, routers.orders=WARNING,basura") == {
+            "services.rabbitmq": "DEBUG", "routers.orders": "WARNING"
+        }
+
+
+# ============================================================================
+# TESTS UNITARIOS - Muestreo de errores
+# ============================================================================
+
+class TestErrorSampler:
+    """Tests para ErrorSampler"""
+
+    def test_burst_then_drop(self):
+        sampler = ErrorSampler(burst=3, window_seconds=60)
+        passed = [sampler.filter(make_record()) for _ in range(10)]
+        assert passed == [True] * 3 + [False] * 7
+
+    def test_info_never_sampled(self):
+        sampler = ErrorSampler(burst=1, window_seconds=60)
+        assert all(sampler.filter(make_record(level=logging.INFO)) for _ in range(5))
+
+    def test_distinct_messages_sampled_independently(self):
+        sampler = ErrorSampler(burst=1, window_seconds=60)
+        assert sampler.filter(make_record("A"))
+        assert sampler.filter(make_record("B"))
+        assert not sampler.filter(make_record("A"))
+
+    def test_suppressed_count_reported_next_window(self):
+        sampler = ErrorSampler(burst=1, window_seconds=60)
+        with patch("services.logging_config.time.monotonic", return_value=100.0):
+            for _ in range(5):
+                sampler.filter(make_record())
+        record = make_record()
+        with patch("services.logging_config.time.monotonic", return_value=161.0):
+            assert sampler.filter(record)
+        assert record.suppressed == 4
+
+
+# ============================================================================
+# TESTS DE INTEGRACIÓN - Cabecera X-Request-ID
+# ============================================================================
+
+class TestRequestIdMiddleware:
+    """Tests para RequestIdMiddleware"""
+
+    def test_generates_request_id(self, client):
+        response = client.get("/api/health")
+        assert len(response.headers["x-request-id"]) == 32
+
+    def test_propagates_incoming_request_id(self, client):
+        response = client.get("/api/health", headers={"X-Request-ID": "abc-123"})
+        assert response.headers["x-request-id"] == "abc-123"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
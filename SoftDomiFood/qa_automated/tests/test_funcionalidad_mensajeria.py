@@ -0,0 +1,177 @@
+"""
+⚙️ Script de Validación Funcional - Broker en Memoria
+=======================================================
+
+Pruebas de la publicación de pedidos sin RabbitMQ (BROKER_BACKEND=memory):
+mensajes registrados por cola, confirmaciones, rechazos (nack), caídas de
+conexión con reconexión, latencia simulada y el flujo completo de
+POST /api/orders.
+
+Componente bajo prueba: api/services/memory_broker.py, api/services/rabbitmq.py
+"""
+
+import asyncio
+import json
+import time
+import pytest
+import aio_pika
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from main import app
+from services import memory_broker, rabbitmq
+from services.auth_service import create_access_token
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture(autouse=True)
+def fresh_broker():
+    """Broker vacío y sin conexión persistente en cada test"""
+    rabbitmq._connection = None
+    rabbitmq._channel = None
+    memory_broker.reset_broker()
+    yield
+    rabbitmq._connection = None
+    rabbitmq._channel = None
+    memory_broker.reset_broker()
+
+
+@pytest.fixture
+def order():
+    return {
+        "id": "o1", "userId": "user-1", "addressId": "addr-1", "total": 24000, "notes": None,
+        "items": [{"productId": "p1", "quantity": 2, "price": 10000}],
+    }
+
+
+def failures():
+    return REGISTRY.get_sample_value("rabbitmq_publish_failures_total") or 0
+
+
+def queued_orders():
+    return [json.loads(message["body"]) for message in memory_broker.get_messages(rabbitmq.QUEUE_NAME)]
+
+
+# ============================================================================
+# TESTS UNITARIOS - Publicación
+# ============================================================================
+
+class TestMemoryBrokerPublish:
+    """publish_order contra el broker en memoria"""
+
+    def test_backend_selected_by_config(self):
+        assert rabbitmq.BROKER_BACKEND == "memory"
+        connection = asyncio.run(rabbitmq.get_connection())
+        assert isinstance(connection, memory_broker.MemoryConnection)
+
+    def test_publish_records_worker_message(self, order):
+        assert asyncio.run(rabbitmq.publish_order(order)) is True
+        messages = memory_broker.get_messages(rabbitmq.QUEUE_NAME)
+        assert len(messages) == 1
+        assert messages[0]["deliveryMode"] == int(aio_pika.DeliveryMode.PERSISTENT)
+        assert queued_orders()[0] == {
+            "orderId": "o1", "userId": "user-1", "addressId": "addr-1",
+            "items": [{"productId": "p1", "quantity": 2, "price": 10000.0}],
+            "total": 24000.0, "notes": None,
+        }
+
+    def test_confirms_return_ack(self):
+        async def publish(confirms):
+            connection = await memory_broker.connect()
+            channel = await connection.channel(publisher_confirms=confirms)
+            await channel.declare_queue("q", durable=True)
+            return await channel.default_exchange.publish(aio_pika.Message(body=b"x"), routing_key="q")
+
+        ack = asyncio.run(publish(True))
+        assert ack.name == "Basic.Ack" and ack.delivery_tag == 1
+        assert asyncio.run(publish(False)) is None
+        assert len(memory_broker.get_messages("q")) == 2
+
+    def test_unroutable_message_is_dropped(self):
+        async def publish():
+            connection = await memory_broker.connect()
+            channel = await connection.channel()
+            await channel.default_exchange.publish(aio_pika.Message(body=b"x"), routing_key="sin_cola")
+
+        asyncio.run(publish())
+        assert memory_broker.get_broker_stats()["unroutable"] == 1
+        assert memory_broker.get_messages("sin_cola") == []
+
+
+# ============================================================================
+# TESTS UNITARIOS - Fallas simuladas
+# ============================================================================
+
+class TestMemoryBrokerFailures:
+    """Latencia, nack y caídas de conexión"""
+
+    def test_nack_raises_and_counts_failure(self, order):
+        memory_broker.configure(nack_rate=1)
+        before = failures()
+        with pytest.raises(aio_pika.exceptions.DeliveryError):
+            asyncio.run(rabbitmq.publish_order(order))
+        assert failures() == before + 1
+        assert queued_orders() == []
+        assert memory_broker.get_broker_stats()["nacked"] == 1
+
+    def test_connection_loss_reconnects_and_retries(self, order):
+        memory_broker.configure(disconnect_rate=0.5)
+        # Primera publicación: caída de conexión; reintento: entregado
+        with patch.object(memory_broker._random, "random", side_effect=[0.1, 0.9]):
+            assert asyncio.run(rabbitmq.publish_order(order)) is True
+        assert memory_broker.get_broker_stats()["disconnects"] == 1
+        assert [message["orderId"] for message in queued_orders()] == ["o1"]
+
+    def test_simulated_latency(self, order):
+        memory_broker.configure(latency_ms=40)
+        start = time.perf_counter()
+        asyncio.run(rabbitmq.publish_order(order))
+        assert time.perf_counter() - start >= 0.02
+
+    def test_seeded_failures_are_reproducible(self, order):
+        def run():
+            memory_broker.reset_broker()
+            memory_broker.configure(nack_rate=0.5, seed=123)
+            outcomes = []
+            for _ in range(20):
+                try:
+                    asyncio.run(rabbitmq.publish_order(order))
+                    outcomes.append(True)
+                except aio_pika.exceptions.DeliveryError:
+                    outcomes.append(False)
+            return outcomes
+
+        first = run()
+        assert first == run()
+        assert True in first and False in first
+
+
+# ============================================================================
+# TESTS DE INTEGRACIÓN - POST /api/orders
+# ============================================================================
+
+class TestOrderPipeline:
+    """El pedido creado llega a la cola sin RabbitMQ"""
+
+    def test_created_order_is_queued(self):
+        client = TestClient(app)
+        token = create_access_token({"userId": "user-1", "role": "CUSTOMER"})
+        address = {"id": "addr-1", "userId": "user-1", "zipCode": "110111"}
+        product = {"id": "p1", "name": "Salchipapa", "price": 10000, "isAvailable": True}
+        created = {"id": "o1", "userId": "user-1", "addressId": "addr-1", "total": 24000,
+                   "items": [{"productId": "p1", "quantity": 2, "price": 10000}]}
+        with patch("routers.orders.get_address_by_id", new=AsyncMock(return_value=address)), \
+             patch("routers.orders.get_products_by_ids", new=AsyncMock(return_value={"p1": product})), \
+             patch("routers.orders.create_order", new=AsyncMock(return_value=created)):
+            response = client.post("/api/orders/", json={"addressId": "addr-1", "items": [{"productId": "p1", "quantity": 2}]},
+                                   headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert [message["orderId"] for message in queued_orders()] == ["o1"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,309 @@
+"""
+⚙️ Script de Validación Funcional - Módulo de Métricas
+========================================================
+
+Pruebas del endpoint /metrics (formato Prometheus), del middleware que mide
+latencia por plantilla de ruta, de las operaciones bcrypt en el pool de hilos,
+de las estadísticas de consultas por huella (GET /api/admin/queries), del
+perfilado bajo demanda (GET /api/admin/profiles) y del monitor de retraso y
+bloqueos del event loop.
+
+Componente bajo prueba: api/services/metrics.py, api/services/auth_service.py,
+api/services/query_stats.py, api/services/profiling.py,
+api/services/loop_monitor.py
+"""
+
+import asyncio
+import json
+import time
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from main import app
+from services import loop_monitor, profiling, query_stats
+from services.metrics import REGISTRY, UNMATCHED_ROUTE
+from services.auth_service import create_access_token, get_password_hash_async, verify_password_async
+from services.query_stats import fingerprint, param_shape, record_query, get_query_stats
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def client():
+    """Cliente de pruebas de la API"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin_headers():
+    """Cabeceras con token de administrador"""
+    token = create_access_token({"userId": "admin-1", "role": "ADMIN"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def customer_headers():
+    """Cabeceras con token de cliente"""
+    token = create_access_token({"userId": "user-1", "role": "CUSTOMER"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def empty_query_stats():
+    """Estadísticas de consultas vacías"""
+    query_stats.reset_query_stats()
+    yield
+    query_stats.reset_query_stats()
+
+
+@pytest.fixture
+def empty_profiles():
+    """Buffer de perfiles vacío"""
+    profiling.clear_profiles()
+    yield
+    profiling.clear_profiles()
+
+
+def sample(name, **labels):
+    """Valor actual de una serie del registro (0 si no existe)"""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+# ============================================================================
+# TESTS DE INTEGRACIÓN - Endpoint /metrics
+# ============================================================================
+
+class TestMetricsEndpoint:
+    """Tests para GET /metrics y el middleware de métricas"""
+
+    def test_metrics_exposition_format(self, client):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "http_request_duration_seconds" in response.text
+        assert "db_connection_acquire_seconds" in response.text
+
+    def test_requests_labeled_by_route_template(self, client):
+        before = sample("http_requests_total", method="GET", route="/api/orders/{order_id}", status="403")
+        client.get("/api/orders/pedido-123")
+        client.get("/api/orders/pedido-456")
+        after = sample("http_requests_total", method="GET", route="/api/orders/{order_id}", status="403")
+        assert after - before == 2
+        assert "pedido-123" not in client.get("/metrics").text
+
+    def test_unknown_paths_share_one_label(self, client):
+        before = sample("http_requests_total", method="GET", route=UNMATCHED_ROUTE, status="404")
+        client.get("/no-existe/1")
+        client.get("/no-existe/2")
+        after = sample("http_requests_total", method="GET", route=UNMATCHED_ROUTE, status="404")
+        assert after - before == 2
+
+    def test_latency_histogram_observed(self, client):
+        before = sample("http_request_duration_seconds_count", method="GET", route="/api/health")
+        client.get("/api/health")
+        assert sample("http_request_duration_seconds_count", method="GET", route="/api/health") == before + 1
+
+    def test_metrics_endpoint_not_self_counted(self, client):
+        client.get("/metrics")
+        assert sample("http_requests_total", method="GET", route="/metrics", status="200") == 0
+
+
+# ============================================================================
+# TESTS UNITARIOS - bcrypt fuera del event loop
+# ============================================================================
+
+class TestBcryptExecutor:
+    """Tests para get_password_hash_async y verify_password_async"""
+
+    def test_hash_and_verify(self):
+        async def run():
+            hashed = await get_password_hash_async("secreta123")
+            return (await verify_password_async("secreta123", hashed),
+                    await verify_password_async("otra", hashed))
+
+        before = sample("bcrypt_duration_seconds_count", operation="verify")
+        assert asyncio.run(run()) == (True, False)
+        assert sample("bcrypt_duration_seconds_count", operation="verify") == before + 2
+        assert sample("bcrypt_queue_depth") == 0
+
+
+
+# ============================================================================
+# TESTS UNITARIOS - Estadísticas de consultas
+# ============================================================================
+
+class TestQueryStats:
+    """Tests para fingerprint, param_shape y record_query"""
+
+    def test_fingerprint_strips_literals(self):
+        a = fingerprint("SELECT * FROM orders\n  WHERE status = 'PENDING' AND total > 100 LIMIT $1")
+        b = fingerprint("SELECT * FROM orders WHERE status = 'DELIVERED' AND total > 2500.5 LIMIT $1")
+        assert a == b == "SELECT * FROM orders WHERE status = ? AND total > ? LIMIT $1"
+
+    def test_fingerprint_collapses_in_lists(self):
+        assert fingerprint("SELECT name FROM t WHERE id IN (1, 2, 3)") == fingerprint("SELECT name FROM t WHERE id in (4)")
+        assert fingerprint("SELECT name FROM t WHERE id IN (4)").endswith("IN (?...)")
+
+    def test_param_shapes_hide_values(self):
+        shapes = [param_shape(v) for v in ("secreta", None, 3, ["a", "b"])]
+        assert shapes == ["str(7)", "null", "int", "list[str](2)"]
+
+    def test_aggregates_per_fingerprint(self, empty_query_stats):
+        record_query("SELECT * FROM users WHERE email = 'a@b.com'", "db.get_user", 0.010, rows=1)
+        record_query("SELECT * FROM users WHERE email = 'c@d.com'", "db.get_user", 0.030, rows=0, wait=0.002)
+        stats = get_query_stats()
+        assert stats["fingerprints"] == 1
+        query = stats["queries"][0]
+        assert query["calls"] == 2 and query["rows"] == 1
+        assert query["meanMs"] == 20.0 and query["maxMs"] == 30.0 and query["waitMs"] == 2.0
+
+    def test_keeps_top_n_slowest(self, empty_query_stats):
+        with patch.object(query_stats, "QUERY_STATS_TOP_N", 3):
+            for ms in (5, 1, 9, 3, 7):
+                record_query("SELECT 1", "db.ping", ms / 1000)
+        slowest = get_query_stats()["queries"][0]["slowest"]
+        assert [s["durationMs"] for s in slowest] == [9.0, 7.0, 5.0]
+
+    def test_slow_query_logged_with_shapes(self, empty_query_stats, caplog):
+        with patch.object(query_stats, "SLOW_QUERY_MS", 50), caplog.at_level("WARNING", logger="services.query_stats"):
+            record_query("SELECT * FROM orders WHERE id = $1", "db.get_order", 0.010, params=("x",))
+            record_query("SELECT * FROM orders WHERE id = $1", "db.get_order", 0.120, params=("pedido-123",))
+        assert len(caplog.records) == 1
+        record = caplog.records[0]
+        assert record.getMessage() == "Consulta lenta en db.get_order"
+        assert record.params == ["str(10)"] and record.durationMs == 120.0
+
+    def test_sorting(self, empty_query_stats):
+        record_query("SELECT a", "db.a", 0.050)
+        for _ in range(3):
+            record_query("SELECT b", "db.b", 0.001)
+        assert get_query_stats(sort="totalMs")["queries"][0]["name"] == "db.a"
+        assert get_query_stats(sort="calls")["queries"][0]["name"] == "db.b"
+
+
+class TestQueryStatsEndpoint:
+    """Tests para GET/DELETE /api/admin/queries"""
+
+    def test_requires_admin(self, client, customer_headers):
+        assert client.get("/api/admin/queries", headers=customer_headers).status_code == 403
+
+    def test_lists_and_resets(self, client, admin_headers, empty_query_stats):
+        record_query("SELECT 1", "db.ping", 0.001)
+        response = client.get("/api/admin/queries?sort=calls", headers=admin_headers)
+        assert response.status_code == 200
+        assert response.json()["queries"][0]["fingerprint"] == "SELECT ?"
+        assert client.delete("/api/admin/queries", headers=admin_headers).json() == {"success": True}
+        assert client.get("/api/admin/queries", headers=admin_headers).json()["queries"] == []
+
+    def test_invalid_sort(self, client, admin_headers):
+        assert client.get("/api/admin/queries?sort=nope", headers=admin_headers).status_code == 400
+
+
+
+# ============================================================================
+# TESTS DE INTEGRACIÓN - Perfilado bajo demanda
+# ============================================================================
+
+class TestProfiling:
+    """Tests para ProfilingMiddleware y /api/admin/profiles"""
+
+    def test_admin_header_profiles_request(self, client, admin_headers, empty_profiles):
+        response = client.get("/api/health", headers={**admin_headers, "X-Profile": "1"})
+        profile_id = response.headers["x-profile-id"]
+        profiles = client.get("/api/admin/profiles", headers=admin_headers).json()["profiles"]
+        assert [p["id"] for p in profiles] == [profile_id]
+        assert profiles[0]["route"] == "/api/health" and profiles[0]["trigger"] == "header"
+
+    def test_header_ignored_without_admin_token(self, client, customer_headers, empty_profiles):
+        response = client.get("/api/health", headers={**customer_headers, "X-Profile": "1"})
+        assert "x-profile-id" not in response.headers
+        assert profiling.list_profiles() == []
+
+    def test_unprofiled_by_default(self, client, empty_profiles):
+        assert "x-profile-id" not in client.get("/api/health").headers
+
+    def test_sampled_requests(self, empty_profiles):
+        middleware = profiling.ProfilingMiddleware(app, sample_rate=1.0)
+        TestClient(middleware).get("/api/health")
+        assert profiling.list_profiles()[0]["trigger"] == "sample"
+
+    def test_download_speedscope(self, client, admin_headers, empty_profiles):
+        profile_id = client.get("/api/health", headers={**admin_headers, "X-Profile": "1"}).headers["x-profile-id"]
+        response = client.get(f"/api/admin/profiles/{profile_id}", headers=admin_headers)
+        assert response.status_code == 200
+        assert "attachment" in response.headers["content-disposition"]
+        assert json.loads(response.text)["$schema"].startswith("https://www.speedscope.app")
+
+    def test_unknown_profile(self, client, admin_headers):
+        assert client.get("/api/admin/profiles/nope", headers=admin_headers).status_code == 404
+
+    def test_ring_buffer_is_bounded(self, client, admin_headers, empty_profiles):
+        with patch.object(profiling, "PROFILE_BUFFER_SIZE", 2):
+            ids = [client.get("/api/health", headers={**admin_headers, "X-Profile": "1"}).headers["x-profile-id"]
+                   for _ in range(3)]
+        assert [p["id"] for p in profiling.list_profiles()] == ids[:0:-1]
+
+    def test_profiles_require_admin(self, client, customer_headers):
+        assert client.get("/api/admin/profiles", headers=customer_headers).status_code == 403
+
+
+
+# ============================================================================
+# TESTS UNITARIOS - Monitor del event loop
+# ============================================================================
+
+def blocking_handler_work():
+    """Trabajo síncrono que bloquea el loop (como bcrypt en el hilo del loop)"""
+    time.sleep(0.3)
+
+
+async def run_with_monitor(debug: bool, work=None):
+    loop_monitor.start_loop_monitor(interval=0.05, debug=debug, threshold_ms=100)
+    try:
+        await asyncio.sleep(0.1)
+        if work:
+            work()
+        await asyncio.sleep(0.15)
+    finally:
+        await loop_monitor.stop_loop_monitor()
+
+
+class TestLoopMonitor:
+    """Tests para start_loop_monitor y el detector de bloqueos"""
+
+    @pytest.fixture(autouse=True)
+    def empty_stalls(self):
+        loop_monitor._stalls.clear()
+        yield
+        loop_monitor._stalls.clear()
+
+    def test_lag_is_measured(self):
+        before = sample("event_loop_lag_seconds_count")
+        asyncio.run(run_with_monitor(debug=False))
+        assert sample("event_loop_lag_seconds_count") - before >= 3
+
+    def test_blocking_call_stack_captured(self):
+        before = sample("event_loop_blocked_total")
+        asyncio.run(run_with_monitor(debug=True, work=blocking_handler_work))
+        stalls = loop_monitor.get_loop_stalls()
+        assert len(stalls) == 1
+        assert "blocking_handler_work" in stalls[0]["stack"][-1]
+        assert stalls[0]["blockedMs"] >= 250
+        assert sample("event_loop_blocked_total") == before + 1
+
+    def test_no_stalls_without_debug(self):
+        asyncio.run(run_with_monitor(debug=False, work=blocking_handler_work))
+        assert loop_monitor.get_loop_stalls() == []
+
+    def test_stalls_endpoint(self, client, admin_headers, customer_headers):
+        asyncio.run(run_with_monitor(debug=True, work=blocking_handler_work))
+        assert client.get("/api/admin/loop/stalls", headers=customer_headers).status_code == 403
+        stalls = client.get("/api/admin/loop/stalls", headers=admin_headers).json()["stalls"]
+        assert len(stalls) == 1 and "beat" not in stalls[0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
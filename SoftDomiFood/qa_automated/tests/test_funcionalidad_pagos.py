@@ -0,0 +1,612 @@
+"""
+⚙️ Script de Validación Funcional - Módulo de Pagos
+=====================================================
+
+Pruebas del flujo asíncrono de pagos con tarjeta: encolado (202), pool de
+workers, consulta de estado, idempotencia por pedido, buffer del libro de pagos
+y cliente HTTP de la pasarela (contra la pasarela simulada en proceso). La
+autorización del datáfono se simula sin esperas y el libro no toca PostgreSQL.
+
+Componente bajo prueba: api/routers/payments.py, api/services/payment_processor.py,
+api/services/payment_ledger.py, api/services/payment_gateway.py,
+api/payment_gateway_stub.py
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from api.main import app
+from api import payment_gateway_stub
+from services.auth_service import create_access_token
+from services import database_service, payment_processor, payment_gateway, payment_ledger
+from services.payment_gateway import (
+    HttpPaymentGateway,
+    PaymentGateway,
+    CircuitBreaker,
+    CircuitOpenError,
+    PaymentGatewayError
+)
+
+POSTGRES_TEST_URL = os.getenv("POSTGRES_TEST_URL")
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def client():
+    """Cliente de prueba síncrono"""
+    return TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def instant_authorization():
+    """Autorización sin latencia y siempre aprobada"""
+    with patch.object(payment_gateway, "CARD_SIMULATED_LATENCY_SECONDS", 0), \
+         patch.object(payment_gateway, "CARD_APPROVAL_RATE", 1.0):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def empty_ledger():
+    """Libro de pagos vacío y sin consultas a PostgreSQL"""
+    payment_ledger._buffer.clear()
+    with patch.object(payment_processor, "claim_payment", new=AsyncMock(return_value=None)), \
+         patch("routers.payments.get_ledger_payment", new=AsyncMock(return_value=None)):
+        yield
+    payment_ledger._buffer.clear()
+
+
+@pytest.fixture
+def order_id():
+    """Id de pedido nuevo"""
+    return str(uuid.uuid4())
+
+
+@pytest.fixture
+def stub_config():
+    """Pasarela simulada sin latencia; se restaura al terminar"""
+    config = payment_gateway_stub.StubConfig
+    saved = dict(vars(config))
+    config.latency_median_ms = 0.001
+    config.latency_sigma = 0
+    config.decline_rate = 0
+    config.error_rate = 0
+    config.timeout_rate = 0
+    payment_gateway_stub._responses.clear()
+    yield config
+    for key, value in saved.items():
+        if not key.startswith("__"):
+            setattr(config, key, value)
+
+
+@pytest.fixture
+def postgres():
+    """Esquema recién creado en POSTGRES_TEST_URL (se borra su esquema public)"""
+    if not POSTGRES_TEST_URL:
+        pytest.skip("POSTGRES_TEST_URL no está configurada")
+    import asyncpg
+    import init_db
+
+    async def setup():
+        conn = await asyncpg.connect(POSTGRES_TEST_URL)
+        try:
+            await conn.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+            await conn.execute(init_db.INIT_SQL)
+            await conn.execute(init_db.SCHEMA_UPDATES_SQL)
+        finally:
+            await conn.close()
+
+    with patch.object(database_service, "DATABASE_URL", POSTGRES_TEST_URL):
+        asyncio.run(setup())
+        yield POSTGRES_TEST_URL
+
+
+def make_stub_gateway(**kwargs):
+    """Cliente HTTP de la pasarela conectado a la pasarela simulada en proceso"""
+    transport = httpx.ASGITransport(app=payment_gateway_stub.app)
+    return HttpPaymentGateway("http://stub", transport=transport, retry_base=0, **kwargs)
+
+
+def sample_payment():
+    return {"paymentId": "pay-1", "orderId": "order-1", "amount": 25000}
+
+
+# ============================================================================
+# TESTS UNITARIOS - Pool de workers
+# ============================================================================
+
+class TestPaymentProcessor:
+    """Tests para el pool de autorización de pagos"""
+
+    def test_card_payment_is_approved_by_worker(self, order_id):
+        async def scenario():
+            payment, created = await payment_processor.submit_card_payment(order_id, 25000)
+            assert created
+            assert payment["status"] == payment_processor.PENDING
+            result = await payment_processor.wait_for_payment(payment["paymentId"], timeout=2)
+            await payment_processor.stop_payment_workers()
+            return result
+
+        result = asyncio.run(scenario())
+        assert result["status"] == payment_processor.APPROVED
+        assert result["transactionId"].startswith("CARD-")
+
+    def test_declined_payment(self, order_id):
+        async def scenario():
+            payment, _ = await payment_processor.submit_card_payment(order_id, 25000)
+            result = await payment_processor.wait_for_payment(payment["paymentId"], timeout=2)
+            await payment_processor.stop_payment_workers()
+            return result
+
+        with patch.object(payment_gateway, "CARD_APPROVAL_RATE", 0.0):
+            result = asyncio.run(scenario())
+        assert result["status"] == payment_processor.DECLINED
+
+    def test_authorization_error_marks_failed(self, order_id):
+        async def scenario():
+            payment, _ = await payment_processor.submit_card_payment(order_id, 25000)
+            result = await payment_processor.wait_for_payment(payment["paymentId"], timeout=2)
+            await payment_processor.stop_payment_workers()
+            return result
+
+        with patch.object(payment_processor, "authorize_card_payment", side_effect=RuntimeError("boom")):
+            result = asyncio.run(scenario())
+        assert result["status"] == payment_processor.FAILED
+
+    def test_full_queue_raises(self):
+        async def scenario():
+            with patch.object(payment_processor, "PAYMENT_QUEUE_SIZE", 1), \
+                 patch.object(payment_processor, "PAYMENT_WORKERS", 0):
+                payment_processor.start_payment_workers()
+                await payment_processor.submit_card_payment(str(uuid.uuid4()), 1000)
+                with pytest.raises(payment_processor.PaymentQueueFull):
+                    await payment_processor.submit_card_payment(str(uuid.uuid4()), 1000)
+
+        asyncio.run(scenario())
+
+    def test_same_order_is_not_charged_twice(self, order_id):
+        async def scenario():
+            first, created_first = await payment_processor.submit_card_payment(order_id, 25000)
+            second, created_second = await payment_processor.submit_card_payment(order_id, 25000)
+            await payment_processor.stop_payment_workers()
+            return first, created_first, second, created_second
+
+        first, created_first, second, created_second = asyncio.run(scenario())
+        assert created_first and not created_second
+        assert first["paymentId"] == second["paymentId"]
+
+    def test_declined_payment_allows_new_attempt(self, order_id):
+        async def scenario():
+            first, _ = await payment_processor.submit_card_payment(order_id, 25000)
+            await payment_processor.wait_for_payment(first["paymentId"], timeout=2)
+            with patch.object(payment_gateway, "CARD_APPROVAL_RATE", 1.0):
+                second, created = await payment_processor.submit_card_payment(order_id, 25000)
+            await payment_processor.stop_payment_workers()
+            return first, second, created
+
+        with patch.object(payment_gateway, "CARD_APPROVAL_RATE", 0.0):
+            first, second, created = asyncio.run(scenario())
+        assert created
+        assert first["paymentId"] != second["paymentId"]
+
+    def test_existing_payment_in_ledger_is_reused(self, order_id):
+        # Otro worker ya registró un pago vigente: claim_payment lo retorna
+        stored = {"paymentId": str(uuid.uuid4()), "orderId": order_id, "status": "APPROVED"}
+        with patch.object(payment_processor, "claim_payment", new=AsyncMock(return_value=stored)):
+            payment, created = asyncio.run(payment_processor.submit_card_payment(order_id, 25000))
+        assert not created
+        assert payment == stored
+
+
+class TestPaymentLedgerBuffer:
+    """Tests para el buffer de escritura diferida del libro de pagos"""
+
+    def test_updates_of_same_payment_are_coalesced(self, order_id):
+        async def scenario():
+            payment, _ = await payment_processor.submit_card_payment(order_id, 25000)
+            await payment_processor.wait_for_payment(payment["paymentId"], timeout=2)
+            await payment_processor.stop_payment_workers()
+            return payment
+
+        payment = asyncio.run(scenario())
+        assert payment_ledger.pending_ledger_writes() == 1
+        assert payment_ledger._buffer[payment["paymentId"]]["status"] == payment_processor.APPROVED
+
+    def test_failed_flush_keeps_records(self, order_id):
+        payment_ledger.record_payment({
+            "paymentId": str(uuid.uuid4()), "orderId": order_id, "paymentMethod": "CASH",
+            "amount": 1000, "status": "APPROVED", "createdAt": "2025-11-20T12:30:00",
+            "updatedAt": "2025-11-20T12:30:00"
+        })
+        with patch.object(payment_ledger, "get_connection", new=AsyncMock(side_effect=OSError("db down"))):
+            with pytest.raises(OSError):
+                asyncio.run(payment_ledger.flush_payment_ledger())
+        assert payment_ledger.pending_ledger_writes() == 1
+
+    def test_record_to_copy_row(self, order_id):
+        payment_id = str(uuid.uuid4())
+        record = payment_ledger._to_record({
+            "paymentId": payment_id, "orderId": order_id, "paymentMethod": "CARD",
+            "amount": 25000.5, "status": "PENDING", "createdAt": "2025-11-20T12:30:00",
+            "updatedAt": "2025-11-20T12:30:00"
+        })
+        assert len(record) == len(payment_ledger.LEDGER_COLUMNS)
+        assert str(record[0]) == payment_id
+        assert str(record[3]) == "25000.5"
+
+    def test_flush_demotes_superseded_payments_before_upsert(self, order_id):
+        payment_ledger.record_payment({
+            "paymentId": str(uuid.uuid4()), "orderId": order_id, "paymentMethod": "CARD",
+            "amount": 1000, "status": "APPROVED", "createdAt": "2025-11-20T12:30:00",
+            "updatedAt": "2025-11-20T12:31:00"
+        })
+        conn = AsyncMock()
+        conn.transaction = MagicMock(return_value=AsyncMock())
+        conn.fetch = AsyncMock(return_value=[])
+        with patch.object(payment_ledger, "get_connection", new=AsyncMock(return_value=conn)):
+            assert asyncio.run(payment_ledger.flush_payment_ledger()) == 1
+        assert conn.fetch.await_args.args[0] == payment_ledger.DEMOTE_SUPERSEDED_SQL
+        assert conn.execute.await_args.args[0] == payment_ledger.UPSERT_FROM_STAGING_SQL
+
+
+class TestClaimPayment:
+    """Tests para el registro inmediato del pago vigente"""
+
+    @staticmethod
+    def new_payment(order_id):
+        return {
+            "paymentId": str(uuid.uuid4()), "orderId": order_id, "paymentMethod": "CARD",
+            "amount": 25000, "status": "PENDING", "createdAt": "2025-11-20T12:30:00",
+            "updatedAt": "2025-11-20T12:30:00"
+        }
+
+    @staticmethod
+    def ledger_conn(claimed, active=None):
+        conn = AsyncMock()
+        conn.fetchval = AsyncMock(side_effect=claimed)
+        conn.fetchrow = AsyncMock(side_effect=active or [])
+        return conn
+
+    def test_inserted_payment_returns_none(self, order_id):
+        conn = self.ledger_conn([uuid.uuid4()])
+        with patch.object(payment_ledger, "get_connection", new=AsyncMock(return_value=conn)):
+            assert asyncio.run(payment_ledger.claim_payment(self.new_payment(order_id))) is None
+        assert "ON CONFLICT" in conn.fetchval.await_args.args[0]
+
+    def test_conflict_returns_active_payment(self, order_id):
+        stored_id = uuid.uuid4()
+        stored = {"paymentId": stored_id, "orderId": uuid.UUID(order_id), "status": "PENDING"}
+        conn = self.ledger_conn([None], [stored])
+        with patch.object(payment_ledger, "get_connection", new=AsyncMock(return_value=conn)):
+            existing = asyncio.run(payment_ledger.claim_payment(self.new_payment(order_id)))
+        assert existing["paymentId"] == str(stored_id)
+
+    def test_payment_finished_locally_is_flushed_before_retry(self, order_id):
+        stored_id = str(uuid.uuid4())
+        payment_ledger.record_payment({**self.new_payment(order_id), "paymentId": stored_id, "status": "DECLINED"})
+        conn = self.ledger_conn([None, uuid.uuid4()], [{"paymentId": uuid.UUID(stored_id), "status": "PENDING"}])
+        flush = AsyncMock(return_value=1)
+        with patch.object(payment_ledger, "get_connection", new=AsyncMock(return_value=conn)), \
+             patch.object(payment_ledger, "flush_payment_ledger", new=flush):
+            assert asyncio.run(payment_ledger.claim_payment(self.new_payment(order_id))) is None
+        flush.assert_awaited_once()
+
+    def test_unique_index_on_active_payments(self):
+        from init_db import SCHEMA_UPDATES_SQL
+        index = SCHEMA_UPDATES_SQL.split("CREATE UNIQUE INDEX IF NOT EXISTS idx_payments_order_method_active")[1]
+        assert " ".join(index.split(";")[0].split()) == \
+            """ON "payments" ("orderId", "paymentMethod") WHERE status IN ('PENDING', 'APPROVED')"""
+
+
+class TestCircuitBreaker:
+    """Tests para el circuit breaker de la pasarela"""
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_half_open_allows_single_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        assert breaker.state == "half-open"
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_released_probe_allows_another(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.release()
+        breaker.before_call()
+
+    def test_gateway_interface_is_abstract(self):
+        with pytest.raises(TypeError):
+            PaymentGateway()
+
+
+class TestHttpPaymentGateway:
+    """Tests del cliente HTTP contra la pasarela simulada"""
+
+    def test_approved(self, stub_config):
+        async def scenario():
+            gateway = make_stub_gateway()
+            try:
+                return await gateway.authorize(sample_payment())
+            finally:
+                await gateway.close()
+
+        result = asyncio.run(scenario())
+        assert result["status"] == "APPROVED"
+        assert result["transactionId"].startswith("STUB-")
+
+    def test_declined_with_reason(self, stub_config):
+        stub_config.decline_rate = 1.0
+
+        async def scenario():
+            gateway = make_stub_gateway()
+            try:
+                return await gateway.authorize(sample_payment())
+            finally:
+                await gateway.close()
+
+        result = asyncio.run(scenario())
+        assert result["status"] == "DECLINED"
+        assert result["declineReason"] in payment_gateway_stub.DECLINE_REASONS
+
+    def test_retries_then_opens_circuit(self, stub_config):
+        stub_config.error_rate = 1.0
+
+        async def scenario():
+            gateway = make_stub_gateway(max_retries=2, breaker=CircuitBreaker(3, 60))
+            try:
+                with pytest.raises(PaymentGatewayError):
+                    await gateway.authorize(sample_payment())
+                assert gateway.breaker.state == "open"
+                with pytest.raises(CircuitOpenError):
+                    await gateway.authorize(sample_payment())
+            finally:
+                await gateway.close()
+
+        asyncio.run(scenario())
+
+    def test_idempotent_retry_returns_same_result(self, stub_config):
+        async def scenario():
+            gateway = make_stub_gateway()
+            try:
+                first = await gateway.authorize(sample_payment())
+                second = await gateway.authorize(sample_payment())
+                return first, second
+            finally:
+                await gateway.close()
+
+        first, second = asyncio.run(scenario())
+        assert first["transactionId"] == second["transactionId"]
+
+    def test_cancelled_probe_does_not_wedge_breaker(self, stub_config):
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        async def scenario():
+            gateway = make_stub_gateway(breaker=CircuitBreaker(1, 0))
+            try:
+                gateway.breaker.record_failure()
+                with patch.object(gateway._client, "post", new=hang):
+                    with pytest.raises(asyncio.TimeoutError):
+                        await asyncio.wait_for(gateway.authorize(sample_payment()), 0.01)
+                return await gateway.authorize(sample_payment())
+            finally:
+                await gateway.close()
+
+        assert asyncio.run(scenario())["status"] == "APPROVED"
+
+    def test_unexpected_error_counts_as_failure(self, stub_config):
+        async def scenario():
+            gateway = make_stub_gateway(breaker=CircuitBreaker(1, 0))
+            try:
+                gateway.breaker.record_failure()
+                with patch.object(gateway._client, "post", new=AsyncMock(side_effect=RuntimeError("boom"))):
+                    with pytest.raises(RuntimeError):
+                        await gateway.authorize(sample_payment())
+                return await gateway.authorize(sample_payment())
+            finally:
+                await gateway.close()
+
+        assert asyncio.run(scenario())["status"] == "APPROVED"
+
+
+# ============================================================================
+# TESTS DE INTEGRACIÓN - Endpoints de pagos
+# ============================================================================
+
+class TestPaymentEndpoints:
+    """Tests para POST /api/payments/process y GET /api/payments/{id}"""
+
+    @pytest.fixture
+    def customer_headers(self):
+        token = create_access_token({"userId": "user-1", "role": "CUSTOMER"})
+        return {"Authorization": f"Bearer {token}"}
+
+    @pytest.fixture
+    def order(self, order_id):
+        """Pedido del cliente user-1 guardado en la base de datos"""
+        order = {"id": order_id, "userId": "user-1", "total": 15000.0, "status": "PENDING"}
+        with patch("routers.payments.get_order_for_payment", new=AsyncMock(return_value=order)):
+            yield order
+
+    def test_requires_authentication(self, client, order_id):
+        response = client.post("/api/payments/process", json={"orderId": order_id, "paymentMethod": "CASH"})
+        assert response.status_code in (401, 403)
+        assert client.get(f"/api/payments/{uuid.uuid4()}").status_code in (401, 403)
+
+    def test_cash_is_immediate(self, client, customer_headers, order):
+        response = client.post(
+            "/api/payments/process",
+            json={"orderId": order["id"], "paymentMethod": "CASH"},
+            headers=customer_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["transactionId"].startswith("CASH-")
+
+    def test_amount_is_the_stored_order_total(self, client, customer_headers, order):
+        # Un monto enviado por el cliente se ignora
+        response = client.post(
+            "/api/payments/process",
+            json={"amount": 1, "orderId": order["id"], "paymentMethod": "CARD"},
+            headers=customer_headers
+        )
+        assert response.status_code == 202
+        assert response.json()["amount"] == 15000.0
+
+    def test_cash_is_idempotent(self, client, customer_headers, order):
+        payload = {"orderId": order["id"], "paymentMethod": "CASH"}
+        first = client.post("/api/payments/process", json=payload, headers=customer_headers).json()
+        second = client.post("/api/payments/process", json=payload, headers=customer_headers).json()
+        assert first["paymentId"] == second["paymentId"]
+
+    def test_invalid_order_id(self, client, customer_headers):
+        response = client.post(
+            "/api/payments/process",
+            json={"orderId": "order-1", "paymentMethod": "CARD"},
+            headers=customer_headers
+        )
+        assert response.status_code == 400
+
+    def test_unknown_order(self, client, customer_headers, order_id):
+        with patch("routers.payments.get_order_for_payment", new=AsyncMock(return_value=None)):
+            response = client.post(
+                "/api/payments/process",
+                json={"orderId": order_id, "paymentMethod": "CARD"},
+                headers=customer_headers
+            )
+        assert response.status_code == 404
+
+    def test_order_of_other_user_is_rejected(self, client, customer_headers, order):
+        order["userId"] = "user-2"
+        response = client.post(
+            "/api/payments/process",
+            json={"orderId": order["id"], "paymentMethod": "CARD"},
+            headers=customer_headers
+        )
+        assert response.status_code == 403
+
+    def test_cancelled_order_is_rejected(self, client, customer_headers, order):
+        order["status"] = "CANCELLED"
+        response = client.post(
+            "/api/payments/process",
+            json={"orderId": order["id"], "paymentMethod": "CASH"},
+            headers=customer_headers
+        )
+        assert response.status_code == 409
+
+    def test_card_returns_202_with_payment_id(self, client, customer_headers, order):
+        response = client.post(
+            "/api/payments/process",
+            json={"orderId": order["id"], "paymentMethod": "CARD"},
+            headers=customer_headers
+        )
+        assert response.status_code == 202
+        body = response.json()
+        assert body["status"] in (payment_processor.PENDING, payment_processor.APPROVED)
+        assert response.headers["Location"] == f"/api/payments/{body['paymentId']}"
+
+        status_response = client.get(f"/api/payments/{body['paymentId']}?wait=2", headers=customer_headers)
+        assert status_response.status_code == 200
+        assert status_response.json()["orderId"] == order["id"]
+
+    def test_invalid_amount(self, client, customer_headers, order):
+        order["total"] = 0
+        response = client.post(
+            "/api/payments/process",
+            json={"orderId": order["id"], "paymentMethod": "CARD"},
+            headers=customer_headers
+        )
+        assert response.status_code == 400
+
+    def test_unknown_payment_returns_404(self, client, customer_headers):
+        response = client.get("/api/payments/does-not-exist", headers=customer_headers)
+        assert response.status_code == 404
+
+    def test_status_falls_back_to_ledger(self, client, customer_headers, order):
+        payment_id = str(uuid.uuid4())
+        stored = {"paymentId": payment_id, "orderId": order["id"], "status": "APPROVED"}
+        with patch("routers.payments.get_ledger_payment", new=AsyncMock(return_value=stored)):
+            response = client.get(f"/api/payments/{payment_id}", headers=customer_headers)
+        assert response.status_code == 200
+        assert response.json()["status"] == "APPROVED"
+
+    def test_status_of_other_user_is_rejected(self, client, customer_headers, order):
+        payment_id = str(uuid.uuid4())
+        stored = {"paymentId": payment_id, "orderId": order["id"], "status": "PENDING"}
+        order["userId"] = "user-2"
+        with patch("routers.payments.get_ledger_payment", new=AsyncMock(return_value=stored)):
+            response = client.get(f"/api/payments/{payment_id}?wait=5", headers=customer_headers)
+        assert response.status_code == 403
+
+
+
+# ============================================================================
+# TESTS DE INTEGRACIÓN - Libro de pagos en PostgreSQL (POSTGRES_TEST_URL)
+# ============================================================================
+
+class TestPaymentLedgerOnPostgres:
+    """Tests del libro de pagos contra PostgreSQL"""
+
+    @staticmethod
+    def payment(order_id, status="PENDING", at="2025-11-20T12:30:00"):
+        return {
+            "paymentId": str(uuid.uuid4()), "orderId": order_id, "paymentMethod": "CARD",
+            "amount": 25000, "status": status, "transactionId": None, "message": None,
+            "createdAt": at, "updatedAt": at
+        }
+
+    def test_late_approval_of_expired_payment_does_not_block_flush(self, postgres, order_id):
+        import asyncpg
+
+        async def scenario():
+            # A quedó PENDING hace mucho; otro worker lo expira y registra B
+            stale = self.payment(order_id)
+            assert await payment_ledger.claim_payment(stale) is None
+            current = self.payment(order_id, at=datetime.utcnow().isoformat())
+            assert await payment_ledger.claim_payment(current) is None
+            other = self.payment(str(uuid.uuid4()), at=datetime.utcnow().isoformat())
+            assert await payment_ledger.claim_payment(other) is None
+
+            # A se aprueba tarde en su worker; otro pago del mismo lote también
+            now = datetime.utcnow().isoformat()
+            payment_ledger.record_payment({**stale, "status": "APPROVED", "transactionId": "CARD-1", "updatedAt": now})
+            payment_ledger.record_payment({**other, "status": "APPROVED", "transactionId": "CARD-2", "updatedAt": now})
+            assert await payment_ledger.flush_payment_ledger() == 2
+
+            conn = await asyncpg.connect(postgres)
+            try:
+                rows = await conn.fetch("SELECT id::text, status::text, message FROM payments")
+            finally:
+                await conn.close()
+            return {row["id"]: row for row in rows}, stale, current, other
+
+        rows, stale, current, other = asyncio.run(scenario())
+        assert payment_ledger.pending_ledger_writes() == 0
+        assert rows[stale["paymentId"]]["status"] == "FAILED"
+        assert "Superseded" in rows[stale["paymentId"]]["message"]
+        assert rows[current["paymentId"]]["status"] == "PENDING"
+        assert rows[other["paymentId"]]["status"] == "APPROVED"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,543 @@
+"""
+⚙️ Script de Validación Funcional - Módulo de Pedidos
+=======================================================
+
+Pruebas del historial de pedidos que no requieren PostgreSQL: cursores de
+paginación, proyección resumida de documentos, control de acceso al detalle y
+zona de entrega al crear pedidos, particionado y archivado, y exportaciones en
+streaming y columnar (las funciones de BD se simulan).
+
+Componente bajo prueba: api/routers/orders.py, api/routers/admin.py,
+api/init_db.py, api/archive_orders.py,
+api/services/database_service.py, api/services/order_export.py,
+api/services/analytics_export.py
+"""
+
+import asyncio
+import io
+import json
+import re
+import uuid
+import warnings
+import pytest
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from fastapi.testclient import TestClient
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from api.main import app
+from api.services.auth_service import create_access_token
+import services.database_service as database_service
+from services.database_service import (
+    encode_order_cursor,
+    decode_order_cursor,
+    summarize_order_document,
+    ORDER_SUMMARY_PRODUCT_NAMES
+)
+from services.cache import catalog_cache
+from services.order_export import build_export_query
+import init_db
+from init_db import INIT_SQL, SCHEMA_UPDATES_SQL, partition_window
+from archive_orders import ARCHIVE_COLUMNS, build_archive_batch_sql
+import services.analytics_export as analytics_export
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def client():
+    """Cliente de prueba síncrono"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def customer_headers():
+    """Cabeceras con token de cliente"""
+    token = create_access_token({"userId": "user-1", "role": "CUSTOMER"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def sample_document():
+    """Documento de lectura de un pedido"""
+    return {
+        "id": "6f1c2a8e-0000-4000-8000-000000000001",
+        "userId": "user-1",
+        "addressId": "addr-1",
+        "status": "PENDING",
+        "total": 42000,
+        "paymentMethod": "CASH",
+        "notes": None,
+        "createdAt": "2025-11-20T12:30:00.123456",
+        "updatedAt": "2025-11-20T12:30:00.123456",
+        "customer_name": "Cliente",
+        "delivery_street": "Calle 123",
+        "itemCount": 6,
+        "items": [
+            {"productId": f"p{i}", "quantity": 1 + (i % 2), "price": 6000, "product_name": f"Producto {i}"}
+            for i in range(4)
+        ]
+    }
+
+
+# ============================================================================
+# TESTS UNITARIOS - Cursores y resumen
+# ============================================================================
+
+class TestOrderCursor:
+    """Tests para la codificación de cursores de paginación"""
+
+    def test_cursor_roundtrip(self):
+        cursor = encode_order_cursor("2025-11-20T12:30:00.123456", "6f1c2a8e-0000-4000-8000-000000000001")
+        created_at, order_id = decode_order_cursor(cursor)
+        assert created_at == datetime(2025, 11, 20, 12, 30, 0, 123456)
+        assert str(order_id) == "6f1c2a8e-0000-4000-8000-000000000001"
+
+    def test_cursor_is_url_safe(self):
+        cursor = encode_order_cursor("2025-11-20T12:30:00", "6f1c2a8e-0000-4000-8000-000000000001")
+        assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+
+    def test_invalid_cursor_raises_value_error(self):
+        with pytest.raises(ValueError):
+            decode_order_cursor("not-a-cursor")
+
+    def test_next_cursor_resumes_after_last_order(self, sample_document):
+        rows = [
+            {"id": uuid.UUID(int=3 - i), "createdAt": datetime(2025, 11, 20, 12, 30 - i),
+             "document": json.dumps({**sample_document, "id": str(uuid.UUID(int=3 - i))})}
+            for i in range(3)
+        ]
+        conn = MagicMock()
+        conn.fetch = AsyncMock(return_value=rows)
+        conn.close = AsyncMock()
+        with patch.object(database_service, "get_connection", new=AsyncMock(return_value=conn)):
+            page = asyncio.run(database_service.get_user_orders("user-1", limit=2))
+
+        assert len(page["orders"]) == 2
+        # Se pide un registro extra para detectar la página siguiente
+        assert conn.fetch.await_args.args[-1] == 3
+        assert decode_order_cursor(page["nextCursor"]) == (rows[1]["createdAt"], rows[1]["id"])
+
+        conn.fetch = AsyncMock(return_value=rows[2:])
+        with patch.object(database_service, "get_connection", new=AsyncMock(return_value=conn)):
+            page = asyncio.run(database_service.get_user_orders(
+                "user-1", limit=2, after=decode_order_cursor(page["nextCursor"])
+            ))
+        assert conn.fetch.await_args.args[2:4] == (rows[1]["createdAt"], rows[1]["id"])
+        assert page["nextCursor"] is None
+
+
+class TestOrderSummary:
+    """Tests para la proyección resumida del historial"""
+
+    def test_summary_excludes_items(self, sample_document):
+        summary = summarize_order_document(sample_document)
+        assert "items" not in summary
+        assert "customer_name" not in summary
+        assert summary["itemCount"] == 6
+        assert summary["total"] == 42000
+        assert summary["deliveryFee"] == 0
+
+    def test_summary_limits_product_names(self, sample_document):
+        summary = summarize_order_document(sample_document)
+        assert len(summary["productNames"]) == ORDER_SUMMARY_PRODUCT_NAMES
+        assert summary["productNames"][0] == "Producto 0"
+
+
+# ============================================================================
+# TESTS DE INTEGRACIÓN - Endpoints de pedidos
+# ============================================================================
+
+class TestOrderHistoryEndpoint:
+    """Tests para GET /api/orders y GET /api/orders/{id}/details"""
+
+    def test_invalid_cursor_returns_400(self, client, customer_headers):
+        response = client.get("/api/orders/?cursor=invalid", headers=customer_headers)
+        assert response.status_code == 400
+
+    def test_limit_out_of_range(self, client, customer_headers):
+        response = client.get("/api/orders/?limit=1000", headers=customer_headers)
+        assert response.status_code == 422
+
+    def test_returns_page(self, client, customer_headers):
+        page = {"orders": [], "nextCursor": None}
+        with patch("routers.orders.get_user_orders", new=AsyncMock(return_value=page)) as mock_orders:
+            response = client.get("/api/orders/?limit=5", headers=customer_headers)
+        assert response.status_code == 200
+        assert response.json() == page
+        mock_orders.assert_awaited_once_with("user-1", limit=5, after=None)
+
+    def test_cursor_is_decoded_once(self, client, customer_headers):
+        cursor = encode_order_cursor("2025-11-20T12:30:00", "6f1c2a8e-0000-4000-8000-000000000001")
+        page = {"orders": [], "nextCursor": None}
+        with patch("routers.orders.get_user_orders", new=AsyncMock(return_value=page)) as mock_orders:
+            response = client.get(f"/api/orders/?cursor={cursor}", headers=customer_headers)
+        assert response.status_code == 200
+        mock_orders.assert_awaited_once_with("user-1", limit=20, after=decode_order_cursor(cursor))
+
+    def test_details_not_found(self, client, customer_headers):
+        with patch("routers.orders.get_user_order_detail", new=AsyncMock(return_value=None)):
+            response = client.get("/api/orders/6f1c2a8e-0000-4000-8000-000000000009/details", headers=customer_headers)
+        assert response.status_code == 404
+
+    def test_details_of_other_user_allowed_for_admin(self, client, sample_document):
+        sample_document["userId"] = "user-2"
+        token = create_access_token({"userId": "admin-1", "role": "ADMIN"})
+        with patch("routers.orders.get_user_order_detail", new=AsyncMock(return_value=sample_document)):
+            response = client.get(f"/api/orders/{sample_document['id']}/details",
+                                  headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+
+    def test_details_of_other_user_denied(self, client, customer_headers, sample_document):
+        sample_document["userId"] = "user-2"
+        with patch("routers.orders.get_user_order_detail", new=AsyncMock(return_value=sample_document)):
+            response = client.get(f"/api/orders/{sample_document['id']}/details", headers=customer_headers)
+        assert response.status_code == 403
+
+    def test_details_of_own_order(self, client, customer_headers, sample_document):
+        with patch("routers.orders.get_user_order_detail", new=AsyncMock(return_value=sample_document)):
+            response = client.get(f"/api/orders/{sample_document['id']}/details", headers=customer_headers)
+        assert response.status_code == 200
+        assert len(response.json()["order"]["items"]) == 4
+
+
+class TestCreateOrderDeliveryZone:
+    """Tests para la zona de entrega en POST /api/orders"""
+
+    @pytest.fixture
+    def order_payload(self):
+        return {"addressId": "addr-1", "items": [{"productId": "p1", "quantity": 2}]}
+
+    @pytest.fixture
+    def product(self):
+        return {"id": "p1", "name": "Salchipapa", "price": 10000, "isAvailable": True}
+
+    def test_out_of_area_address_is_rejected(self, client, customer_headers, order_payload):
+        address = {"id": "addr-1", "userId": "user-1", "zipCode": "999999"}
+        with patch("routers.orders.get_address_by_id", new=AsyncMock(return_value=address)), \
+             patch("routers.orders.resolve_delivery_zone", return_value=None), \
+             patch("routers.orders.create_order", new=AsyncMock()) as mock_create:
+            response = client.post("/api/orders/", json=order_payload, headers=customer_headers)
+        assert response.status_code == 422
+        mock_create.assert_not_awaited()
+
+    def test_address_of_other_user_is_rejected(self, client, customer_headers, order_payload):
+        address = {"id": "addr-1", "userId": "user-2", "zipCode": "110111"}
+        with patch("routers.orders.get_address_by_id", new=AsyncMock(return_value=address)) as mock_address:
+            response = client.post("/api/orders/", json=order_payload, headers=customer_headers)
+        assert response.status_code == 403
+        # El dueño de la dirección se verifica contra la base de datos, no la caché
+        assert mock_address.await_args.kwargs == {"cached": False}
+
+    def test_unavailable_product_is_read_uncached(self, client, customer_headers, order_payload, product):
+        address = {"id": "addr-1", "userId": "user-1", "zipCode": "110111"}
+        zone = {"zoneId": "CENTRO", "name": "Centro", "deliveryFee": 4000.0}
+        # La caché de este worker aún lo tiene disponible; la base de datos ya no
+        catalog_cache.set(("product", "p1"), product)
+        with patch("routers.orders.get_address_by_id", new=AsyncMock(return_value=address)), \
+             patch("routers.orders.resolve_delivery_zone", return_value=zone), \
+             patch("routers.orders.get_products_by_ids",
+                   new=AsyncMock(return_value={"p1": {**product, "isAvailable": False}})) as mock_products, \
+             patch("routers.orders.create_order", new=AsyncMock()) as mock_create:
+            response = client.post("/api/orders/", json=order_payload, headers=customer_headers)
+        catalog_cache.invalidate()
+        assert response.status_code == 400
+        mock_products.assert_awaited_once_with(["p1"])
+        mock_create.assert_not_awaited()
+
+    def test_products_by_ids_single_query(self):
+        product_id = uuid.uuid4()
+        conn = MagicMock()
+        conn.fetch = AsyncMock(return_value=[{"id": product_id, "name": "Salchipapa", "price": 10000, "isAvailable": True}])
+        conn.close = AsyncMock()
+        with patch.object(database_service, "get_connection", new=AsyncMock(return_value=conn)):
+            products = asyncio.run(database_service.get_products_by_ids([str(product_id), "no-es-uuid", str(product_id)]))
+        assert list(products) == [str(product_id)]
+        assert "ANY($1::uuid[])" in conn.fetch.await_args.args[0]
+        assert conn.fetch.await_args.args[1] == [product_id]
+
+    def test_delivery_fee_is_added_to_total(self, client, customer_headers, order_payload, product):
+        address = {"id": "addr-1", "userId": "user-1", "zipCode": "110111"}
+        zone = {"zoneId": "CENTRO", "name": "Centro", "deliveryFee": 4000.0}
+        with patch("routers.orders.get_address_by_id", new=AsyncMock(return_value=address)), \
+             patch("routers.orders.resolve_delivery_zone", return_value=zone), \
+             patch("routers.orders.get_products_by_ids", new=AsyncMock(return_value={"p1": product})), \
+             patch("routers.orders.create_order", new=AsyncMock(return_value={"id": "o1"})) as mock_create, \
+             patch("routers.orders.publish_order", new=AsyncMock()):
+            response = client.post("/api/orders/", json=order_payload, headers=customer_headers)
+        assert response.status_code == 200
+        assert response.json()["delivery"]["zoneId"] == "CENTRO"
+        assert mock_create.await_args.kwargs["total"] == 24000
+        assert mock_create.await_args.kwargs["delivery_fee"] == 4000
+
+    def test_delivery_fee_is_stored_in_order_and_document(self):
+        conn = MagicMock()
+        conn.transaction = MagicMock(return_value=AsyncMock())
+        conn.fetchval = AsyncMock(side_effect=["o1", '{"id": "o1", "total": 24000, "deliveryFee": 4000}'])
+        conn.executemany = AsyncMock()
+        conn.close = AsyncMock()
+        with patch.object(database_service, "get_connection", new=AsyncMock(return_value=conn)):
+            document = asyncio.run(database_service.create_order(
+                "user-1", "addr-1", [{"productId": "p1", "quantity": 2, "price": 10000}], 24000, delivery_fee=4000
+            ))
+        insert_sql, *params = conn.fetchval.await_args_list[0].args
+        assert '"deliveryFee"' in insert_sql
+        assert params[:4] == ["user-1", "addr-1", "PENDING", 24000] and params[4] == 4000
+        assert document["deliveryFee"] == 4000
+        assert "'deliveryFee', o.\"deliveryFee\"" in SCHEMA_UPDATES_SQL
+
+
+# ============================================================================
+# TESTS UNITARIOS - Particionado y archivado
+# ============================================================================
+
+def table_columns(sql: str, table: str, updates: str = "") -> tuple:
+    """Columnas de un CREATE TABLE IF NOT EXISTS del script de esquema y las que agregan los ALTER TABLE de `updates`"""
+    body = re.search(rf'CREATE TABLE IF NOT EXISTS "{table}" \((.*?)\n\)', sql, re.S).group(1)
+    columns = []
+    for line in body.strip().splitlines():
+        name = line.strip().split()[0]
+        if name not in ("PRIMARY", "CONSTRAINT"):
+            columns.append(name.strip('"'))
+    columns += re.findall(rf'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS "(\w+)"', updates)
+    return tuple(columns)
+
+
+class TestOrderPartitions:
+    """Tests para las particiones mensuales de orders y order_items"""
+
+    def test_partition_window(self):
+        assert partition_window(date(2025, 11, 20), 3) == (date(2025, 10, 1), date(2026, 2, 1))
+
+    def test_partition_window_crosses_year(self):
+        assert partition_window(date(2026, 1, 31), 0) == (date(2025, 12, 1), date(2026, 1, 1))
+
+    def test_default_partitions_only_on_partitioned_orders(self):
+        # Sobre un orders sin particionar (base de datos anterior) no se crea nada
+        guard = INIT_SQL.index("relkind = 'p'")
+        block_end = INIT_SQL.index("END $$;", guard)
+        positions = [match.start() for match in re.finditer("PARTITION OF", INIT_SQL)]
+        assert len(positions) == 2
+        assert all(guard < position < block_end for position in positions)
+
+    def test_drop_only_matches_monthly_order_partitions(self):
+        pattern = re.search(r"c\.relname ~ '([^']+)'", SCHEMA_UPDATES_SQL).group(1)
+        suffix = re.search(r"FROM '([^']+)'\) AS suffix", SCHEMA_UPDATES_SQL).group(1)
+        assert re.search(pattern, "orders_202511")
+        assert not re.search(pattern, "orders_default")
+        assert not re.search(pattern, "order_items_202511")
+        assert re.search(suffix, "orders_202511").group(1) == "202511"
+
+    def test_schema_sql_has_no_invalid_escapes(self):
+        source = Path(init_db.__file__).read_text(encoding="utf-8")
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            compile(source, init_db.__file__, "exec")
+
+
+class TestOrderArchive:
+    """Tests para la sentencia de archivado por lotes"""
+
+    def test_archive_columns_match_schema(self):
+        assert ARCHIVE_COLUMNS["orders"] == table_columns(INIT_SQL, "orders", SCHEMA_UPDATES_SQL)
+        assert ARCHIVE_COLUMNS["order_items"] == table_columns(INIT_SQL, "order_items")
+        assert ARCHIVE_COLUMNS["order_documents"] == table_columns(SCHEMA_UPDATES_SQL, "order_documents")
+
+    def test_added_columns_are_added_to_archive_tables(self):
+        for table in ("orders", "order_items"):
+            added = re.findall(rf'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS (.*);', SCHEMA_UPDATES_SQL)
+            archived = re.findall(rf'ALTER TABLE "{table}_archive" ADD COLUMN IF NOT EXISTS (.*);', SCHEMA_UPDATES_SQL)
+            assert added == archived
+
+    def test_archive_uses_explicit_columns(self):
+        sql = " ".join(build_archive_batch_sql().split())
+        assert "*" not in sql
+        for table, columns in ARCHIVE_COLUMNS.items():
+            column_list = ", ".join(f'"{column}"' for column in columns)
+            assert f"INSERT INTO {table}_archive ({column_list}) SELECT {column_list} FROM" in sql
+
+    def test_archive_moves_items_and_documents_with_the_order(self):
+        # Sin FK de order_items a orders: los tres se mueven en la misma sentencia
+        sql = build_archive_batch_sql()
+        for table in ("orders", "order_items", "order_documents"):
+            assert f"DELETE FROM {table} " in sql
+        assert "status IN ('DELIVERED', 'CANCELLED')" in sql
+        assert "FOR UPDATE SKIP LOCKED" in sql
+
+
+class TestDashboardStatsEndpoint:
+    """Tests para GET /api/admin/stats"""
+
+    def test_stats_requires_admin(self, client, customer_headers):
+        response = client.get("/api/admin/stats", headers=customer_headers)
+        assert response.status_code == 403
+
+    def test_stats_from_rollups(self, client):
+        token = create_access_token({"userId": "admin-1", "role": "ADMIN"})
+        stats = {"days": 7, "today": {"orders": 3, "revenue": 42000}, "ordersByStatus": {"PENDING": 3},
+                 "daily": [], "hourly": [], "topProducts": []}
+        with patch("routers.admin.get_dashboard_stats", new=AsyncMock(return_value=stats)) as mock_stats:
+            response = client.get("/api/admin/stats?days=7", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert response.json()["today"]["orders"] == 3
+        mock_stats.assert_awaited_once_with(days=7)
+
+
+class TestOrderExport:
+    """Tests para GET /api/admin/orders/export"""
+
+    @pytest.fixture
+    def admin_headers(self):
+        token = create_access_token({"userId": "admin-1", "role": "ADMIN"})
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_query_date_range_is_inclusive(self):
+        query, params = build_export_query("document", date(2025, 11, 1), date(2025, 11, 30))
+        assert "FROM order_documents_all" in query
+        assert '"createdAt" >= $1 AND "createdAt" < $2' in query
+        assert params == [datetime(2025, 11, 1), datetime(2025, 12, 1)]
+
+    def test_query_without_filters(self):
+        query, params = build_export_query("document", None, None, include_archived=False)
+        assert "FROM order_documents WHERE 1=1 ORDER BY" in query
+        assert params == []
+
+    def test_export_requires_admin(self, client, customer_headers):
+        response = client.get("/api/admin/orders/export", headers=customer_headers)
+        assert response.status_code == 403
+
+    def test_invalid_format(self, client, admin_headers):
+        response = client.get("/api/admin/orders/export?format=xml", headers=admin_headers)
+        assert response.status_code == 400
+
+    def test_inverted_date_range(self, client, admin_headers):
+        response = client.get("/api/admin/orders/export?from=2025-11-30&to=2025-11-01", headers=admin_headers)
+        assert response.status_code == 400
+
+    def test_streams_ndjson(self, client, admin_headers):
+        async def stream():
+            yield b'{"id": "o1"}\n'
+            yield b'{"id": "o2"}\n'
+
+        with patch("routers.admin.open_orders_export", new=AsyncMock(return_value=stream())) as mock_export:
+            response = client.get("/api/admin/orders/export?from=2025-11-01&to=2025-11-30&archived=false",
+                                  headers=admin_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert 'filename="orders-2025-11-01-2025-11-30.ndjson"' in response.headers["content-disposition"]
+        assert response.text.splitlines() == ['{"id": "o1"}', '{"id": "o2"}']
+        mock_export.assert_awaited_once_with("ndjson", date_from=date(2025, 11, 1), date_to=date(2025, 11, 30),
+                                             include_archived=False)
+
+
+class FakeCursorConnection:
+    """Conexión simulada: el cursor devuelve las filas del rango pedido"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def transaction(self, **kwargs):
+        connection = self
+
+        class Transaction:
+            async def __aenter__(self):
+                return connection
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Transaction()
+
+    async def cursor(self, query, start, end):
+        self.queries += 1
+        pending = [row for row in self.rows if start <= row["createdAt"] < end]
+
+        class Cursor:
+            async def fetch(self, n):
+                nonlocal pending
+                batch, pending = pending[:n], pending[n:]
+                return batch
+
+        return Cursor()
+
+    async def close(self):
+        pass
+
+
+class TestAnalyticsExport:
+    """Tests para GET /api/admin/analytics/export"""
+
+    @pytest.fixture
+    def order_rows(self):
+        return [
+            {"id": f"o{i}", "userId": "user-1", "addressId": "addr-1", "status": "DELIVERED",
+             "total": Decimal("42000.00"), "deliveryFee": Decimal("0.00"), "paymentMethod": "CARD", "notes": None,
+             "createdAt": datetime(2025, 11, 1 + i // 2, 12, 30), "updatedAt": datetime(2025, 11, 3)}
+            for i in range(5)
+        ]
+
+    def test_batch_types_and_dictionaries(self, order_rows):
+        batch = analytics_export.rows_to_batch("orders", order_rows)
+        assert batch.num_rows == 5
+        assert batch.schema.field("total").type == pa.decimal128(10, 2)
+        assert pa.types.is_dictionary(batch.schema.field("status").type)
+        assert batch.column("status").dictionary.to_pylist() == analytics_export.ORDER_STATUSES
+
+    def test_closed_days_are_served_from_cache(self, order_rows, tmp_path, monkeypatch):
+        monkeypatch.setattr(analytics_export, "ANALYTICS_CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(analytics_export, "ANALYTICS_BATCH_ROWS", 2)
+        conn = FakeCursorConnection(order_rows)
+
+        async def export():
+            stream = await analytics_export.open_analytics_export("orders", "parquet", date(2025, 10, 31), date(2025, 11, 3))
+            return b"".join([chunk async for chunk in stream])
+
+        with patch.object(analytics_export, "get_connection", new=AsyncMock(return_value=conn)) as mock_connect:
+            first = pq.read_table(io.BytesIO(asyncio.run(export())))
+            second = pq.read_table(io.BytesIO(asyncio.run(export())))
+
+        assert first.num_rows == second.num_rows == 5
+        assert first.column("id").to_pylist() == second.column("id").to_pylist()
+        # Un solo cursor para los cuatro días; la segunda vez todo sale de la caché
+        assert conn.queries == 1
+        assert mock_connect.await_count == 1
+        assert len(list(tmp_path.glob("orders-*.arrow"))) == 4
+
+    def test_open_or_recent_days_are_not_cached(self, order_rows, tmp_path, monkeypatch):
+        monkeypatch.setattr(analytics_export, "ANALYTICS_CACHE_DIR", str(tmp_path))
+        # o2 y o3 (2 de noviembre) siguen en curso
+        order_rows[2]["status"] = "ON_DELIVERY"
+        yesterday = date.today() - timedelta(days=1)
+        conn = FakeCursorConnection(order_rows)
+
+        async def export(date_from, date_to):
+            stream = await analytics_export.open_analytics_export("orders", "arrow", date_from, date_to)
+            return b"".join([chunk async for chunk in stream])
+
+        with patch.object(analytics_export, "get_connection", new=AsyncMock(return_value=conn)):
+            asyncio.run(export(date(2025, 11, 1), date(2025, 11, 3)))
+            asyncio.run(export(yesterday, yesterday))
+
+        cached = sorted(path.name for path in tmp_path.glob("orders-*.arrow"))
+        assert cached == [f"orders-v{analytics_export.ANALYTICS_SCHEMA_VERSION}-2025-11-{day:02d}.arrow" for day in (1, 3)]
+        assert not analytics_export.is_closed_day(yesterday)
+
+    def test_export_requires_admin(self, client, customer_headers):
+        response = client.get("/api/admin/analytics/export?from=2025-11-01&to=2025-11-30", headers=customer_headers)
+        assert response.status_code == 403
+
+    def test_range_too_long(self, client):
+        token = create_access_token({"userId": "admin-1", "role": "ADMIN"})
+        response = client.get("/api/admin/analytics/export?from=2024-01-01&to=2025-11-30",
+                              headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
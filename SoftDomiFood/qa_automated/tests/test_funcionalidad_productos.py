@@ -0,0 +1,291 @@
+"""
+⚙️ Script de Validación Funcional - Módulo de Productos
+=========================================================
+
+Pruebas del catálogo que no requieren PostgreSQL: caché del catálogo,
+instantánea pre-codificada que sirve GET /api/products y operaciones masivas
+de administración (las funciones de BD se simulan).
+
+Componente bajo prueba: api/routers/admin.py, api/routers/products.py,
+api/services/cache.py, api/services/catalog_snapshot.py
+"""
+
+import asyncio
+import gzip
+import json
+import uuid
+import asyncpg
+import pytest
+from decimal import Decimal
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from api.main import app
+from api.services.auth_service import create_access_token
+from services.cache import TTLCache, catalog_cache
+from services.catalog_snapshot import build_catalog_snapshot, get_catalog_snapshot
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def client():
+    """Cliente de prueba síncrono"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin_headers():
+    """Cabeceras con token de administrador"""
+    token = create_access_token({"userId": "admin-1", "role": "ADMIN"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def customer_headers():
+    """Cabeceras con token de cliente"""
+    token = create_access_token({"userId": "user-1", "role": "CUSTOMER"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def catalog():
+    """Catálogo como lo devuelve get_products (más reciente primero)"""
+    return [
+        {"id": "p3", "name": "Limonada", "description": "Natural", "price": Decimal("6000.00"), "image": None,
+         "category": "BEBIDAS", "isAvailable": False, "createdAt": "2025-11-03T10:00:00"},
+        {"id": "p2", "name": "Gaseosa", "description": "350 ml", "price": Decimal("4000.00"), "image": None,
+         "category": "BEBIDAS", "isAvailable": True, "createdAt": "2025-11-02T10:00:00"},
+        {"id": "p1", "name": "Salchipapa Sencilla", "description": "Papas y salchicha", "price": Decimal("15000.00"),
+         "image": "/img/p1.jpg", "category": "SALCHIPAPAS", "isAvailable": True, "createdAt": "2025-11-01T10:00:00"},
+    ]
+
+
+@pytest.fixture
+def snapshot_source(catalog):
+    """get_products simulado y catálogo sin instantánea previa"""
+    catalog_cache.invalidate()
+    with patch("services.catalog_snapshot.get_products", new=AsyncMock(return_value=catalog)) as mock_products:
+        yield mock_products
+    catalog_cache.invalidate()
+
+
+# ============================================================================
+# TESTS UNITARIOS - Caché del catálogo
+# ============================================================================
+
+class TestTTLCache:
+    """Tests para la caché en memoria con expiración"""
+
+    def test_set_and_get(self):
+        cache = TTLCache(ttl_seconds=60)
+        cache.set(("product", "1"), {"id": "1"})
+        assert cache.get(("product", "1")) == {"id": "1"}
+
+    def test_expired_entry_is_dropped(self):
+        cache = TTLCache(ttl_seconds=60)
+        cache.set("k", "v")
+        with patch("services.cache.time.monotonic", return_value=10**9):
+            assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_invalidate_all(self):
+        cache = TTLCache(ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.invalidate()
+        assert cache.get("a") is None and cache.get("b") is None
+
+    def test_max_entries_evicts_oldest(self):
+        cache = TTLCache(ttl_seconds=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        assert cache.get("a") is None
+        assert cache.get("c") == 3
+
+    def test_zero_ttl_disables_cache(self):
+        cache = TTLCache(ttl_seconds=0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+
+    def test_invalidate_increments_generation(self):
+        cache = TTLCache(ttl_seconds=60)
+        generation = cache.generation
+        cache.invalidate("a")
+        cache.invalidate()
+        assert cache.generation == generation + 2
+
+
+# ============================================================================
+# TESTS - Instantánea pre-codificada del catálogo
+# ============================================================================
+
+class TestCatalogSnapshot:
+    """Tests para services/catalog_snapshot.py y GET /api/products"""
+
+    def test_bodies_match_json_response(self, catalog):
+        snapshot = build_catalog_snapshot(catalog)
+        selected = [p for p in catalog if p["category"] == "BEBIDAS" and p["isAvailable"]]
+        expected = JSONResponse(jsonable_encoder({"products": selected}))
+        body = snapshot.list_body("BEBIDAS", True)
+        assert body.plain == expected.body
+        assert gzip.decompress(body.gzip) == body.plain
+        assert json.loads(snapshot.products["p1"].plain)["product"]["price"] == 15000.0
+        assert json.loads(snapshot.list_body("POSTRES", None).plain) == {"products": []}
+
+    def test_list_is_filtered_and_keeps_order(self, client, snapshot_source):
+        response = client.get("/api/products/?category=BEBIDAS", headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200
+        assert [p["id"] for p in response.json()["products"]] == ["p3", "p2"]
+        assert "content-encoding" not in response.headers
+        assert response.headers["etag"].startswith('"')
+
+    def test_gzip_body_and_not_modified(self, client, snapshot_source):
+        response = client.get("/api/products/?available=true", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert [p["id"] for p in response.json()["products"]] == ["p2", "p1"]
+
+        etag = response.headers["etag"]
+        cached = client.get("/api/products/?available=true",
+                            headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert snapshot_source.await_count == 1
+
+    def test_product_detail(self, client, snapshot_source):
+        response = client.get("/api/products/p1")
+        assert response.json()["product"]["name"] == "Salchipapa Sencilla"
+        assert "createdAt" not in response.json()["product"]
+        assert client.get("/api/products/unknown").status_code == 404
+
+    def test_invalidation_rebuilds_snapshot(self, client, snapshot_source, catalog):
+        client.get("/api/products/")
+        catalog_cache.invalidate()
+        snapshot_source.return_value = catalog[1:]
+        response = client.get("/api/products/")
+        assert [p["id"] for p in response.json()["products"]] == ["p2", "p1"]
+        assert snapshot_source.await_count == 2
+
+    def test_concurrent_requests_share_one_build(self, snapshot_source, catalog):
+        async def slow_products():
+            await asyncio.sleep(0.05)
+            return catalog
+
+        snapshot_source.side_effect = slow_products
+
+        async def read_concurrently():
+            return await asyncio.gather(*[get_catalog_snapshot() for _ in range(20)])
+
+        snapshots = asyncio.run(read_concurrently())
+        assert all(snapshot is snapshots[0] for snapshot in snapshots)
+        assert snapshot_source.call_count == 1
+
+
+# ============================================================================
+# TESTS DE INTEGRACIÓN - Operaciones masivas de productos
+# ============================================================================
+
+class TestBulkProductOperations:
+    """Tests para PATCH /api/admin/products/availability y /prices"""
+
+    def test_availability_requires_admin(self, client, customer_headers):
+        response = client.patch(
+            "/api/admin/products/availability",
+            json={"category": "BEBIDAS", "isAvailable": False},
+            headers=customer_headers
+        )
+        assert response.status_code == 403
+
+    def test_availability_requires_filter(self, client, admin_headers):
+        response = client.patch(
+            "/api/admin/products/availability",
+            json={"isAvailable": False},
+            headers=admin_headers
+        )
+        assert response.status_code == 400
+
+    def test_availability_by_category(self, client, admin_headers):
+        updated = [{"id": "p1", "isAvailable": False}, {"id": "p2", "isAvailable": False}]
+        with patch("routers.admin.bulk_set_product_availability", new=AsyncMock(return_value=updated)) as mock_bulk:
+            response = client.patch(
+                "/api/admin/products/availability",
+                json={"category": "BEBIDAS", "isAvailable": False},
+                headers=admin_headers
+            )
+        assert response.status_code == 200
+        assert response.json()["updated"] == 2
+        mock_bulk.assert_awaited_once_with(is_available=False, product_ids=None, category="BEBIDAS")
+
+    def test_prices_require_exactly_one_adjustment(self, client, admin_headers):
+        response = client.patch(
+            "/api/admin/products/prices",
+            json={"category": "COMBOS", "percentage": 10, "amount": 500},
+            headers=admin_headers
+        )
+        assert response.status_code == 400
+
+    def test_prices_by_percentage(self, client, admin_headers):
+        product_id = uuid.uuid4()
+        with patch("routers.admin.bulk_update_product_prices", new=AsyncMock(return_value=[{"id": str(product_id)}])) as mock_bulk:
+            response = client.patch(
+                "/api/admin/products/prices",
+                json={"productIds": [str(product_id)], "percentage": 10},
+                headers=admin_headers
+            )
+        assert response.status_code == 200
+        mock_bulk.assert_awaited_once_with(percentage=10, amount=None, product_ids=[product_id], category=None)
+
+    def test_prices_reject_invalid_ids_and_bounds(self, client, admin_headers):
+        with patch("routers.admin.bulk_update_product_prices", new=AsyncMock()) as mock_bulk:
+            for body in ({"productIds": ["p1"], "amount": 500},
+                         {"category": "COMBOS", "amount": 1e12},
+                         {"category": "COMBOS", "percentage": -100}):
+                response = client.patch("/api/admin/products/prices", json=body, headers=admin_headers)
+                assert response.status_code == 422
+        mock_bulk.assert_not_awaited()
+
+    def test_prices_that_would_reach_zero_are_rejected(self, client, admin_headers):
+        conn = MagicMock()
+        conn.fetch = AsyncMock(return_value=[{"id": uuid.uuid4(), "name": "Gaseosa", "price": Decimal("0.00")}])
+        conn.transaction = MagicMock(return_value=AsyncMock())
+        conn.close = AsyncMock()
+        with patch("services.database_service.get_connection", new=AsyncMock(return_value=conn)):
+            response = client.patch(
+                "/api/admin/products/prices",
+                json={"category": "BEBIDAS", "amount": -5000},
+                headers=admin_headers
+            )
+        assert response.status_code == 400
+        assert "Gaseosa" in response.json()["detail"]
+        assert "GREATEST" not in conn.fetch.await_args.args[0]
+
+    def test_price_overflow_is_a_bad_request(self, client, admin_headers):
+        conn = MagicMock()
+        conn.fetch = AsyncMock(side_effect=asyncpg.NumericValueOutOfRangeError("numeric field overflow"))
+        conn.transaction = MagicMock(return_value=AsyncMock())
+        conn.close = AsyncMock()
+        with patch("services.database_service.get_connection", new=AsyncMock(return_value=conn)):
+            response = client.patch(
+                "/api/admin/products/prices",
+                json={"category": "COMBOS", "percentage": 900},
+                headers=admin_headers
+            )
+        assert response.status_code == 400
+
+    def test_prices_invalid_category(self, client, admin_headers):
+        response = client.patch(
+            "/api/admin/products/prices",
+            json={"category": "POSTRES", "amount": 500},
+            headers=admin_headers
+        )
+        assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,201 @@
+"""
+⚙️ Script de Validación Funcional - Coalescencia de Lecturas (Single-Flight)
+==============================================================================
+
+Pruebas de las lecturas idénticas concurrentes que comparten una sola consulta:
+coalescencia por clave, timeout y cancelación de un llamador sin cancelar la
+consulta compartida, propagación de errores y su uso en el catálogo, los
+productos y el perfil de usuario (la conexión a BD se simula).
+
+Componente bajo prueba: api/services/single_flight.py
+"""
+
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from main import app
+from services import database_service
+from services.auth_service import create_access_token
+from services.cache import catalog_cache
+from services.single_flight import SingleFlight, SingleFlightTimeout
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def client():
+    """Cliente de pruebas de la API"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def slow_conn():
+    """Conexión simulada de asyncpg cuyas consultas tardan 50 ms"""
+    product = {"id": "p1", "name": "Salchipapa", "description": None, "price": 12000,
+               "image": None, "category": "SALCHIPAPAS", "isAvailable": True}
+    user = {"id": "user-1", "email": "cliente@example.com", "name": "Cliente", "phone": None, "role": "CUSTOMER"}
+
+    async def fetch(*args):
+        await asyncio.sleep(0.05)
+        return [product]
+
+    async def fetchrow(query, *args):
+        await asyncio.sleep(0.05)
+        return user if "FROM users" in query else product
+
+    conn = MagicMock()
+    conn.fetch = AsyncMock(side_effect=fetch)
+    conn.fetchrow = AsyncMock(side_effect=fetchrow)
+    conn.close = AsyncMock()
+    catalog_cache.invalidate()
+    with patch.object(database_service, "get_connection", new=AsyncMock(return_value=conn)):
+        yield conn
+    catalog_cache.invalidate()
+
+
+async def _slow_value(value, delay=0.05, calls=None):
+    if calls is not None:
+        calls.append(value)
+    await asyncio.sleep(delay)
+    return value
+
+
+# ============================================================================
+# TESTS UNITARIOS - SingleFlight
+# ============================================================================
+
+class TestSingleFlight:
+    """Tests para SingleFlight.do"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def scenario():
+            return await asyncio.gather(*[flight.do("k", lambda: _slow_value("v", calls=calls)) for _ in range(20)])
+
+        assert asyncio.run(scenario()) == ["v"] * 20
+        assert calls == ["v"]
+        assert len(flight) == 0
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def scenario():
+            return await asyncio.gather(
+                flight.do("a", lambda: _slow_value("a", calls=calls)),
+                flight.do("b", lambda: _slow_value("b", calls=calls)),
+            )
+
+        assert asyncio.run(scenario()) == ["a", "b"]
+        assert sorted(calls) == ["a", "b"]
+
+    def test_sequential_calls_do_not_reuse_result(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def scenario():
+            await flight.do("k", lambda: _slow_value("v", delay=0, calls=calls))
+            await flight.do("k", lambda: _slow_value("v", delay=0, calls=calls))
+
+        asyncio.run(scenario())
+        assert calls == ["v", "v"]
+
+    def test_error_reaches_every_caller_and_key_is_released(self):
+        flight = SingleFlight("test")
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("fallo de BD")
+
+        async def scenario():
+            results = await asyncio.gather(*[flight.do("k", failing) for _ in range(3)], return_exceptions=True)
+            return results, await flight.do("k", lambda: _slow_value("ok", delay=0))
+
+        results, retry = asyncio.run(scenario())
+        assert all(isinstance(result, ValueError) for result in results)
+        assert retry == "ok"
+
+    def test_caller_timeout_does_not_cancel_shared_query(self):
+        flight = SingleFlight("test")
+
+        async def scenario():
+            patient = asyncio.ensure_future(flight.do("k", lambda: _slow_value("v", delay=0.1)))
+            await asyncio.sleep(0)
+            with pytest.raises(SingleFlightTimeout):
+                await flight.do("k", lambda: _slow_value("otro"), timeout=0.01)
+            return await patient
+
+        assert asyncio.run(scenario()) == "v"
+
+    def test_cancelled_caller_is_detached(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def scenario():
+            first = asyncio.ensure_future(flight.do("k", lambda: _slow_value("v", calls=calls)))
+            second = asyncio.ensure_future(flight.do("k", lambda: _slow_value("v", calls=calls)))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(scenario()) == "v"
+        assert calls == ["v"]
+
+
+# ============================================================================
+# TESTS DE INTEGRACIÓN - Lecturas coalescidas
+# ============================================================================
+
+class TestCoalescedReads:
+    """Tests para get_products, get_product_by_id y get_user_by_id"""
+
+    def test_products_single_query(self, slow_conn):
+        async def scenario():
+            return await asyncio.gather(*[database_service.get_products() for _ in range(10)])
+
+        results = asyncio.run(scenario())
+        assert all(result is results[0] for result in results)
+        assert slow_conn.fetch.await_count == 1
+
+    def test_product_by_id_single_query(self, slow_conn):
+        async def scenario():
+            return await asyncio.gather(*[database_service.get_product_by_id("p1") for _ in range(10)])
+
+        assert all(result["id"] == "p1" for result in asyncio.run(scenario()))
+        assert slow_conn.fetchrow.await_count == 1
+
+    def test_user_by_id_single_query(self, slow_conn):
+        async def scenario():
+            return await asyncio.gather(*[database_service.get_user_by_id("user-1") for _ in range(10)])
+
+        assert all(result["id"] == "user-1" for result in asyncio.run(scenario()))
+        assert slow_conn.fetchrow.await_count == 1
+
+    def test_invalidation_during_query_is_not_cached(self, slow_conn):
+        async def scenario():
+            stale = asyncio.ensure_future(database_service.get_products())
+            await asyncio.sleep(0.01)
+            catalog_cache.invalidate()
+            # Posterior a la invalidación: no se une a la consulta anterior
+            fresh = await database_service.get_products()
+            return await stale, fresh
+
+        asyncio.run(scenario())
+        assert slow_conn.fetch.await_count == 2
+        assert catalog_cache.get(("products", None, None)) is not None
+
+    def test_profile_timeout_returns_503(self, client):
+        token = create_access_token({"userId": "user-1", "role": "CUSTOMER"})
+        with patch("services.database_service.get_user_by_id",
+                   new=AsyncMock(side_effect=SingleFlightTimeout("user: sin respuesta"))):
+            response = client.get("/api/auth/profile", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"